@@ -1,45 +1,99 @@
 import os
 import logging
-from flask import Flask
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+from cache import Cache
+from broker import Broker
+from metrics import Metrics
+from database import RoutingSession, configure_read_binds, configure_sqlite, is_read_bind
 
 class Base(DeclarativeBase):
     pass
 
-# Initialize Flask app
-app = Flask(__name__)
+# Extensions are created unbound and attached to an app by create_app, so
+# models and helpers can import them without building an app
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 
-# Load configuration
-config_name = os.environ.get('FLASK_ENV', 'development')
-app.config.from_object(config[config_name])
+# Per-user cache for dashboard data and user snapshots
+cache = Cache()
 
-# Add proxy fix for production deployment
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+# Change notifications for streamed dashboard stats
+broker = Broker()
 
-# Initialize extensions
-db = SQLAlchemy(model_class=Base)
-db.init_app(app)
+# Request and database instrumentation
+metrics = Metrics()
 
-# Initialize Flask-Login
+# Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message = 'Please log in to access this page.'
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
+    """Load the current user from a cached snapshot, querying only on a miss"""
+    from models import User, UserSnapshot
+
+    def get_user():
+        user = db.session.get(User, int(user_id))
+        if user is None and current_app.config['SQLALCHEMY_REPLICA_URIS']:
+            # A new account may not have reached the replicas yet
+            user = db.session.get(User, int(user_id), bind_arguments={'bind': db.engine})
+        return user
+
+    timeout = current_app.config['USER_CACHE_TIMEOUT']
+    if not timeout:
+        return get_user()
+
+    key = UserSnapshot.cache_key(user_id)
+    fields = cache.get(key)
+    if fields is None:
+        user = get_user()
+        if user is None:
+            return None
+        fields = UserSnapshot.fields_of(user)
+        cache.set(key, fields, timeout=timeout)
+    return UserSnapshot(**fields)
+
+def create_app(config_name=None):
+    """Create and configure the Flask app
+
+    Nothing here connects to the database: tables and migrations are applied
+    by init_db.py. That keeps imports cheap and lets gunicorn --preload fork
+    workers from an app that holds no connections.
+    """
+    app = Flask(__name__)
 
-# Create tables
-with app.app_context():
+    # Load configuration
+    config_name = config_name or os.environ.get('FLASK_ENV', 'development')
+    app.config.from_object(config[config_name])
+
+    # Only configures logging if the server (e.g. gunicorn) hasn't already
+    logging.basicConfig(level=app.config['LOG_LEVEL'])
+
+    # Add proxy fix for production deployment
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    # Initialize extensions
+    configure_read_binds(app)
+    db.init_app(app)
+    cache.init_app(app)
+    broker.init_app(app)
+    login_manager.init_app(app)
+
+    # Creating the engine objects does not open a connection
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            configure_sqlite(engine, app.config, read_only=is_read_bind(bind_key))
+        if app.config['METRICS_ENABLED']:
+            metrics.init_app(app, db.engines)
+
+    # Register models and routes
     import models  # noqa: F401
-    db.create_all()
-    logging.info("Database tables created")
+    from routes import bp
+    app.register_blueprint(bp)
+
+    return app
@@ -0,0 +1,384 @@
+import json
+import time
+import asyncio
+from datetime import datetime
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from flask import current_app, jsonify
+from itsdangerous import BadSignature
+from sqlalchemy import select
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import joinedload
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie, parse_etags, remove_entity_headers
+from app import db, cache, broker, metrics
+from database import configure_sqlite, is_read_bind, replica_bind_for
+from models import User, UserSnapshot, Task, Category, Schedule
+from routes import task_to_dict
+from utils import (get_stats_version, dashboard_bundle_key, task_stats_statement, task_stats_from_row,
+                   category_stats_statement, category_stats_from_rows, filter_tasks, task_page_query,
+                   split_task_page, TASK_SORT_ORDERS)
+
+# Async drivers used in place of the sync ones for each database backend
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+# Engine options only queue pools accept
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_use_lifo')
+
+def async_database_url(url):
+    """Get the URL of the same database for its async driver"""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver is configured for {backend} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def async_engine_options(url, options):
+    """Get the app's engine options without those the async driver's pool rejects
+
+    The pool depends on the driver and SQLAlchemy version: aiosqlite uses a
+    NullPool for database files before SQLAlchemy 2.1 and a StaticPool in
+    memory, and neither takes the queue pool's sizing options.
+    """
+    options = dict(options)
+    pool_class = options.get('poolclass') or url.get_dialect().get_pool_class(url)
+    if not issubclass(pool_class, QueuePool):
+        for name in QUEUE_POOL_OPTIONS:
+            options.pop(name, None)
+    return options
+
+async def call_cache(func, *args, **kwargs):
+    """Make a cache call, in a thread if the cache backend does blocking I/O"""
+    if cache.blocking:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+class APIRequest:
+    """The parts of an ASGI request that the async endpoints read"""
+
+    def __init__(self, scope, session, user_id):
+        self.session = session
+        self.user_id = user_id
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        self.headers = Headers([(name.decode('latin-1'), value.decode('latin-1'))
+                                for name, value in scope['headers']])
+
+# Endpoints - each mirrors the GET branch of the Flask view of the same name
+
+async def api_tasks(request):
+    sort = request.args.get('sort', 'due')
+    if sort not in TASK_SORT_ORDERS:
+        return jsonify({'error': 'Invalid sort order'}), 400
+
+    try:
+        limit = int(request.args.get('limit', current_app.config['TASKS_PAGE_SIZE']))
+        due_after = request.args.get('due_after')
+        due_before = request.args.get('due_before')
+        query = filter_tasks(
+            select(Task).filter_by(user_id=request.user_id),
+            status=request.args.get('status'),
+            category_id=request.args.get('category_id'),
+            due_after=datetime.fromisoformat(due_after) if due_after else None,
+            due_before=datetime.fromisoformat(due_before) if due_before else None
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid filter parameters'}), 400
+
+    limit = max(1, min(limit, current_app.config['MAX_TASKS_PAGE_SIZE']))
+
+    try:
+        query = task_page_query(query.options(joinedload(Task.category)), limit,
+                                request.args.get('cursor'), sort)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    tasks, next_cursor = split_task_page((await request.session.scalars(query)).all(), limit, sort)
+    return jsonify({
+        'items': [task_to_dict(task) for task in tasks],
+        'next_cursor': next_cursor
+    })
+
+async def api_categories(request):
+    categories = await request.session.scalars(select(Category).filter_by(user_id=request.user_id))
+    return jsonify([{
+        'id': cat.id,
+        'name': cat.name,
+        'color': cat.color
+    } for cat in categories])
+
+async def api_get_schedule(request, date_str):
+    try:
+        schedule_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+
+    schedule_items = await request.session.scalars(
+        select(Schedule).filter_by(user_id=request.user_id, schedule_date=schedule_date)
+                        .options(joinedload(Schedule.task).joinedload(Task.category))
+                        .order_by(Schedule.start_time)
+    )
+
+    return jsonify([{
+        'task_id': item.task_id,
+        'task_title': item.task.title,
+        'start_time': item.start_time.strftime('%H:%M'),
+        'end_time': item.end_time.strftime('%H:%M'),
+        'category_name': item.task.category.name if item.task.category else 'Uncategorized',
+        'category_color': item.task.category.color if item.task.category else '#6c757d'
+    } for item in schedule_items])
+
+async def get_stats_bundle(request, version):
+    """Get the dashboard bundle from cache, computing it on a miss"""
+    key = dashboard_bundle_key(request.user_id, version)
+    bundle = await call_cache(cache.get, key)
+    if bundle is None:
+        task_row = (await request.session.execute(task_stats_statement(request.user_id))).one()
+        category_rows = (await request.session.execute(category_stats_statement(request.user_id))).all()
+        bundle = {
+            'task_stats': task_stats_from_row(task_row),
+            'category_stats': category_stats_from_rows(category_rows)
+        }
+        await call_cache(cache.set, key, bundle, timeout=current_app.config['STATS_CACHE_TIMEOUT'])
+    return bundle
+
+async def api_stats(request):
+    # Answer unchanged polls with 304 before touching the database
+    version = await call_cache(get_stats_version, request.user_id)
+    etag = f'stats-{request.user_id}-{version}'
+
+    if parse_etags(request.headers.get('If-None-Match')).contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(await get_stats_bundle(request, version))
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+async def api_stats_stream(request):
+    """Yield the Server-Sent Events of the Flask stats stream
+
+    Waits for change notifications on the event loop, so an open dashboard
+    holds no thread and no database connection while idle.
+    """
+    keepalive = current_app.config['STATS_STREAM_KEEPALIVE']
+    max_age = current_app.config['STATS_STREAM_MAX_AGE']
+    last_version = request.headers.get('Last-Event-ID')
+
+    # Subscribe before the first read so no change can slip in between
+    with broker.subscribe_async(request.user_id) as subscription:
+        yield 'retry: 5000\n\n'
+        deadline = time.monotonic() + max_age
+        while True:
+            version = await call_cache(get_stats_version, request.user_id)
+            if version != last_version:
+                bundle = await get_stats_bundle(request, version)
+                last_version = version
+                yield f'event: stats\nid: {version}\ndata: {json.dumps(bundle)}\n\n'
+
+            # Don't hold a database connection while idle
+            await request.session.close()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            # Time-dependent counters are re-checked on every keepalive
+            if not await subscription.wait(min(keepalive, remaining)):
+                yield ': keepalive\n\n'
+
+ASYNC_ENDPOINTS = {
+    'main.api_tasks': api_tasks,
+    'main.api_categories': api_categories,
+    'main.api_get_schedule': api_get_schedule,
+    'main.api_stats': api_stats,
+}
+
+# Endpoints answered with a stream of Server-Sent Events from an async generator
+ASYNC_EVENT_STREAMS = {
+    'main.api_stats_stream': api_stats_stream,
+}
+
+class AsyncAPI:
+    """ASGI app serving the read-heavy JSON endpoints on an async engine
+
+    Requests are matched against the Flask app's URL map. GET requests for
+    an endpoint in ASYNC_ENDPOINTS from a logged-in session are answered on
+    the event loop, so waiting on the database doesn't hold a thread; those
+    in ASYNC_EVENT_STREAMS are streamed from it, so an open stream doesn't
+    either. All other requests, including those that can only be
+    authenticated by Flask-Login's remember cookie, run in the Flask app on
+    a thread pool.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi_app = WSGIMiddleware(flask_app, workers=flask_app.config['ASYNC_WSGI_THREADS'])
+        self.urls = flask_app.url_map.bind('localhost')
+        self.session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.engines = {}
+        self.sessions = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if await self._dispatch(scope, receive, send):
+                return
+        await self.wsgi_app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines.values():
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _sessionmaker(self, bind_key=None):
+        """Async sessions for the primary or a replica bind
+
+        Engines are created on first use so each worker process gets its
+        own pools.
+        """
+        if bind_key not in self.sessions:
+            url = async_database_url(db.engines[bind_key].url)
+            engine = create_async_engine(url, **async_engine_options(
+                url, self.flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})))
+            configure_sqlite(engine.sync_engine, self.flask_app.config, read_only=is_read_bind(bind_key))
+            self.engines[bind_key] = engine
+            self.sessions[bind_key] = async_sessionmaker(engine, expire_on_commit=False)
+        return self.sessions[bind_key]
+
+    async def _dispatch(self, scope, receive, send):
+        """Answer a request on the event loop, returning False to leave it to Flask"""
+        try:
+            endpoint, view_args = self.urls.match(scope['path'], method='GET')
+        except HTTPException:
+            return False
+        handler = ASYNC_ENDPOINTS.get(endpoint)
+        if handler is None and endpoint not in ASYNC_EVENT_STREAMS:
+            return False
+
+        user_id = self._session_user_id(scope)
+        if user_id is None:
+            return False
+
+        if handler is None:
+            return await self._dispatch_stream(scope, receive, send, endpoint, view_args, user_id)
+
+        started = time.perf_counter()
+        sampled = self.flask_app.config['METRICS_ENABLED'] and metrics.sample()
+        with self.flask_app.app_context():
+            # A user missing from a replica (a new account) is left to Flask,
+            # whose user loader falls back to the primary
+            async with self._sessionmaker(await call_cache(replica_bind_for, user_id))() as session:
+                if not await self._user_exists(session, user_id):
+                    return False
+                response = await handler(APIRequest(scope, session, user_id), **view_args)
+
+        if isinstance(response, tuple):
+            response, status = response
+            response.status_code = status
+        await self._send(send, response)
+
+        if sampled:
+            metrics.record_request(endpoint, 'GET', response.status_code, time.perf_counter() - started)
+        return True
+
+    async def _dispatch_stream(self, scope, receive, send, endpoint, view_args, user_id):
+        """Stream an event endpoint until it ends or the client disconnects"""
+        started = time.perf_counter()
+        with self.flask_app.app_context():
+            async with self._sessionmaker(await call_cache(replica_bind_for, user_id))() as session:
+                if not await self._user_exists(session, user_id):
+                    return False
+                await session.close()
+
+                response = current_app.response_class(mimetype='text/event-stream')
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.headers['X-Accel-Buffering'] = 'no'
+                await send({
+                    'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in response.headers.items()],
+                })
+                if self.flask_app.config['METRICS_ENABLED'] and metrics.sample():
+                    metrics.record_request(endpoint, 'GET', response.status_code, time.perf_counter() - started)
+
+                events = ASYNC_EVENT_STREAMS[endpoint](APIRequest(scope, session, user_id), **view_args)
+                disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+                try:
+                    while True:
+                        next_event = asyncio.ensure_future(events.__anext__())
+                        await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                        if not next_event.done():
+                            next_event.cancel()
+                            await asyncio.gather(next_event, return_exceptions=True)
+                            return True
+                        try:
+                            event = next_event.result()
+                        except StopAsyncIteration:
+                            break
+                        await send({'type': 'http.response.body', 'body': event.encode('utf-8'),
+                                    'more_body': True})
+                    await send({'type': 'http.response.body', 'body': b''})
+                finally:
+                    disconnected.cancel()
+                    await events.aclose()
+        return True
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def _session_user_id(self, scope):
+        """Read the logged-in user id from the Flask session cookie"""
+        if self.session_serializer is None:
+            return None
+        cookie_header = b'; '.join(value for name, value in scope['headers'] if name == b'cookie')
+        cookie = parse_cookie(cookie_header.decode('latin-1')).get(self.flask_app.config['SESSION_COOKIE_NAME'])
+        if not cookie:
+            return None
+
+        max_age = int(self.flask_app.permanent_session_lifetime.total_seconds())
+        try:
+            user_id = self.session_serializer.loads(cookie, max_age=max_age).get('_user_id')
+            return int(user_id) if user_id is not None else None
+        except (BadSignature, TypeError, ValueError):
+            return None
+
+    async def _user_exists(self, session, user_id):
+        """Check the user as the Flask-Login user loader would, sharing its cache"""
+        timeout = current_app.config['USER_CACHE_TIMEOUT']
+        key = UserSnapshot.cache_key(user_id)
+        if timeout and await call_cache(cache.get, key) is not None:
+            return True
+
+        user = await session.get(User, user_id)
+        if user is None:
+            return False
+        if timeout:
+            await call_cache(cache.set, key, UserSnapshot.fields_of(user), timeout=timeout)
+        return True
+
+    async def _send(self, send, response):
+        if response.status_code == 304:
+            remove_entity_headers(response.headers)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark application cold start in fresh interpreter processes
+Each run imports main (as gunicorn does) against an empty SQLite database,
+then serves one request, and reports the import and first-request times,
+the log output and whether importing touched the database
+Usage: python benchmarks/bench_cold_start.py [runs]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+response = main.app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000,
+                  'first_request_ms': (served - imported) * 1000,
+                  'status': response.status_code}))
+'''
+
+def cold_start(scratch_dir):
+    database = os.path.join(scratch_dir, 'cold.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', FLASK_ENV='production',
+               CACHE_DIR=os.path.join(scratch_dir, 'cache'))
+
+    start = time.perf_counter()
+    child = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+                           capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    result['process_ms'] = wall_ms
+    result['log_lines'] = len(child.stderr.splitlines())
+
+    tables = 0
+    if os.path.exists(database):
+        with sqlite3.connect(database) as connection:
+            tables = connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+    result['tables_created'] = tables
+    return result
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix='cold-start-') as scratch_dir:
+            results.append(cold_start(scratch_dir))
+
+    def median(key):
+        return statistics.median(result[key] for result in results)
+
+    print(f"{runs} cold start(s), medians:")
+    print(f"  import main           {median('import_ms'):8.1f} ms")
+    print(f"  first request         {median('first_request_ms'):8.1f} ms")
+    print(f"  whole process         {median('process_ms'):8.1f} ms")
+    print(f"  log lines             {median('log_lines'):8.0f}")
+    print(f"  tables created        {median('tables_created'):8.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Load test the read API under gunicorn with one worker per server mode
+Seeds a scratch SQLite database (see datagen.py), then for each mode starts
+gunicorn with a single worker and drives the async-capable read endpoints
+from a growing number of concurrent keep-alive clients, reporting throughput,
+latency percentiles and errors per concurrency level
+Modes: sync (one request at a time), gthread (--threads 8, as in the
+Dockerfile before the ASGI worker) and asgi (asgi:app on the uvicorn worker)
+Usage: python benchmarks/bench_concurrency.py [--modes sync,gthread,asgi]
+                                              [--concurrency 1,8,32,64]
+                                              [--duration SECONDS] [--database URL]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import http.client
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {
+    'sync': ['--worker-class', 'sync', 'main:app'],
+    'gthread': ['--worker-class', 'gthread', '--threads', '8', 'main:app'],
+    'asgi': ['--worker-class', 'uvicorn_worker.UvicornWorker', 'asgi:app'],
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test the read API per gunicorn worker')
+    parser.add_argument('--modes', default='sync,gthread,asgi')
+    parser.add_argument('--concurrency', default='1,8,32,64', help='comma separated client counts')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per concurrency level')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--tasks', type=int, default=300, help='average tasks per user')
+    parser.add_argument('--database', help='database URL to add the synthetic data to (default: a scratch SQLite file)')
+    return parser.parse_args()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(mode, port, env):
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+               '--timeout', '120', '--log-level', 'warning'] + MODES[mode]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+def login(port, username):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', '/login', urlencode({'username': username, 'password': 'benchmark'}),
+                       {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 302, 'benchmark login failed'
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+def run_clients(port, cookies, paths, clients, duration):
+    """Send requests from concurrent keep-alive clients, returning latencies and errors"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients + 1)
+    stop_at = [0]
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        headers = {'Cookie': cookies[index % len(cookies)]}
+        mine, failed = [], 0
+        start_barrier.wait()
+        request_number = index
+        while time.monotonic() < stop_at[0]:
+            path = paths[request_number % len(paths)]
+            request_number += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                continue
+            mine.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.monotonic() + duration
+    start_barrier.wait()
+    started = time.monotonic()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors), time.monotonic() - started
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    args = parse_args()
+    modes = args.modes.split(',')
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    scratch_dir = tempfile.mkdtemp(prefix='bench-concurrency-')
+    env = dict(os.environ, FLASK_ENV='production', METRICS_ENABLED='0', CACHE_TYPE='file',
+               CACHE_DIR=os.path.join(scratch_dir, 'cache'), LOG_LEVEL='WARNING',
+               DATABASE_URL=args.database or f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}")
+    os.environ.update(env)
+
+    import logging
+    from app import create_app, db
+    from datagen import generate
+
+    logging.disable(logging.CRITICAL)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user_ids = generate(args.users, args.tasks, seed=42)
+        db.engine.dispose()
+
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    paths = ['/api/tasks?limit=50', '/api/stats', '/api/categories', f'/api/schedule/{tomorrow}',
+             '/api/tasks?status=todo&sort=priority&limit=20']
+
+    print(f"{args.users} user(s), {args.duration:.0f}s per level, one worker per mode\n")
+    print(f"{'mode':<8} {'clients':>7} {'req/s':>8} {'p50':>9} {'p99':>9} {'errors':>7}")
+    try:
+        for mode in modes:
+            port = free_port()
+            server = start_server(mode, port, env)
+            try:
+                cookies = [login(port, f'bench{user_id}') for user_id in user_ids[:max(levels)]]
+                # Warm up caches and connection pools
+                run_clients(port, cookies, paths, 2, 1)
+                for clients in levels:
+                    latencies, errors, elapsed = run_clients(port, cookies, paths, clients, args.duration)
+                    if not latencies:
+                        print(f"{mode:<8} {clients:>7} {'-':>8} {'-':>9} {'-':>9} {errors:>7}")
+                        continue
+                    print(f"{mode:<8} {clients:>7} {len(latencies) / elapsed:>8.0f} "
+                          f"{statistics.median(latencies) * 1000:>7.1f}ms "
+                          f"{percentile(latencies, 0.99) * 1000:>7.1f}ms {errors:>7}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        import shutil
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the optimal daily schedule solver against the greedy one
+Builds random backlogs of pending task rows (no database) and, for each
+backlog size, times both solvers and reports the score the optimal solver
+gains over greedy, how often it improved on greedy, and how often it
+finished within the time budget. Durations are drawn either from the
+synthetic data's 15-minute steps or from any whole number of minutes, the
+slow case for the solver
+Usage: python benchmarks/bench_solver.py [--sizes 10,50,200,1000,5000]
+                                         [--runs N] [--budget-ms MS]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from collections import namedtuple
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from scheduler import TaskScheduler
+from datagen import DURATIONS
+
+TaskRow = namedtuple('TaskRow', 'id title due_date priority estimated_duration category_name category_color')
+
+def make_rows(count, rng, any_minutes):
+    now = datetime.utcnow()
+    rows = []
+    for index in range(count):
+        due_date = None
+        if rng.random() < 0.8:
+            due_date = now + timedelta(minutes=rng.randint(-14 * 1440, 30 * 1440))
+        duration = rng.randint(10, 300) if any_minutes else rng.choice(DURATIONS)
+        rows.append(TaskRow(index + 1, f'Task {index}', due_date, rng.randint(1, 5), duration, None, None))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the optimal and greedy schedule solvers')
+    parser.add_argument('--sizes', default='10,50,200,1000,5000', help='comma separated backlog sizes')
+    parser.add_argument('--runs', type=int, default=20, help='random backlogs per size')
+    parser.add_argument('--budget-ms', type=float, default=200, help='time budget of the optimal solver')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    scheduler = TaskScheduler(user_id=None)
+    schedule_date = date.today() + timedelta(days=1)
+    print(f"{args.runs} backlog(s) per size, {args.budget_ms:.0f}ms budget\n")
+    print(f"{'durations':<10} {'tasks':>6} {'greedy':>9} {'optimal':>9} {'max':>9} "
+          f"{'gain':>7} {'improved':>9} {'complete':>9}")
+
+    for label, any_minutes in (('15-min', False), ('any', True)):
+        for size in (int(size) for size in args.sizes.split(',')):
+            rng = random.Random(args.seed + size)
+            greedy_times, optimal_times, gains = [], [], []
+            improved = complete = 0
+            for _ in range(args.runs):
+                rows = make_rows(size, rng, any_minutes)
+
+                started = time.perf_counter()
+                scheduler.generate_daily_schedule(schedule_date, rows=rows)
+                greedy_times.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                plan = scheduler.generate_optimal_schedule(schedule_date, rows=rows,
+                                                           time_budget=args.budget_ms / 1000)
+                optimal_times.append(time.perf_counter() - started)
+
+                gains.append(plan['score'] / plan['greedy_score'] - 1 if plan['greedy_score'] else 0)
+                improved += plan['solver'] == 'optimal'
+                complete += plan['complete']
+
+            print(f"{label:<10} {size:>6} {statistics.median(greedy_times) * 1000:>7.2f}ms "
+                  f"{statistics.median(optimal_times) * 1000:>7.2f}ms {max(optimal_times) * 1000:>7.2f}ms "
+                  f"{statistics.mean(gains) * 100:>6.1f}% {improved / args.runs:>9.0%} {complete / args.runs:>9.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cached Flask-Login user loader against a replayed request trace
+Replays a typical dashboard session (stats polls, task list reads and task
+mutations) with the user cache disabled and enabled, and counts the queries
+that hit the users table
+Usage: python benchmarks/bench_user_loader.py [repeats]
+"""
+
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+import logging
+from sqlalchemy import event
+from main import app
+from app import db, cache
+from models import User, UserSnapshot, Task
+
+logging.disable(logging.CRITICAL)
+
+def build_trace(task_ids):
+    """One dashboard session: mostly polls and reads, with a few writes"""
+    trace = [('GET', '/dashboard', None)]
+    for i in range(20):
+        trace.append(('GET', '/api/stats', None))
+        if i % 4 == 0:
+            trace.append(('GET', '/api/tasks?limit=20', None))
+        if i % 5 == 0:
+            trace.append(('PUT', f'/api/tasks/{task_ids[i % len(task_ids)]}', {'priority': i % 5 + 1}))
+    trace.append(('POST', '/api/tasks', {'title': 'Replayed task', 'priority': 3}))
+    trace.append(('PATCH', '/api/tasks', {'ids': task_ids[:5], 'changes': {'status': 'in-progress'}}))
+    trace.append(('POST', '/api/schedule/generate', {'date': date.today().isoformat()}))
+    trace.append(('GET', '/tasks', None))
+    return trace
+
+def replay(client, trace, repeats):
+    for _ in range(repeats):
+        for method, path, body in trace:
+            response = client.open(path, method=method, json=body)
+            assert response.status_code < 400, (method, path, response.status_code)
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    statements = []
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.flush()
+        tasks = [Task(title=f'Task {i}', user_id=user.id, priority=i % 5 + 1, estimated_duration=60)
+                 for i in range(50)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        user_id = user.id
+        trace = build_trace([task.id for task in tasks])
+
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    print(f"{'user cache':>10} {'requests':>9} {'queries':>8} {'users queries':>14} {'time':>9}")
+    for timeout in (0, app.config['USER_CACHE_TIMEOUT'] or 60):
+        app.config['USER_CACHE_TIMEOUT'] = timeout
+        cache.delete(UserSnapshot.cache_key(user_id))
+        client = app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+        del statements[:]
+        start = time.perf_counter()
+        replay(client, trace, repeats)
+        elapsed = time.perf_counter() - start
+
+        users_queries = sum(1 for statement in statements if 'FROM users' in statement)
+        print(f"{'on' if timeout else 'off':>10} {len(trace) * repeats:>9} {len(statements):>8} "
+              f"{users_queries:>14} {elapsed * 1000:>6.0f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Check read-replica routing locally with two SQLite files
+The replica is a copy of the primary that is only refreshed when this script
+says so (standing in for replication lag). Drives the app through the test
+client and the ASGI read API, and checks which database served each request:
+GET requests read the replica, writes and reads after a write use the
+primary, and a user who just changed data reads the primary until their
+read-your-writes window has passed
+Usage: python benchmarks/check_replicas.py [--window SECONDS]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def replicate(primary_path, replica_path):
+    """Copy the primary database over the replica, as replication catching up would"""
+    with sqlite3.connect(primary_path) as source, sqlite3.connect(replica_path) as target:
+        source.backup(target)
+
+def main():
+    parser = argparse.ArgumentParser(description='Check read-replica routing with two SQLite files')
+    parser.add_argument('--window', type=int, default=2, help='REPLICA_STICKY_SECONDS to test with')
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='replicas-')
+    primary_path = os.path.join(scratch_dir, 'primary.db')
+    replica_path = os.path.join(scratch_dir, 'replica.db')
+    os.environ.update(FLASK_ENV='production', METRICS_ENABLED='0', CACHE_TYPE='memory',
+                      DATABASE_URL=f'sqlite:///{primary_path}',
+                      DATABASE_REPLICA_URLS=f'sqlite:///{replica_path}',
+                      REPLICA_STICKY_SECONDS=str(args.window))
+
+    import logging
+    from sqlalchemy import event
+    from app import create_app, db
+    from async_api import AsyncAPI
+    from datagen import generate
+
+    logging.disable(logging.CRITICAL)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user_id = generate(2, 20, seed=1)[0]
+        served_by = []
+        for bind_key, engine in db.engines.items():
+            event.listen(engine, 'before_cursor_execute',
+                         lambda *args, name=bind_key or 'primary': served_by.append(name))
+    replicate(primary_path, replica_path)
+
+    failures = []
+
+    def check(label, condition):
+        print(f"{'✓' if condition else '✗'} {label}")
+        if not condition:
+            failures.append(label)
+
+    def databases(func):
+        del served_by[:]
+        result = func()
+        return result, set(served_by)
+
+    client = app.test_client()
+    response, used = databases(lambda: client.post('/login', data={'username': f'bench{user_id}',
+                                                                   'password': 'benchmark'}))
+    check('login (POST) reads the primary', response.status_code == 302 and used == {'primary'})
+
+    response, used = databases(lambda: client.get('/api/tasks?limit=200'))
+    check('GET /api/tasks reads the replica', response.status_code == 200 and used == {'replica0'})
+    _, used = databases(lambda: client.get('/dashboard'))
+    check('GET /dashboard reads the replica', used == {'replica0'})
+
+    response, used = databases(lambda: client.post('/api/tasks', json={'title': 'Written to the primary'}))
+    new_task_id = response.get_json()['id']
+    check('POST /api/tasks uses only the primary', response.status_code == 201 and used == {'primary'})
+
+    def task_visible():
+        return any(task['id'] == new_task_id for task in client.get('/api/tasks?limit=200').get_json()['items'])
+
+    visible, used = databases(task_visible)
+    check('right after the write, GET reads the primary and sees the new task', visible and used == {'primary'})
+
+    time.sleep(args.window + 0.5)
+    visible, used = databases(task_visible)
+    check('after the window, GET reads the (lagging) replica again', not visible and used == {'replica0'})
+
+    replicate(primary_path, replica_path)
+    visible, used = databases(task_visible)
+    check('once replicated, the replica has the new task', visible and used == {'replica0'})
+
+    # A GET that writes switches to the primary for the rest of the request
+    with app.test_request_context('/api/tasks', method='GET'):
+        from models import Task
+        del served_by[:]
+        db.session.query(Task).filter_by(user_id=user_id).count()
+        db.session.add(Task(title='Written during a GET', user_id=user_id))
+        db.session.flush()
+        db.session.query(Task).filter_by(user_id=user_id).count()
+        db.session.rollback()
+        check('reads after a write in the same request use the primary',
+              served_by == ['replica0', 'primary', 'primary', 'primary'])
+
+    # An account that has not reached the replica can still sign in and browse
+    client.get('/logout')
+    client.post('/register', data={'username': 'newcomer', 'email': 'newcomer@example.com',
+                                   'password': 'newcomer1', 'confirm_password': 'newcomer1'})
+    client.post('/login', data={'username': 'newcomer', 'password': 'newcomer1'})
+    time.sleep(args.window + 0.5)
+    response, used = databases(lambda: client.get('/api/tasks'))
+    check('a user not yet on the replica is loaded from the primary',
+          response.status_code == 200 and 'primary' in used)
+
+    # The ASGI read API routes the same way
+    replicate(primary_path, replica_path)
+    client.post('/logout')
+    client.post('/login', data={'username': f'bench{user_id}', 'password': 'benchmark'})
+    asgi_app = AsyncAPI(app)
+    cookie = client.get_cookie('session').value
+
+    async def asgi_get(path):
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'root_path': '',
+                 'headers': [(b'cookie', f'session={cookie}'.encode())]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await asgi_app(scope, receive, send)
+        return messages[0]['status']
+
+    async def asgi_checks():
+        with app.app_context():
+            status = await asgi_get('/api/stats')
+        check('async GET /api/stats is answered from the replica',
+              status == 200 and set(asgi_app.engines) == {'replica0'})
+        client.post('/api/tasks', json={'title': 'Another write'})
+        with app.app_context():
+            await asgi_get(f'/api/schedule/{date.today().isoformat()}')
+        check('async GET right after a write uses the primary', None in asgi_app.engines)
+        for engine in asgi_app.engines.values():
+            await engine.dispose()
+
+    asyncio.run(asgi_checks())
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    import shutil
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print(f"\n{'All checks passed' if not failures else f'{len(failures)} check(s) failed'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for benchmarks
+Creates users with categories and a realistic spread of tasks (statuses, due
+dates, categories and completion history) using bulk inserts. The same seed
+always produces the same data. Users are added after any that already exist.
+Usage: python benchmarks/datagen.py [--users N] [--tasks N] [--seed N]
+The target database is taken from DATABASE_URL, as for the app itself.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+BATCH_SIZE = 5000
+
+CATEGORY_CHOICES = [
+    ('Work', '#007bff'), ('Personal', '#28a745'), ('Health', '#dc3545'),
+    ('Learning', '#ffc107'), ('Errands', '#6f42c1'), ('Finance', '#20c997'),
+]
+STATUS_WEIGHTS = {'todo': 0.45, 'in-progress': 0.15, 'done': 0.40}
+DURATIONS = [15, 30, 45, 60, 90, 120, 180, 240, 300]
+TIMEZONES = ['UTC', 'Europe/London', 'America/New_York', 'Asia/Tokyo', 'Africa/Cairo']
+
+def generate_rows(users, tasks_per_user, seed=42, first_number=1, history_days=180,
+                  password='benchmark', now=None):
+    """Build user, category and task rows as lists of dicts ready for bulk insert
+
+    Each user gets 2-6 categories and between half and one and a half times
+    tasks_per_user tasks. Due dates spread from a month overdue to two months
+    ahead (a fifth have none), about 15% of tasks are uncategorized, and done
+    tasks were completed some time in the last history_days days.
+
+    No row carries its own id. Until generate() swaps in the ids the database
+    assigns, user_id and category_id hold positions in user_rows and
+    category_rows. Usernames are numbered from first_number.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    password_hash = generate_password_hash(password)
+    statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+
+    user_rows, category_rows, task_rows = [], [], []
+    for user_index in range(users):
+        number = first_number + user_index
+        work_start = rng.choice([7, 8, 9, 10])
+        user_rows.append({
+            'username': f'bench{number}',
+            'email': f'bench{number}@example.com',
+            'password_hash': password_hash,
+            'timezone': rng.choice(TIMEZONES),
+            'work_start_hour': work_start,
+            'work_end_hour': work_start + rng.choice([7, 8, 9]),
+            'created_at': now - timedelta(days=history_days),
+        })
+
+        category_indexes = []
+        for name, color in rng.sample(CATEGORY_CHOICES, rng.randint(2, 6)):
+            category_indexes.append(len(category_rows))
+            category_rows.append({'name': name, 'color': color, 'user_id': user_index,
+                                  'created_at': now - timedelta(days=history_days)})
+
+        for i in range(rng.randint(tasks_per_user // 2, tasks_per_user * 3 // 2)):
+            status = rng.choices(statuses, status_weights)[0]
+            created_at = now - timedelta(minutes=rng.randint(0, history_days * 1440))
+            completed_at = None
+            if status == 'done':
+                completed_at = created_at + (now - created_at) * rng.random()
+
+            due_date = None
+            if rng.random() < 0.8:
+                due_date = now + timedelta(minutes=rng.randint(-30 * 1440, 60 * 1440))
+
+            task_rows.append({
+                'title': f'Task {i} for user {number}',
+                'description': 'Synthetic benchmark task' if rng.random() < 0.6 else None,
+                'due_date': due_date,
+                'estimated_duration': rng.choice(DURATIONS),
+                'priority': rng.randint(1, 5),
+                'status': status,
+                'user_id': user_index,
+                'category_id': rng.choice(category_indexes) if rng.random() < 0.85 else None,
+                'created_at': created_at,
+                'updated_at': completed_at or created_at,
+                'completed_at': completed_at,
+            })
+
+    return user_rows, category_rows, task_rows
+
+def insert_rows(session, model, rows):
+    """Bulk insert rows in batches, returning the ids the database assigned in row order
+
+    Letting the database pick ids keeps PostgreSQL sequences in step, so the
+    app's own inserts don't collide with generated rows afterwards.
+    """
+    ids = []
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    for start in range(0, len(rows), BATCH_SIZE):
+        ids.extend(session.scalars(statement, rows[start:start + BATCH_SIZE]))
+    return ids
+
+def generate(users=100, tasks_per_user=200, seed=42, **options):
+    """Insert a synthetic data set into the app database
+
+    Must be called inside an app context. Rollups are rebuilt afterwards since
+    bulk inserts bypass the ORM hooks that maintain them. Returns the ids of
+    the users created.
+    """
+    from app import db
+    from models import User, Category, Task, DailyTaskRollup
+
+    first_number = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    user_rows, category_rows, task_rows = generate_rows(
+        users, tasks_per_user, seed=seed, first_number=first_number, **options
+    )
+
+    user_ids = insert_rows(db.session, User, user_rows)
+    for row in category_rows:
+        row['user_id'] = user_ids[row['user_id']]
+    category_ids = insert_rows(db.session, Category, category_rows)
+    for row in task_rows:
+        row['user_id'] = user_ids[row['user_id']]
+        if row['category_id'] is not None:
+            row['category_id'] = category_ids[row['category_id']]
+    for start in range(0, len(task_rows), BATCH_SIZE):
+        db.session.execute(insert(Task), task_rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+    with db.engine.begin() as connection:
+        DailyTaskRollup.rebuild(connection)
+
+    return user_ids
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic users and tasks')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--tasks', type=int, default=200, help='average tasks per user')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if args.users < 1 or args.tasks < 0:
+        parser.error('Need at least one user and a non-negative task count')
+
+    from app import create_app, db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        user_ids = generate(args.users, args.tasks, args.seed)
+        print(f"✓ Created {len(user_ids)} user(s) (ids {user_ids[0]}-{user_ids[-1]}) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
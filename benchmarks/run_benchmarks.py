@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the scheduler, the utils aggregates and the main routes
+Generates a synthetic data set (see datagen.py) in a scratch SQLite database,
+times each benchmark on the user with the largest backlog and writes the
+results as JSON, optionally comparing them with an earlier run
+Usage: python benchmarks/run_benchmarks.py [--users N] [--tasks N] [--seed N]
+                                           [--repeat N] [--only TEXT]
+                                           [--database URL] [--output FILE]
+                                           [--compare FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Regressions beyond this relative change in median time are flagged
+REGRESSION_THRESHOLD = 0.10
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=400, help='average tasks per user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per benchmark')
+    parser.add_argument('--only', help='run only benchmarks whose name contains this text')
+    parser.add_argument('--database', help='database URL to add the synthetic data to (default: a scratch SQLite file)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='compare with results from an earlier run')
+    return parser.parse_args()
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_benchmarks(user_id, client):
+    """Named zero-argument callables; function benchmarks run in an app context"""
+    from app import db
+    from scheduler import TaskScheduler
+    from utils import (get_task_stats, get_category_stats, get_productivity_trends,
+                       calculate_productivity_score, get_priority_distribution,
+                       estimate_completion_time, forecast_completion)
+
+    scheduler = TaskScheduler(user_id)
+    tomorrow = date.today() + timedelta(days=1)
+
+    def save_daily_schedule():
+        scheduler.save_schedules({tomorrow: scheduler.generate_daily_schedule(tomorrow)})
+        db.session.commit()
+
+    def get(path):
+        def request():
+            response = client.get(path)
+            response.get_data()
+            assert response.status_code == 200, (path, response.status_code)
+        return request
+
+    def post(path, body):
+        def request():
+            response = client.post(path, json=body)
+            assert response.status_code < 400, (path, response.status_code)
+        return request
+
+    functions = {
+        'scheduler.generate_daily_schedule': lambda: scheduler.generate_daily_schedule(tomorrow),
+        'scheduler.generate_optimal_schedule': lambda: scheduler.generate_optimal_schedule(tomorrow),
+        'scheduler.generate_schedule_range_7d': lambda: scheduler.generate_schedule_range(tomorrow, 7),
+        'scheduler.save_schedules': save_daily_schedule,
+        'utils.get_task_stats': lambda: get_task_stats(user_id),
+        'utils.get_category_stats': lambda: get_category_stats(user_id),
+        'utils.get_productivity_trends_30d': lambda: get_productivity_trends(user_id, 30),
+        'utils.get_productivity_trends_all': lambda: get_productivity_trends(user_id, None),
+        'utils.calculate_productivity_score': lambda: calculate_productivity_score(user_id),
+        'utils.get_priority_distribution': lambda: get_priority_distribution(user_id),
+        'utils.estimate_completion_time': lambda: estimate_completion_time(user_id),
+        'utils.forecast_completion': lambda: forecast_completion(user_id),
+    }
+    routes = {
+        'route.dashboard': get('/dashboard'),
+        'route.tasks_page': get('/tasks'),
+        'route.api_tasks': get('/api/tasks?limit=50'),
+        'route.api_tasks_todo_by_priority': get('/api/tasks?status=todo&sort=priority&limit=200'),
+        'route.api_tasks_export': get('/api/tasks/export?format=ndjson'),
+        'route.api_stats': get('/api/stats'),
+        'route.api_stats_trends_all': get('/api/stats/trends?days=all'),
+        'route.api_stats_forecast': get('/api/stats/forecast'),
+        'route.api_schedule_generate': post('/api/schedule/generate', {'date': tomorrow.isoformat()}),
+    }
+    return functions, routes
+
+def measure(func, repeat, statements, in_app_context):
+    """Time a benchmark after one warm-up run, counting the SQL of one run"""
+    from main import app
+    from app import db
+
+    def run_once():
+        if not in_app_context:
+            func()
+            return
+        with app.app_context():
+            func()
+            db.session.remove()
+
+    run_once()
+    del statements[:]
+    run_once()
+    query_count = len(statements)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_once()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': query_count,
+        'runs': repeat,
+    }
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('revision') or 'unknown revision'}):")
+    print(f"{'benchmark':<40} {'before':>10} {'after':>10} {'change':>8}")
+    regressions = 0
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>10} {result['median_ms']:>8.2f}ms {'new':>8}")
+            continue
+        change = (result['median_ms'] - before['median_ms']) / before['median_ms'] if before['median_ms'] else 0
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            flag = '  slower'
+            regressions += 1
+        print(f"{name:<40} {before['median_ms']:>8.2f}ms {result['median_ms']:>8.2f}ms {change:>+7.0%}{flag}")
+    return regressions
+
+def main():
+    args = parse_args()
+
+    scratch_dir = None
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    else:
+        scratch_dir = tempfile.mkdtemp(prefix='bench-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}"
+    os.environ.setdefault('FLASK_ENV', 'production')
+    os.environ.setdefault('METRICS_ENABLED', '0')
+    os.environ.setdefault('CACHE_TYPE', 'memory')
+
+    import logging
+    from sqlalchemy import event, func
+    from main import app
+    from app import db
+    from models import Task
+    from datagen import generate
+
+    logging.disable(logging.CRITICAL)
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        user_ids = generate(args.users, args.tasks, args.seed)
+        generate_seconds = time.perf_counter() - start
+
+        # Benchmark the heaviest user so regressions in per-task work show up
+        user_id, task_count = db.session.query(Task.user_id, func.count(Task.id))\
+                                        .filter(Task.user_id.in_(user_ids))\
+                                        .group_by(Task.user_id)\
+                                        .order_by(func.count(Task.id).desc()).first()
+        username = f'bench{user_id}'
+        dialect = db.engine.dialect.name
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': 'benchmark'})
+    assert response.status_code == 302, 'benchmark login failed'
+
+    functions, routes = build_benchmarks(user_id, client)
+    print(f"Generated {args.users} user(s) in {generate_seconds:.1f}s; "
+          f"benchmarking user {user_id} with {task_count} task(s)\n")
+    print(f"{'benchmark':<40} {'median':>10} {'min':>10} {'queries':>8}")
+
+    results = {}
+    for benchmarks, in_app_context in ((functions, True), (routes, False)):
+        for name, func_ in benchmarks.items():
+            if args.only and args.only not in name:
+                continue
+            results[name] = measure(func_, args.repeat, statements, in_app_context)
+            result = results[name]
+            print(f"{name:<40} {result['median_ms']:>8.2f}ms {result['min_ms']:>8.2f}ms {result['queries']:>8}")
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'users': args.users,
+            'tasks_per_user': args.tasks,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'benchmark_user_tasks': task_count,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    regressions = compare(results, args.compare) if args.compare else 0
+
+    if scratch_dir is not None:
+        import shutil
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
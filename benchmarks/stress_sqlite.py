@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Stress test SQLite under mixed read/write load from several worker processes
+Seeds a fresh SQLite database per profile (see datagen.py), serves it with
+gunicorn (several gthread workers) and has concurrent clients, each logged
+in as its own user, hit the app's read and write endpoints. Reports
+throughput, latency, failed requests and "database is locked" errors in
+the server log
+Profiles: baseline (the settings SQLite and SQLAlchemy used before the SQLite
+production profile: rollback journal, synchronous=FULL, 5s busy timeout,
+default cache, no mmap, 5+10 pool), tuned (the SQLITE_* defaults) and
+readpool (tuned plus SQLITE_READ_POOL). tests/test_sqlite_concurrency.py
+checks the tuned profile under a smaller load on every test run
+Usage: python benchmarks/stress_sqlite.py [--profiles baseline,tuned,readpool]
+                                          [--clients N] [--duration SECONDS]
+                                          [--workers N] [--threads N]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = {
+    'baseline': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+                 'SQLITE_BUSY_TIMEOUT_MS': '5000', 'SQLITE_CACHE_SIZE_KB': '2000',
+                 'SQLITE_MMAP_SIZE_MB': '0', 'SQLITE_POOL_SIZE': '5', 'SQLITE_MAX_OVERFLOW': '10'},
+    'tuned': {},
+    'readpool': {'SQLITE_READ_POOL': '1'},
+}
+
+# (name, weight, is_write)
+OPERATIONS = [
+    ('list tasks', 25, False),
+    ('stats', 15, False),
+    ('export', 5, False),
+    ('dashboard', 5, False),
+    ('create task', 15, True),
+    ('update task', 15, True),
+    ('batch update', 10, True),
+    ('generate schedule', 10, True),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Stress test SQLite with mixed reads and writes')
+    parser.add_argument('--profiles', default='baseline,tuned,readpool')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load per profile')
+    parser.add_argument('--workers', type=int, default=3, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker')
+    parser.add_argument('--tasks', type=int, default=300, help='average tasks per user')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def seed_database(env, users, tasks, seed):
+    """Create and fill the database in a separate process with the profile's settings"""
+    script = ('import json, logging\n'
+              'from app import create_app, db\n'
+              'from datagen import generate\n'
+              'logging.disable(logging.CRITICAL)\n'
+              'app = create_app()\n'
+              'with app.app_context():\n'
+              '    db.create_all()\n'
+              f'    print(json.dumps(generate({users}, {tasks}, {seed})))\n')
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, capture_output=True, text=True,
+                            env=dict(env, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'benchmarks')])))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def start_server(port, env, workers, threads, log_path):
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+               '--timeout', '120', '--preload', 'main:app']
+    log = open(log_path, 'w')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server, log
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('server did not start')
+
+class Client:
+    def __init__(self, port, username, rng):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        self.rng = rng
+        status, headers, _ = self.request('POST', '/login', urlencode({'username': username, 'password': 'benchmark'}),
+                                          {'Content-Type': 'application/x-www-form-urlencoded'})
+        assert status == 302, 'login failed'
+        self.cookie = headers['Set-Cookie'].split(';', 1)[0]
+        _, _, body = self.request('GET', '/api/tasks?limit=200')
+        self.task_ids = [task['id'] for task in json.loads(body)['items']]
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if getattr(self, 'cookie', None):
+            headers['Cookie'] = self.cookie
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        # Retry once when the server has closed an idle keep-alive connection
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.connection.close()
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                break
+        return None, {}, b''
+
+    def run(self, operation):
+        rng = self.rng
+        if operation == 'list tasks':
+            return self.request('GET', f"/api/tasks?limit=50&sort={rng.choice(['due', 'priority'])}")
+        if operation == 'stats':
+            return self.request('GET', '/api/stats')
+        if operation == 'export':
+            return self.request('GET', '/api/tasks/export?format=ndjson')
+        if operation == 'dashboard':
+            return self.request('GET', '/dashboard')
+        if operation == 'create task':
+            return self.request('POST', '/api/tasks', {'title': 'Stress task', 'priority': rng.randint(1, 5),
+                                                       'estimated_duration': rng.choice([30, 60, 90])})
+        if operation == 'update task':
+            return self.request('PUT', f'/api/tasks/{rng.choice(self.task_ids)}',
+                                {'priority': rng.randint(1, 5), 'status': rng.choice(['todo', 'in-progress', 'done'])})
+        if operation == 'batch update':
+            return self.request('PATCH', '/api/tasks', {'ids': rng.sample(self.task_ids, 10),
+                                                        'changes': {'status': rng.choice(['todo', 'done'])}})
+        if operation == 'generate schedule':
+            day = date.today() + timedelta(days=rng.randint(1, 7))
+            return self.request('POST', '/api/schedule/generate', {'date': day.isoformat()})
+        raise ValueError(operation)
+
+def run_load(port, user_ids, clients, duration, seed):
+    names = [name for name, _, _ in OPERATIONS]
+    weights = [weight for _, weight, _ in OPERATIONS]
+    writes = {name for name, _, is_write in OPERATIONS if is_write}
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(clients + 1)
+    stop_at = [0]
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = Client(port, f'bench{user_ids[index % len(user_ids)]}', rng)
+        mine = []
+        start.wait()
+        while time.monotonic() < stop_at[0]:
+            operation = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            status, _, _ = client.run(operation)
+            mine.append((operation in writes, status, time.perf_counter() - started))
+        with lock:
+            results.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.monotonic() + duration
+    start.wait()
+    began = time.monotonic()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - began
+
+def summarize(profile, results, elapsed, locked_errors):
+    def latency(is_write, fraction):
+        values = sorted(seconds for write, status, seconds in results if write == is_write and status and status < 400)
+        if not values:
+            return float('nan')
+        return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+    failed = sum(1 for _, status, _ in results if status is None or status >= 500)
+    writes = sum(1 for write, status, _ in results if write and status and status < 400)
+    print(f"{profile:<9} {len(results) / elapsed:>7.0f} {writes / elapsed:>8.0f} "
+          f"{latency(False, 0.5):>8.1f}ms {latency(False, 0.99):>8.1f}ms "
+          f"{latency(True, 0.5):>8.1f}ms {latency(True, 0.99):>8.1f}ms {failed:>7} {locked_errors:>7}")
+    return failed + locked_errors
+
+def main():
+    args = parse_args()
+    print(f"{args.clients} client(s), {args.workers} worker(s) x {args.threads} thread(s), "
+          f"{args.duration:.0f}s per profile\n")
+    print(f"{'profile':<9} {'req/s':>7} {'writes/s':>8} {'read p50':>10} {'read p99':>10} "
+          f"{'write p50':>10} {'write p99':>10} {'failed':>7} {'locked':>7}")
+
+    problems = 0
+    for profile in args.profiles.split(','):
+        with tempfile.TemporaryDirectory(prefix='stress-sqlite-') as scratch_dir:
+            env = dict(os.environ, FLASK_ENV='production', METRICS_ENABLED='0', CACHE_TYPE='file',
+                       CACHE_DIR=os.path.join(scratch_dir, 'cache'), LOG_LEVEL='WARNING',
+                       DATABASE_URL=f"sqlite:///{os.path.join(scratch_dir, 'stress.db')}",
+                       SQLITE_READ_POOL='0')
+            env.update(PROFILES[profile])
+            user_ids = seed_database(env, args.clients, args.tasks, args.seed)
+
+            port = free_port()
+            log_path = os.path.join(scratch_dir, 'server.log')
+            server, log = start_server(port, env, args.workers, args.threads, log_path)
+            try:
+                results, elapsed = run_load(port, user_ids, args.clients, args.duration, args.seed)
+            finally:
+                server.terminate()
+                server.wait()
+                log.close()
+
+            with open(log_path, encoding='utf-8', errors='replace') as f:
+                server_log = f.read()
+            locked_errors = server_log.count('database is locked')
+            problems += summarize(profile, results, elapsed, locked_errors)
+
+    sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import os
+import glob
+import asyncio
+import time
+import uuid
+import select
+import socket
+import logging
+import threading
+
+
+class Subscription:
+    """A listener for change notifications about one user"""
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self._event = threading.Event()
+
+    def notify(self):
+        self._event.set()
+
+    def wait(self, timeout=None):
+        """Wait for a change notification, returning False on timeout"""
+        notified = self._event.wait(timeout)
+        self._event.clear()
+        return notified
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncSubscription(Subscription):
+    """A listener for change notifications awaited on the running event loop
+
+    Notifications arrive from request threads or a broker's listener thread
+    and are handed over to the loop, so waiting never holds a thread.
+    """
+
+    def __init__(self, broker, user_id):
+        super().__init__(broker, user_id)
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # The loop has shut down; nobody is waiting any more
+            pass
+
+    async def wait(self, timeout=None):
+        """Wait for a change notification, returning False on timeout"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            notified = True
+        except asyncio.TimeoutError:
+            notified = False
+        self._event.clear()
+        return notified
+
+
+class MemoryBroker:
+    """In-process change notifications (single worker only)
+
+    Also used by the multi-worker brokers to fan a received notification out
+    to the subscribers of the current process.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        return self._add(Subscription(self, user_id))
+
+    def subscribe_async(self, user_id):
+        """Subscribe from a coroutine; the subscription's wait() is awaitable"""
+        return self._add(AsyncSubscription(self, user_id))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id):
+        """Tell everyone watching a user that their data changed"""
+        self._deliver(user_id)
+
+    def publish_in_transaction(self, connection, user_id):
+        """Queue a notification on a database connection, sent if its transaction commits
+
+        Returns False when the broker can't, and the caller should publish()
+        after committing instead.
+        """
+        return False
+
+    def _deliver(self, user_id):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+
+
+class ListenerBroker(MemoryBroker):
+    """Base for brokers that receive notifications on a background thread
+
+    The listener is started on the first subscription in each process, so
+    worker processes forked after the app is imported get their own.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+        self._listener_pid = None
+
+    def _add(self, subscription):
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                self._listener_pid = os.getpid()
+                self._listener = threading.Thread(target=self._listen_forever, daemon=True)
+                self._listener.start()
+        return super()._add(subscription)
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logging.exception('Change notification listener failed, restarting')
+                time.sleep(1)
+
+    def _listen(self):
+        raise NotImplementedError
+
+
+class SocketBroker(ListenerBroker):
+    """Change notifications between worker processes on one host
+
+    Every process with subscribers binds a Unix datagram socket in a shared
+    directory; publishing sends the user id to each socket found there.
+    """
+
+    def __init__(self, socket_dir):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError('The socket broker requires Unix domain sockets')
+        super().__init__()
+        self.socket_dir = socket_dir
+        os.makedirs(socket_dir, exist_ok=True)
+        self._sender = None
+
+    def publish(self, user_id):
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+        payload = str(user_id).encode('ascii')
+        for path in glob.glob(os.path.join(self.socket_dir, '*.sock')):
+            try:
+                self._sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a process that has exited
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                # A full receive buffer only delays that process until its
+                # next periodic check, so never block the publisher on it
+                pass
+
+    def _listen(self):
+        path = os.path.join(self.socket_dir, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(path)
+        try:
+            while True:
+                payload = receiver.recv(64)
+                try:
+                    self._deliver(int(payload))
+                except ValueError:
+                    continue
+        finally:
+            receiver.close()
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+class PostgresBroker(ListenerBroker):
+    """Change notifications through PostgreSQL LISTEN/NOTIFY
+
+    Works across processes and hosts sharing the database. Each process
+    holds one extra connection for listening while it has subscribers.
+    Requests send their notification inside their own transaction, so it
+    costs no extra connection and is only delivered if they commit.
+    """
+
+    # Publishers bump the stats version right after their commit, which can
+    # race the notification to a listener in another process; a short pause
+    # before delivering lets the new version land first
+    DELIVERY_DELAY = 0.1
+
+    def __init__(self, database_uri, channel='stats_changes'):
+        super().__init__()
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import NullPool
+        self.channel = channel
+        self._engine = create_engine(database_uri, poolclass=NullPool)
+
+    def publish(self, user_id):
+        with self._engine.begin() as connection:
+            self._notify(connection, user_id)
+
+    def publish_in_transaction(self, connection, user_id):
+        if connection.dialect.name != 'postgresql':
+            return False
+        self._notify(connection, user_id)
+        return True
+
+    def _notify(self, connection, user_id):
+        from sqlalchemy import text
+        connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                           {'channel': self.channel, 'payload': str(user_id)})
+
+    def _listen(self):
+        raw_connection = self._engine.raw_connection()
+        try:
+            connection = raw_connection.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            while True:
+                if select.select([connection], [], [], 60) == ([], [], []):
+                    continue
+                time.sleep(self.DELIVERY_DELAY)
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    try:
+                        self._deliver(int(notify.payload))
+                    except ValueError:
+                        continue
+        finally:
+            raw_connection.close()
+
+
+def create_broker(config):
+    """Build the change notification broker selected by the BROKER_TYPE setting"""
+    broker_type = config.get('BROKER_TYPE', 'memory')
+
+    if broker_type == 'memory':
+        return MemoryBroker()
+    if broker_type == 'socket':
+        return SocketBroker(config['BROKER_DIR'])
+    if broker_type == 'postgres':
+        return PostgresBroker(config['SQLALCHEMY_DATABASE_URI'],
+                              channel=config.get('BROKER_CHANNEL', 'stats_changes'))
+    raise ValueError(f'Unknown broker type: {broker_type}')
+
+
+class Broker:
+    """Change notification extension bound to an app by init_app"""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = create_broker(app.config)
+        app.extensions['broker'] = self.backend
+
+    def __getattr__(self, name):
+        if self.backend is None:
+            raise RuntimeError('Broker is not initialised; create the app with create_app() first')
+        return getattr(self.backend, name)
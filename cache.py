@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class BaseCache:
+    """Minimal key/value cache interface used for per-user dashboard data"""
+
+    # Whether calls do blocking I/O, so async code must make them off the event loop
+    blocking = False
+
+    def __init__(self, default_timeout=300):
+        self.default_timeout = default_timeout
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, timeout=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def _expires_at(self, timeout):
+        timeout = self.default_timeout if timeout is None else timeout
+        return time.time() + timeout if timeout else None
+
+    # Per-user data versions
+    def get_user_version(self, user_id):
+        """Get the current data version for a user, creating one if missing"""
+        key = f'user-version:{user_id}'
+        version = self.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            self.set(key, version, timeout=0)
+        return version
+
+    def bump_user_version(self, user_id):
+        """Invalidate everything cached for a user by rotating their version"""
+        self.set(f'user-version:{user_id}', uuid.uuid4().hex, timeout=0)
+
+
+class MemoryCache(BaseCache):
+    """In-process LRU cache with per-entry TTL (single worker only)"""
+
+    def __init__(self, default_timeout=300, max_entries=1024):
+        super().__init__(default_timeout)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._entries[key] = (value, self._expires_at(timeout))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class FileCache(BaseCache):
+    """Cache shared between worker processes through a local directory
+
+    Values must be JSON serializable. Writes go to a temporary file that is
+    atomically renamed into place, so concurrent readers never see partial
+    entries. Entries that are never read again (such as bundles for old user
+    versions) are removed by a sweep that each process runs on writes, at
+    most once per sweep interval.
+    """
+
+    blocking = True
+
+    def __init__(self, cache_dir, default_timeout=300, sweep_interval=300):
+        super().__init__(default_timeout)
+        self.cache_dir = cache_dir
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    @staticmethod
+    def _is_entry(name):
+        # The directory may be shared with other state (broker sockets,
+        # batch progress), so only touch files named like entries
+        return len(name) == 40 and all(c in '0123456789abcdef' for c in name)
+
+    def sweep(self):
+        """Delete expired entries, returning how many were removed"""
+        now = time.time()
+        self._next_sweep = now + self.sweep_interval
+        removed = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if not self._is_entry(name):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    expires_at = json.load(f).get('expires_at')
+                if expires_at is not None and expires_at <= now:
+                    os.unlink(path)
+                    removed += 1
+            except (OSError, ValueError, AttributeError):
+                continue
+        return removed
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return entry.get('value')
+
+    def set(self, key, value, timeout=None):
+        entry = {'value': value, 'expires_at': self._expires_at(timeout)}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        if self.sweep_interval and time.time() >= self._next_sweep:
+            self.sweep()
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+
+def create_cache(config):
+    """Build the cache backend selected by the CACHE_TYPE setting"""
+    cache_type = config.get('CACHE_TYPE', 'memory')
+    timeout = config.get('CACHE_DEFAULT_TIMEOUT', 300)
+
+    if cache_type == 'file':
+        return FileCache(config['CACHE_DIR'], default_timeout=timeout,
+                         sweep_interval=config.get('CACHE_SWEEP_INTERVAL', 300))
+    if cache_type == 'memory':
+        return MemoryCache(default_timeout=timeout,
+                           max_entries=config.get('CACHE_MAX_ENTRIES', 1024))
+    raise ValueError(f'Unknown cache type: {cache_type}')
+
+
+class Cache:
+    """Cache extension bound to an app by init_app
+
+    Modules import the module-level instance from app.py at any time; calls
+    are delegated to the backend built from the app's configuration.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = create_cache(app.config)
+        app.extensions['cache'] = self.backend
+
+    def __getattr__(self, name):
+        if self.backend is None:
+            raise RuntimeError('Cache is not initialised; create the app with create_app() first')
+        return getattr(self.backend, name)
@@ -1,6 +1,14 @@
 import os
 from urllib.parse import urlparse
 
+def is_sqlite_file(database_url):
+    """Whether a database URL names a SQLite database file (not an in-memory database)"""
+    url = urlparse(database_url)
+    if not url.scheme.startswith('sqlite'):
+        return False
+    database = url.path.lstrip('/')
+    return bool(database) and database != ':memory:' and 'mode=memory' not in url.query
+
 class Config:
     """Base configuration class."""
     
@@ -10,6 +18,24 @@ class Config:
     # Database settings
     DATABASE_URL = os.environ.get('DATABASE_URL')
     
+    # SQLite tuning, applied to every connection through PRAGMAs. In WAL mode
+    # readers run alongside the writer, and writers queue for up to the busy
+    # timeout instead of failing with "database is locked". SQLITE_READ_POOL
+    # adds a separate pool of query-only connections for plain SELECTs.
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384))
+    SQLITE_MMAP_SIZE_MB = int(os.environ.get('SQLITE_MMAP_SIZE_MB', 256))
+    SQLITE_READ_POOL = os.environ.get('SQLITE_READ_POOL', '0') == '1'
+    # Pool settings for SQLite database files. An in-memory database lives in
+    # a single shared connection, so it keeps the driver's own pool.
+    SQLITE_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('SQLITE_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('SQLITE_MAX_OVERFLOW', 10)),
+        'pool_timeout': 30
+    }
+    
     if DATABASE_URL:
         # Parse the database URL
         url = urlparse(DATABASE_URL)
@@ -23,16 +49,109 @@ class Config:
                 'pool_size': 10,
                 'max_overflow': 20
             }
+        elif url.scheme.startswith('sqlite'):
+            SQLALCHEMY_DATABASE_URI = DATABASE_URL
+            SQLALCHEMY_ENGINE_OPTIONS = dict(SQLITE_ENGINE_OPTIONS) if is_sqlite_file(DATABASE_URL) else {}
         else:
             SQLALCHEMY_DATABASE_URI = DATABASE_URL
             SQLALCHEMY_ENGINE_OPTIONS = {}
     else:
-        # SQLite fallback for local development
+        # SQLite fallback for local development and small single-node deployments
         basedir = os.path.abspath(os.path.dirname(__file__))
         SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(basedir, "tasks.db")}'
-        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_ENGINE_OPTIONS = dict(SQLITE_ENGINE_OPTIONS)
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Read replicas (comma separated URLs). GET requests read from a replica,
+    # while other requests, and reads after a write, use the primary. After a
+    # user commits a change, their reads stay on the primary for
+    # REPLICA_STICKY_SECONDS so replication lag doesn't hide their writes
+    # (multi-worker setups need CACHE_TYPE=file for this to cover all workers).
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri.strip()]
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
+    # Root log level, applied only when the server hasn't configured logging
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    
+    # Cache settings ('memory' for a single worker, 'file' to share between workers)
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'memory')
+    CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(os.path.abspath(os.path.dirname(__file__)), '.cache')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    # How often each worker deletes expired entries from CACHE_DIR (0 disables)
+    CACHE_SWEEP_INTERVAL = int(os.environ.get('CACHE_SWEEP_INTERVAL', 300))
+    
+    # Dashboard stats include time-dependent counters (overdue, due today), so
+    # cached stats are also rotated on this interval even without data changes
+    STATS_CACHE_TIMEOUT = int(os.environ.get('STATS_CACHE_TIMEOUT', 300))
+    
+    # Seconds the user loader may serve a cached user snapshot instead of
+    # querying the users table (0 disables the cache). Snapshots are also
+    # dropped when the user row changes or the user logs out.
+    USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+    
+    # Dashboard change notifications for /api/stats/stream ('memory' for a
+    # single worker, 'socket' for several workers on one host, 'postgres' for
+    # LISTEN/NOTIFY across hosts)
+    BROKER_TYPE = os.environ.get('BROKER_TYPE', 'memory')
+    BROKER_DIR = os.environ.get('BROKER_DIR') or os.path.join(os.path.abspath(os.path.dirname(__file__)), '.cache', 'broker')
+    BROKER_CHANNEL = os.environ.get('BROKER_CHANNEL', 'stats_changes')
+    
+    # Stats streams send a keepalive (and re-check time-dependent counters) at
+    # this interval, and are closed after the max age so the browser
+    # reconnects and worker threads are recycled
+    STATS_STREAM_KEEPALIVE = int(os.environ.get('STATS_STREAM_KEEPALIVE', 15))
+    STATS_STREAM_MAX_AGE = int(os.environ.get('STATS_STREAM_MAX_AGE', 300))
+    # Under asgi:app streams wait on the event loop. Streams served by Flask
+    # itself (no ASGI server, or a session only the remember cookie can
+    # restore) hold a thread each, so each process serves at most this many
+    # and answers the rest with 503, which makes the dashboard poll instead
+    STATS_STREAM_WSGI_LIMIT = int(os.environ.get('STATS_STREAM_WSGI_LIMIT', 2))
+    
+    # Request and database instrumentation exposed on /metrics. Scrapes must
+    # send "Authorization: Bearer <METRICS_TOKEN>"; while METRICS_TOKEN is
+    # unset /metrics answers 404. Set METRICS_PROFILE_TOKEN to allow cProfile
+    # capture of single requests sent with an "X-Profile: <token>" header
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1.0))
+    METRICS_SLOW_QUERY_MS = int(os.environ.get('METRICS_SLOW_QUERY_MS', 250))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PROFILE_TOKEN = os.environ.get('METRICS_PROFILE_TOKEN')
+    METRICS_PROFILE_DIR = os.environ.get('METRICS_PROFILE_DIR') or os.path.join(os.path.abspath(os.path.dirname(__file__)), '.cache', 'profiles')
+    
+    # Threads per worker running the Flask routes when served through asgi.py
+    # (the async read endpoints run on the event loop instead)
+    ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 8))
+    
+    # Task list pagination
+    TASKS_PAGE_SIZE = 50
+    MAX_TASKS_PAGE_SIZE = 200
+    
+    # Rows fetched per round trip when streaming task exports
+    EXPORT_BATCH_SIZE = 1000
+    
+    # Rows inserted per statement by task imports, and errors reported back
+    IMPORT_BATCH_SIZE = 1000
+    IMPORT_MAX_ERRORS = 1000
+    
+    # Days of completed work that completion forecasts base the user's pace on
+    FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', 28))
+    
+    # Largest number of tasks a single batch update may touch
+    MAX_BATCH_UPDATE = 1000
+    
+    # Daily schedule solver used when a request doesn't choose one ('greedy'
+    # or 'optimal'), and the wall-clock limit on the optimal solver's search
+    SCHEDULE_SOLVER = os.environ.get('SCHEDULE_SOLVER', 'greedy')
+    SCHEDULE_SOLVER_TIME_BUDGET_MS = int(os.environ.get('SCHEDULE_SOLVER_TIME_BUDGET_MS', 200))
+    
+    # Nightly schedule generation (generate_schedules.py): worker processes
+    # (0 means one per CPU), users per transaction, and where progress of an
+    # interrupted run is kept so it can resume
+    SCHEDULE_BATCH_WORKERS = int(os.environ.get('SCHEDULE_BATCH_WORKERS', 0))
+    SCHEDULE_BATCH_CHUNK_SIZE = int(os.environ.get('SCHEDULE_BATCH_CHUNK_SIZE', 500))
+    SCHEDULE_BATCH_STATE_DIR = os.environ.get('SCHEDULE_BATCH_STATE_DIR') or os.path.join(os.path.abspath(os.path.dirname(__file__)), '.cache')
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -42,19 +161,24 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     
-    # Enhanced security for production
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_recycle': 300,
-        'pool_pre_ping': True,
-        'pool_size': 20,
-        'max_overflow': 30,
-        'echo': False
-    }
+    # Enhanced security for production (SQLite keeps its own pool settings)
+    if not Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_recycle': 300,
+            'pool_pre_ping': True,
+            'pool_size': 20,
+            'max_overflow': 30,
+            'echo': False
+        }
 
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_REPLICA_URIS = []
+    CACHE_TYPE = 'memory'
+    BROKER_TYPE = 'memory'
 
 # Configuration mapping
 config = {
@@ -0,0 +1,145 @@
+import random
+import logging
+from flask import current_app, g, has_request_context, request, session as flask_session
+from sqlalchemy import event
+from flask_sqlalchemy.session import Session
+from config import is_sqlite_file
+
+# Bind key of the optional read-only SQLite pool (SQLITE_READ_POOL)
+READ_BIND = 'read'
+
+# Bind keys of read replicas are this prefix plus their position in
+# SQLALCHEMY_REPLICA_URIS
+REPLICA_BIND_PREFIX = 'replica'
+
+# Session.info flag set once a transaction has written through the primary pool
+WROTE_KEY = 'wrote'
+
+# Replicas only serve requests that can't change data
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+def replica_bind_keys(config):
+    return [f'{REPLICA_BIND_PREFIX}{index}' for index in range(len(config['SQLALCHEMY_REPLICA_URIS']))]
+
+def is_read_bind(bind_key):
+    return bind_key == READ_BIND or (bind_key or '').startswith(REPLICA_BIND_PREFIX)
+
+def configure_read_binds(app):
+    """Add the read pool and replicas as Flask-SQLAlchemy binds; call before db.init_app"""
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if app.config['SQLITE_READ_POOL'] and is_sqlite_file(uri):
+        binds[READ_BIND] = uri
+    for bind_key, replica_uri in zip(replica_bind_keys(app.config), app.config['SQLALCHEMY_REPLICA_URIS']):
+        binds[bind_key] = replica_uri
+
+def recent_write_key(user_id):
+    return f'recent-write:{user_id}'
+
+def replica_bind_for(user_id):
+    """Pick a replica for a user's reads, or None while they must read the primary
+
+    A user reads from the primary for REPLICA_STICKY_SECONDS after committing
+    a change, so replication lag never hides their own writes.
+    """
+    bind_keys = replica_bind_keys(current_app.config)
+    if not bind_keys:
+        return None
+    if user_id is not None and current_app.extensions['cache'].get(recent_write_key(user_id)) is not None:
+        return None
+    return random.choice(bind_keys)
+
+def _request_read_bind():
+    """Bind for plain SELECTs in the current request, chosen once per request"""
+    if 'read_bind_key' not in g:
+        bind_key = None
+        if request.method in SAFE_METHODS:
+            bind_key = replica_bind_for(flask_session.get('_user_id'))
+        g.read_bind_key = bind_key
+    return g.read_bind_key
+
+def sqlite_pragmas(config, read_only=False):
+    """PRAGMA statements applying the SQLITE_* settings to a new connection"""
+    # Wait for locks before anything else, including the journal mode switch
+    pragmas = [f"PRAGMA busy_timeout = {config['SQLITE_BUSY_TIMEOUT_MS']}"]
+    if read_only:
+        pragmas.append('PRAGMA query_only = ON')
+    else:
+        pragmas.append(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+    pragmas += [
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        # Negative sizes are in KiB rather than pages
+        f"PRAGMA cache_size = -{config['SQLITE_CACHE_SIZE_KB']}",
+        f"PRAGMA mmap_size = {config['SQLITE_MMAP_SIZE_MB'] * 1024 * 1024}",
+    ]
+    return pragmas
+
+def configure_sqlite(engine, config, read_only=False):
+    """Apply the SQLite pragmas to every connection the engine opens
+
+    Does nothing for other databases. Pass engine.sync_engine for async
+    engines.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config, read_only)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                try:
+                    cursor.execute(pragma)
+                except engine.dialect.dbapi.OperationalError as e:
+                    # The journal mode can't change while another process is
+                    # using the database. It is persistent, so a later
+                    # connection (or init_db.py) switches it instead.
+                    if 'journal_mode' not in pragma:
+                        raise
+                    logging.warning('Could not apply %s: %s', pragma, e)
+        finally:
+            cursor.close()
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to a replica or the read pool
+
+    Replicas are used for requests with safe methods, except during a
+    user's read-your-writes window; otherwise reads go to the read pool when
+    there is one. After the first write in a transaction, every statement
+    goes to the primary until the transaction ends, so the transaction
+    reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get(WROTE_KEY):
+            if not self._flushing and _is_plain_select(clause):
+                engines = self._db.engines
+                bind_key = _request_read_bind() if has_request_context() else None
+                if bind_key is None and READ_BIND in engines:
+                    bind_key = READ_BIND
+                if bind_key is not None:
+                    return engines[bind_key]
+            else:
+                self.info[WROTE_KEY] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _is_plain_select(clause):
+    return (clause is not None and getattr(clause, 'is_select', False)
+            and getattr(clause, '_for_update_arg', None) is None)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _start_read_your_writes_window(session):
+    if not session.info.get(WROTE_KEY) or not has_request_context():
+        return
+    # Later reads in this request go to the primary
+    g.read_bind_key = None
+    seconds = current_app.config['REPLICA_STICKY_SECONDS']
+    user_id = flask_session.get('_user_id')
+    if user_id is not None and seconds and current_app.config['SQLALCHEMY_REPLICA_URIS']:
+        current_app.extensions['cache'].set(recent_write_key(user_id), True, timeout=seconds)
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(WROTE_KEY, None)
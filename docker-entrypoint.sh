@@ -0,0 +1,6 @@
+#!/bin/sh
+# Create missing tables and apply pending migrations before starting the
+# server; both are safe to repeat on every start
+set -e
+python init_db.py
+exec "$@"
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Nightly schedule generation for Smart Task Manager
+Generates next-day schedules for every user in their own timezone and work
+hours, sharding users across a pool of worker processes
+
+Users are processed in chunks of consecutive ids. Each chunk reads its users,
+pending tasks and stored schedules in three queries, writes the schedule diff
+with bulk statements and commits, so a chunk is either fully applied or not
+at all. Finished chunks are recorded in a checkpoint file; re-running after an
+interruption skips them, and re-running a chunk is harmless because only the
+differences from the stored schedules are written.
+
+Usage: python generate_schedules.py [--workers N] [--chunk-size N] [--date YYYY-MM-DD] [--restart]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app import create_app
+from database import configure_sqlite
+from models import User, Task, Category, Schedule
+from scheduler import TaskScheduler, apply_schedule_changes
+from utils import notify_user_changed
+
+app = create_app()
+
+# Engine of the current worker process, created by init_worker
+_engine = None
+
+def create_worker_engine():
+    """Create an engine owned by this process (pooled connections never cross a fork)"""
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'],
+                           **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    configure_sqlite(engine, app.config)
+    return engine
+
+def init_worker():
+    global _engine
+    _engine = create_worker_engine()
+
+@lru_cache(maxsize=None)
+def get_zone(timezone):
+    """Look up a timezone once per process, falling back to UTC for unknown names"""
+    try:
+        return ZoneInfo(timezone or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+def next_schedule_date(timezone, now):
+    """Tomorrow's date in the given timezone"""
+    return (now.astimezone(get_zone(timezone)) + timedelta(days=1)).date()
+
+def work_hours(user):
+    """A user's work hours, or the 9-17 default when unset or inconsistent"""
+    start = user.work_start_hour if user.work_start_hour is not None else 9
+    end = user.work_end_hour if user.work_end_hour is not None else 17
+    if not 0 <= start < end <= 24:
+        return 9, 17
+    return start, end
+
+def generate_chunk(user_ids, schedule_date=None, now=None):
+    """Generate and store schedules for one chunk of users in one transaction
+
+    Returns a summary dict with user, item and write counts, the users whose
+    schedule changed and (user_id, error) pairs for users that failed.
+    """
+    if now is None:
+        now = datetime.now(ZoneInfo('UTC'))
+    summary = {'users': 0, 'items': 0, 'inserted': 0, 'updated': 0, 'deleted': 0,
+               'changed_users': [], 'failed': []}
+
+    with Session(_engine) as session:
+        users = session.execute(
+            select(User.id, User.timezone, User.work_start_hour, User.work_end_hour)
+            .where(User.id.in_(user_ids))
+        ).all()
+
+        targets = {user.id: schedule_date or next_schedule_date(user.timezone, now) for user in users}
+        if not targets:
+            return summary
+
+        rows_by_user = {}
+        for row in session.execute(
+            select(Task.user_id, Task.id, Task.title, Task.due_date, Task.priority,
+                   Task.estimated_duration,
+                   Category.name.label('category_name'),
+                   Category.color.label('category_color'))
+            .outerjoin(Category, Task.category_id == Category.id)
+            .where(Task.user_id.in_(list(targets)), Task.status == 'todo')
+            .order_by(Task.user_id, Task.due_date.asc().nullslast(), Task.id)
+        ):
+            rows_by_user.setdefault(row.user_id, []).append(row)
+
+        stored_by_user = {}
+        for row in session.execute(
+            select(Schedule.id, Schedule.user_id, Schedule.schedule_date, Schedule.task_id,
+                   Schedule.start_time, Schedule.end_time)
+            .where(Schedule.user_id.in_(list(targets)),
+                   Schedule.schedule_date.in_(list(set(targets.values()))))
+            .order_by(Schedule.start_time, Schedule.id)
+        ):
+            if row.schedule_date == targets[row.user_id]:
+                stored_by_user.setdefault(row.user_id, {})\
+                              .setdefault(row.schedule_date, []).append(row)
+
+        inserts, updates, deletes = [], [], []
+        for user in users:
+            try:
+                scheduler = TaskScheduler(user.id)
+                work_start, work_end = work_hours(user)
+                target = targets[user.id]
+                items = scheduler.generate_daily_schedule(
+                    target, work_start, work_end, rows=rows_by_user.get(user.id, [])
+                )
+                user_inserts, user_updates, user_deletes, diff = scheduler.diff_schedules(
+                    {target: items}, stored_by_user.get(user.id, {})
+                )
+            except Exception as e:
+                summary['failed'].append((user.id, repr(e)))
+                continue
+
+            inserts.extend(user_inserts)
+            updates.extend(user_updates)
+            deletes.extend(user_deletes)
+            summary['users'] += 1
+            summary['items'] += len(items)
+            if user_inserts or user_updates or user_deletes:
+                summary['changed_users'].append(user.id)
+
+        apply_schedule_changes(session, inserts, updates, deletes)
+        for user_id in summary['changed_users']:
+            notify_user_changed(user_id, session)
+        session.commit()
+
+    summary['inserted'], summary['updated'], summary['deleted'] = len(inserts), len(updates), len(deletes)
+    return summary
+
+def run_chunk(user_ids, schedule_date=None):
+    """Worker entry point: generate a chunk, reporting a whole-chunk failure instead of raising"""
+    try:
+        return user_ids, generate_chunk(user_ids, schedule_date), None
+    except Exception as e:
+        return user_ids, None, repr(e)
+
+class Checkpoint:
+    """Ranges of user ids already handled by a run, kept in a JSON file"""
+
+    def __init__(self, path, run_key):
+        self.path = path
+        self.run_key = run_key
+        self.done = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('run') == run_key:
+            self.done = [tuple(done_range) for done_range in state.get('done', [])]
+
+    def is_done(self, user_id):
+        return any(first <= user_id <= last for first, last in self.done)
+
+    def mark_done(self, user_ids):
+        self.done.append((min(user_ids), max(user_ids)))
+        self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'run': self.run_key, 'done': self.done}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+def generate_all(workers=None, chunk_size=None, schedule_date=None, restart=False):
+    """Generate next-day schedules for all users, returning (totals, failures)"""
+    workers = workers or app.config['SCHEDULE_BATCH_WORKERS'] or os.cpu_count() or 1
+    chunk_size = chunk_size or app.config['SCHEDULE_BATCH_CHUNK_SIZE']
+
+    # Users in timezones already past midnight UTC still get their own tomorrow,
+    # so a run is identified by its UTC start date unless the date is forced
+    run_key = (schedule_date or datetime.utcnow().date()).isoformat()
+    checkpoint = Checkpoint(
+        os.path.join(app.config['SCHEDULE_BATCH_STATE_DIR'], f'nightly-schedules-{run_key}.json'),
+        run_key
+    )
+    if restart:
+        checkpoint.done = []
+
+    engine = create_worker_engine()
+    with engine.connect() as connection:
+        user_ids = [user_id for user_id in connection.scalars(select(User.id).order_by(User.id))
+                    if not checkpoint.is_done(user_id)]
+    engine.dispose()
+
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    print(f"Generating schedules for {len(user_ids)} user(s) in {len(chunks)} chunk(s) "
+          f"with {workers} worker(s)" + (f", resuming run {run_key}" if checkpoint.done else ""))
+
+    totals = {'users': 0, 'items': 0, 'inserted': 0, 'updated': 0, 'deleted': 0}
+    failures = []
+    started = time.perf_counter()
+
+    def record(user_ids, summary, error):
+        if error is not None:
+            failures.extend((user_id, error) for user_id in user_ids)
+            print(f"  ✗ users {user_ids[0]}-{user_ids[-1]}: {error}")
+            return
+        for key in totals:
+            totals[key] += summary[key]
+        failures.extend(summary['failed'])
+        if not summary['failed']:
+            checkpoint.mark_done(user_ids)
+        elapsed = time.perf_counter() - started
+        print(f"  ✓ users {user_ids[0]}-{user_ids[-1]}: {summary['users']} scheduled, "
+              f"{len(summary['failed'])} failed ({totals['users'] / elapsed:.0f} users/s)")
+
+    if workers == 1:
+        init_worker()
+        for chunk in chunks:
+            record(*run_chunk(chunk, schedule_date))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            futures = [executor.submit(run_chunk, chunk, schedule_date) for chunk in chunks]
+            for future in as_completed(futures):
+                record(*future.result())
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Scheduled {totals['users']} user(s), {totals['items']} item(s) in {elapsed:.1f}s "
+          f"({totals['users'] / elapsed if elapsed else 0:.0f} users/s); "
+          f"{totals['inserted']} inserted, {totals['updated']} updated, {totals['deleted']} deleted")
+    if failures:
+        print(f"✗ {len(failures)} user(s) failed:")
+        for user_id, error in failures[:20]:
+            print(f"  user {user_id}: {error}")
+    else:
+        checkpoint.clear()
+    return totals, failures
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Generate next-day schedules for all users')
+    parser.add_argument('--workers', type=int, help='worker processes (default: SCHEDULE_BATCH_WORKERS or one per CPU)')
+    parser.add_argument('--chunk-size', type=int, help='users per transaction (default: SCHEDULE_BATCH_CHUNK_SIZE)')
+    parser.add_argument('--date', help="schedule this date (YYYY-MM-DD) instead of each user's tomorrow")
+    parser.add_argument('--restart', action='store_true', help='ignore progress saved by an interrupted run')
+    args = parser.parse_args()
+
+    schedule_date = None
+    if args.date:
+        try:
+            schedule_date = datetime.strptime(args.date, '%Y-%m-%d').date()
+        except ValueError:
+            parser.error('Invalid date format')
+
+    _, failures = generate_all(args.workers, args.chunk_size, schedule_date, args.restart)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
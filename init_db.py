@@ -7,8 +7,11 @@ Creates all database tables and optionally seeds with sample data
 import os
 import sys
 from datetime import datetime, timedelta
-from app import app, db
-from models import User, Task, Category
+from app import create_app, db
+from models import User, Task, Category, DailyTaskRollup
+from migrations import run_migrations
+
+app = create_app()
 
 def create_tables():
     """Create all database tables"""
@@ -17,6 +20,26 @@ def create_tables():
         db.create_all()
         print("✓ Database tables created successfully")
 
+def apply_migrations():
+    """Apply pending schema migrations to the database"""
+    with app.app_context():
+        print("Applying schema migrations...")
+        applied = run_migrations(db.engine)
+        for version, name in applied:
+            print(f"  ✓ {version:04d} {name}")
+        if not applied:
+            print("✓ Database schema is up to date")
+        else:
+            print(f"✓ Applied {len(applied)} migration(s)")
+
+def rebuild_rollups():
+    """Recompute the daily task rollup table from the tasks table"""
+    with app.app_context():
+        print("Rebuilding daily task rollups...")
+        with db.engine.begin() as connection:
+            count = DailyTaskRollup.rebuild(connection)
+        print(f"✓ Rebuilt {count} daily rollup row(s)")
+
 def seed_sample_data():
     """Create sample data for demonstration"""
     with app.app_context():
@@ -118,9 +141,15 @@ def main():
     """Main function"""
     if len(sys.argv) > 1 and sys.argv[1] == '--with-sample-data':
         create_tables()
+        apply_migrations()
         seed_sample_data()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--rebuild-rollups':
+        create_tables()
+        apply_migrations()
+        rebuild_rollups()
     else:
         create_tables()
+        apply_migrations()
     
     print("\n🎉 Database initialization complete!")
     print("You can now run the application with: python main.py")
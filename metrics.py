@@ -0,0 +1,278 @@
+import os
+import hmac
+import time
+import bisect
+import random
+import logging
+import cProfile
+import threading
+from datetime import datetime
+from flask import request, g
+from sqlalchemy import event
+
+slow_query_log = logging.getLogger('slow_query')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Histogram:
+    """Cumulative histogram keyed by label values"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        # Counts are kept per bucket (one slot past the last bound for +Inf)
+        # and only made cumulative when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count)
+                        for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', {**labels, 'le': format_value(bound)}, cumulative
+            yield f'{self.name}_bucket', {**labels, 'le': '+Inf'}, count
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else f'{value:.1f}'
+    return str(value)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metrics:
+    """Request and database instrumentation with Prometheus text export
+
+    Hooks Flask before/after request handlers and SQLAlchemy engine and pool
+    events. Metrics live in the memory of each worker process. Requests are
+    sampled with METRICS_SAMPLE_RATE. Every statement is still timed for
+    the slow-query log, so sampling only thins the metric updates.
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            'app_request_duration_seconds',
+            'Time from request start until the response is returned (first byte for streams)',
+            ('endpoint', 'method'))
+        self.requests = Counter(
+            'app_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+        self.sql_duration = Histogram(
+            'app_sql_duration_seconds', 'SQL statement execution time', ('endpoint',), SQL_BUCKETS)
+        self.sql_per_request = Histogram(
+            'app_sql_statements_per_request', 'SQL statements executed per request',
+            ('endpoint',), STATEMENT_COUNT_BUCKETS)
+        self.slow_queries = Counter(
+            'app_slow_queries_total', 'SQL statements slower than METRICS_SLOW_QUERY_MS', ('endpoint',))
+        self.pool_checkouts = Counter(
+            'app_db_pool_checkouts_total', 'Connections checked out of the pool', ('pool',))
+        self.pool_hold = Histogram(
+            'app_db_pool_connection_hold_seconds', 'Time a connection stays checked out of the pool',
+            ('pool',))
+        self._local = threading.local()
+        self._engines = {}
+        self._checked_out = {}
+        self._checked_out_lock = threading.Lock()
+
+    def init_app(self, app, engines):
+        """Instrument the app's requests and every engine in engines
+
+        engines maps Flask-SQLAlchemy bind keys to engines (db.engines); the
+        default engine (bind key None) is reported as the "primary" pool.
+        """
+        self.sample_rate = app.config.get('METRICS_SAMPLE_RATE', 1.0)
+        self.slow_query_seconds = app.config.get('METRICS_SLOW_QUERY_MS', 250) / 1000
+        self.profile_token = app.config.get('METRICS_PROFILE_TOKEN')
+        self.profile_dir = app.config.get('METRICS_PROFILE_DIR')
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        for bind_key, engine in engines.items():
+            self.instrument_engine(engine, bind_key or 'primary')
+
+    def instrument_engine(self, engine, pool_name):
+        """Time the engine's statements and track its pool under pool_name
+
+        Pool listeners stay with the engine when it is disposed and gets a
+        new pool.
+        """
+        self._engines[pool_name] = engine
+        self._checked_out.setdefault(pool_name, 0)
+
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.record_info['metrics_checked_out_at'] = time.perf_counter()
+            with self._checked_out_lock:
+                self._checked_out[pool_name] += 1
+            if getattr(self._local, 'sampled', True):
+                self.pool_checkouts.inc((pool_name,))
+
+        def checkin(dbapi_connection, connection_record):
+            checked_out_at = connection_record.record_info.pop('metrics_checked_out_at', None)
+            if checked_out_at is None:
+                return
+            with self._checked_out_lock:
+                self._checked_out[pool_name] -= 1
+            if getattr(self._local, 'sampled', True):
+                self.pool_hold.observe((pool_name,), time.perf_counter() - checked_out_at)
+
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'checkout', checkout)
+        event.listen(engine, 'checkin', checkin)
+
+    def sample(self):
+        """Decide whether to record metrics for a new request"""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record_request(self, endpoint, method, status, seconds):
+        """Record a sampled request's latency and outcome"""
+        labels = (endpoint, method)
+        self.request_latency.observe(labels, seconds)
+        self.requests.inc(labels + (str(status),))
+
+    # Request hooks
+    def _before_request(self):
+        local = self._local
+        local.endpoint = request.endpoint or 'unknown'
+        local.sampled = self.sample()
+        local.statements = 0
+        local.started = time.perf_counter()
+
+        if self.profile_token and hmac.compare_digest(request.headers.get('X-Profile', ''),
+                                                      self.profile_token):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def _after_request(self, response):
+        local = self._local
+        if getattr(local, 'sampled', False):
+            self.record_request(local.endpoint, request.method, response.status_code,
+                                time.perf_counter() - local.started)
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers['X-Profile-File'] = self._save_profile(profiler)
+        return response
+
+    def _teardown_request(self, exc):
+        # Runs after streamed bodies finish, so their statements are counted
+        local = self._local
+        if getattr(local, 'sampled', False):
+            self.sql_per_request.observe((local.endpoint,), local.statements)
+        local.__dict__.clear()
+
+    def _save_profile(self, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{self._local.endpoint}.prof"
+        path = os.path.join(self.profile_dir, name)
+        profiler.dump_stats(path)
+        return name
+
+    # Engine hooks
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start_times'].pop()
+        local = self._local
+        endpoint = getattr(local, 'endpoint', None) or 'none'
+
+        if getattr(local, 'sampled', True):
+            self.sql_duration.observe((endpoint,), elapsed)
+        if getattr(local, 'endpoint', None) is not None:
+            local.statements += 1
+
+        if elapsed >= self.slow_query_seconds:
+            self.slow_queries.inc((endpoint,))
+            slow_query_log.warning('%.1f ms in %s: %s', elapsed * 1000, endpoint,
+                                   ' '.join(statement.split())[:1000])
+
+    # Export
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in (self.request_latency, self.requests, self.sql_duration,
+                       self.sql_per_request, self.slow_queries, self.pool_checkouts, self.pool_hold):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(self._sample_line(name, labels, value))
+
+        with self._checked_out_lock:
+            checked_out = dict(self._checked_out)
+        pool_sizes = {pool_name: engine.pool.size() for pool_name, engine in self._engines.items()
+                      if hasattr(engine.pool, 'size')}
+        gauges = [
+            ('app_metrics_sample_rate', 'Fraction of requests recorded', [({}, self.sample_rate)]),
+            ('app_db_pool_checked_out', 'Connections currently checked out',
+             [({'pool': pool_name}, count) for pool_name, count in sorted(checked_out.items())]),
+            ('app_db_pool_size', 'Configured pool size',
+             [({'pool': pool_name}, size) for pool_name, size in sorted(pool_sizes.items())]),
+        ]
+        for name, help, samples in gauges:
+            if not samples:
+                continue
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in samples:
+                lines.append(self._sample_line(name, labels, value))
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _sample_line(name, labels, value):
+        if labels:
+            label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+            return f'{name}{{{label_text}}} {format_value(value)}'
+        return f'{name} {format_value(value)}'
@@ -0,0 +1,91 @@
+"""
+Versioned schema migrations for Smart Task Manager
+Applies schema changes that db.create_all() cannot add to existing databases
+"""
+
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, insert
+from app import db
+from models import DailyTaskRollup
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+def migration(version, name):
+    """Register a migration function under a version number"""
+    def decorator(func):
+        MIGRATIONS.append((version, name, func))
+        return func
+    return decorator
+
+def create_indexes(connection, table_name, index_names):
+    """Create the named model indexes on a table if they do not exist yet"""
+    table = db.metadata.tables[table_name]
+    indexes = {index.name: index for index in table.indexes}
+    for name in index_names:
+        indexes[name].create(connection, checkfirst=True)
+
+@migration(1, 'Add indexes for hot task and schedule queries')
+def add_hot_query_indexes(connection):
+    create_indexes(connection, 'categories', ['ix_categories_user_id'])
+    create_indexes(connection, 'tasks', [
+        'ix_tasks_user_status_due_date',
+        'ix_tasks_user_due_date',
+        'ix_tasks_user_category',
+        'ix_tasks_user_updated_at',
+        'ix_tasks_category_id',
+        'ix_tasks_user_completed_at',
+    ])
+    create_indexes(connection, 'schedules', [
+        'ix_schedules_user_date_start',
+        'ix_schedules_task_id',
+    ])
+
+@migration(2, 'Add daily task rollup table')
+def add_daily_task_rollup(connection):
+    DailyTaskRollup.__table__.create(connection, checkfirst=True)
+    DailyTaskRollup.rebuild(connection)
+
+@migration(3, 'Cascade user deletes to the daily task rollup')
+def cascade_daily_task_rollup(connection):
+    # The rollup only holds derived totals, so rebuilding it is simpler than
+    # altering the foreign key in place (which SQLite cannot do)
+    DailyTaskRollup.__table__.drop(connection, checkfirst=True)
+    DailyTaskRollup.__table__.create(connection)
+    DailyTaskRollup.rebuild(connection)
+
+def get_applied_versions(connection):
+    """Get the set of migration versions already applied"""
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.scalars(select(schema_migrations.c.version)))
+
+def run_migrations(engine):
+    """Apply all pending migrations in version order
+
+    Each migration runs in its own transaction together with its
+    schema_migrations record, so an interrupted run can simply be repeated.
+    Returns the list of (version, name) tuples that were applied.
+    """
+    with engine.begin() as connection:
+        applied_versions = get_applied_versions(connection)
+
+    applied = []
+    for version, name, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied_versions:
+            continue
+        with engine.begin() as connection:
+            func(connection)
+            connection.execute(insert(schema_migrations).values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+        applied.append((version, name))
+
+    return applied
@@ -1,7 +1,11 @@
-from datetime import datetime
-from app import db
+from datetime import datetime, date
+from app import db, cache
+from sqlalchemy import event, inspect, select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from scoring import urgency_for_days, duration_penalty
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -28,8 +32,59 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class UserSnapshot(UserMixin):
+    """Detached copy of the User fields requests need, cached by the user loader
+    
+    Lives in the cache under cache_key() for USER_CACHE_TIMEOUT seconds and is
+    dropped whenever the user row is updated or deleted, or the user logs out.
+    """
+    
+    FIELDS = ('id', 'username', 'email', 'timezone', 'work_start_hour', 'work_end_hour')
+    
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+    
+    @staticmethod
+    def cache_key(user_id):
+        return f'user:{user_id}'
+    
+    @classmethod
+    def fields_of(cls, user):
+        """Get the snapshot fields of a User as a cacheable dict"""
+        return {name: getattr(user, name) for name in cls.FIELDS}
+    
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+def forget_cached_user(user_id):
+    """Drop a user's cached snapshot so the next request reloads it"""
+    cache.delete(UserSnapshot.cache_key(user_id))
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_changed_user(mapper, connection, user):
+    # Drop the snapshot now, and again after commit in case a concurrent
+    # request cached the old row in between
+    forget_cached_user(user.id)
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(user.id)
+
+@event.listens_for(Session, 'after_commit')
+def _forget_committed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        forget_cached_user(user_id)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_users(session, previous_transaction):
+    session.info.pop('changed_user_ids', None)
+
 class Category(db.Model):
     __tablename__ = 'categories'
+    __table_args__ = (
+        db.Index('ix_categories_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
@@ -45,6 +100,22 @@ class Category(db.Model):
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Scheduler backlog and status filters: user_id + status, ordered by due date
+        db.Index('ix_tasks_user_status_due_date', 'user_id', 'status', 'due_date'),
+        # Task list ordering and overdue / due-today lookups
+        db.Index('ix_tasks_user_due_date', 'user_id', 'due_date'),
+        db.Index('ix_tasks_user_category', 'user_id', 'category_id'),
+        # Dashboard "recent tasks"
+        db.Index('ix_tasks_user_updated_at', 'user_id', 'updated_at'),
+        # Category stats join from categories to tasks
+        db.Index('ix_tasks_category_id', 'category_id'),
+        # Completion history only ever looks at finished tasks; range filters
+        # on completed_at imply the predicate, so both engines can use it
+        db.Index('ix_tasks_user_completed_at', 'user_id', 'completed_at',
+                 sqlite_where=db.text('completed_at IS NOT NULL'),
+                 postgresql_where=db.text('completed_at IS NOT NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -69,16 +140,7 @@ class Task(db.Model):
             return 1
         
         days_until_due = (self.due_date - datetime.utcnow()).days
-        if days_until_due <= 0:
-            return 10  # Overdue
-        elif days_until_due == 1:
-            return 8
-        elif days_until_due <= 3:
-            return 6
-        elif days_until_due <= 7:
-            return 4
-        else:
-            return 2
+        return urgency_for_days(days_until_due)
     
     def get_priority_score(self):
         """Get normalized priority score"""
@@ -86,13 +148,7 @@ class Task(db.Model):
     
     def get_duration_penalty(self):
         """Get penalty based on duration (longer tasks get slight penalty)"""
-        hours = self.estimated_duration / 60
-        if hours > 4:
-            return 2
-        elif hours > 2:
-            return 1
-        else:
-            return 0
+        return duration_penalty(self.estimated_duration)
     
     def calculate_score(self):
         """Calculate overall task score for scheduling"""
@@ -109,6 +165,10 @@ class Task(db.Model):
 
 class Schedule(db.Model):
     __tablename__ = 'schedules'
+    __table_args__ = (
+        db.Index('ix_schedules_user_date_start', 'user_id', 'schedule_date', 'start_time'),
+        db.Index('ix_schedules_task_id', 'task_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -124,3 +184,141 @@ class Schedule(db.Model):
     
     def __repr__(self):
         return f'<Schedule {self.schedule_date} - {self.task.title}>'
+
+# Dialect INSERTs that support ON CONFLICT DO UPDATE, for DailyTaskRollup.apply_deltas
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+class DailyTaskRollup(db.Model):
+    """Per-user daily task totals, maintained incrementally as tasks change"""
+    __tablename__ = 'daily_task_rollup'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_minutes = db.Column(db.Integer, nullable=False, default=0)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def contribution(status, completed_at, created_at, estimated_duration):
+        """Get what one task adds to the rollup as {day: [completed, minutes, created]}"""
+        totals = {}
+        if created_at is not None:
+            totals.setdefault(created_at.date(), [0, 0, 0])[2] += 1
+        if status == 'done' and completed_at is not None:
+            day_totals = totals.setdefault(completed_at.date(), [0, 0, 0])
+            day_totals[0] += 1
+            day_totals[1] += estimated_duration or 0
+        return totals
+    
+    @staticmethod
+    def difference(new, old):
+        """Subtract one contribution from another, dropping days that cancel out"""
+        deltas = {}
+        for day in set(new) | set(old):
+            delta = [a - b for a, b in zip(new.get(day, [0, 0, 0]), old.get(day, [0, 0, 0]))]
+            if any(delta):
+                deltas[day] = delta
+        return deltas
+    
+    @classmethod
+    def apply_deltas(cls, connection, user_id, deltas):
+        """Add per-day deltas to a user's rollup rows, creating missing rows
+        
+        Runs as one INSERT ... ON CONFLICT DO UPDATE, so concurrent first
+        writes for a day add up instead of one failing on the primary key.
+        """
+        if not deltas:
+            return
+        table = cls.__table__
+        upsert = UPSERT_INSERTS[connection.dialect.name](table)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day],
+            set_={name: table.c[name] + upsert.excluded[name]
+                  for name in ('completed_count', 'completed_minutes', 'created_count')}
+        )
+        # Days in order, so concurrent writers lock rows in the same order
+        connection.execute(upsert, [
+            {'user_id': user_id, 'day': day, 'completed_count': completed,
+             'completed_minutes': minutes, 'created_count': created}
+            for day, (completed, minutes, created) in sorted(deltas.items())
+        ])
+    
+    @classmethod
+    def rebuild(cls, connection, user_id=None):
+        """Recompute rollup rows from the tasks table with two grouped queries"""
+        table = cls.__table__
+        tasks = Task.__table__
+        
+        delete = table.delete()
+        created = select(tasks.c.user_id, func.date(tasks.c.created_at), func.count())\
+                    .where(tasks.c.created_at.isnot(None))\
+                    .group_by(tasks.c.user_id, func.date(tasks.c.created_at))
+        completed = select(tasks.c.user_id, func.date(tasks.c.completed_at), func.count(),
+                              func.coalesce(func.sum(tasks.c.estimated_duration), 0))\
+                      .where(tasks.c.status == 'done', tasks.c.completed_at.isnot(None))\
+                      .group_by(tasks.c.user_id, func.date(tasks.c.completed_at))
+        if user_id is not None:
+            delete = delete.where(table.c.user_id == user_id)
+            created = created.where(tasks.c.user_id == user_id)
+            completed = completed.where(tasks.c.user_id == user_id)
+        
+        def as_date(value):
+            # SQLite returns date() as a string, PostgreSQL as a date
+            return value if isinstance(value, date) else date.fromisoformat(value)
+        
+        rows = {}
+        for row_user_id, day, count in connection.execute(created):
+            rows.setdefault((row_user_id, as_date(day)), [0, 0, 0])[2] = count
+        for row_user_id, day, count, minutes in connection.execute(completed):
+            totals = rows.setdefault((row_user_id, as_date(day)), [0, 0, 0])
+            totals[0], totals[1] = count, int(minutes)
+        
+        connection.execute(delete)
+        if rows:
+            connection.execute(table.insert(), [
+                {'user_id': row_user_id, 'day': day, 'completed_count': completed_count,
+                 'completed_minutes': completed_minutes, 'created_count': created_count}
+                for (row_user_id, day), (completed_count, completed_minutes, created_count) in rows.items()
+            ])
+        return len(rows)
+    
+    def __repr__(self):
+        return f'<DailyTaskRollup {self.user_id} {self.day}>'
+
+def _task_contribution(task, history=False):
+    """Rollup contribution of a task, optionally as it was before this flush"""
+    state = inspect(task)
+    
+    def value(name):
+        if history:
+            attr_history = state.attrs[name].history
+            if attr_history.deleted:
+                return attr_history.deleted[0]
+        return getattr(task, name)
+    
+    return DailyTaskRollup.contribution(value('status'), value('completed_at'),
+                                        value('created_at'), value('estimated_duration'))
+
+@event.listens_for(Task, 'after_insert')
+def _rollup_task_insert(mapper, connection, task):
+    DailyTaskRollup.apply_deltas(connection, task.user_id, _task_contribution(task))
+
+@event.listens_for(Task, 'after_update')
+def _rollup_task_update(mapper, connection, task):
+    deltas = DailyTaskRollup.difference(_task_contribution(task),
+                                        _task_contribution(task, history=True))
+    if deltas:
+        DailyTaskRollup.apply_deltas(connection, task.user_id, deltas)
+
+@event.listens_for(Task, 'after_delete')
+def _rollup_task_delete(mapper, connection, task):
+    deltas = DailyTaskRollup.difference({}, _task_contribution(task, history=True))
+    DailyTaskRollup.apply_deltas(connection, task.user_id, deltas)
+
+@event.listens_for(User, 'before_delete')
+def _delete_user_rollup(mapper, connection, user):
+    # Runs after the user's tasks are deleted (and their rollup deltas
+    # applied), so no rollup row is recreated for the user; the foreign key
+    # cascade covers deletes made outside the ORM
+    table = DailyTaskRollup.__table__
+    connection.execute(table.delete().where(table.c.user_id == user.id))
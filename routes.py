@@ -1,18 +1,32 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, abort,
+                   stream_with_context)
 from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime, date, timedelta
-from app import app, db
-from models import User, Task, Category, Schedule
-from scheduler import TaskScheduler
-from utils import get_task_stats, get_category_stats
+import io
+import hmac
+import time
+import threading
+import csv
+import json
+from sqlalchemy import select, insert, update, case
+from sqlalchemy.orm import joinedload
+from app import db, broker, metrics
+from models import User, Task, Category, Schedule, DailyTaskRollup, forget_cached_user
+from scheduler import TaskScheduler, SCHEDULE_SOLVERS
+from utils import (get_cached_dashboard_bundle, get_productivity_trends, get_stats_version, filter_tasks, paginate_tasks,
+                   TASK_SORT_ORDERS, get_category_lookup, parse_task_data, notify_user_changed,
+                   forecast_completion)
 
-@app.route('/')
+
+bp = Blueprint('main', __name__)
+
+@bp.route('/')
 def index():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form['username']
@@ -23,7 +37,7 @@ def register():
         existing_user = User.query.filter_by(email=email).first()
         if existing_user:
             flash('Email already registered. Please login instead.', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
         existing_username = User.query.filter_by(username=username).first()
         if existing_username:
@@ -52,11 +66,11 @@ def register():
         
         login_user(user)
         flash('Registration successful! Welcome to Smart Task Manager.', 'success')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
@@ -68,43 +82,45 @@ def login():
             login_user(user)
             next_page = request.args.get('next')
             flash(f'Welcome back, {user.username}!', 'success')
-            return redirect(next_page) if next_page else redirect(url_for('dashboard'))
+            return redirect(next_page) if next_page else redirect(url_for('main.dashboard'))
         else:
             flash('Invalid username or password.', 'error')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
+    forget_cached_user(current_user.id)
     logout_user()
     flash('You have been logged out successfully.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Get task statistics
-    stats = get_task_stats(current_user.id)
-    category_stats = get_category_stats(current_user.id)
+    # Get task and category statistics
+    bundle = get_cached_dashboard_bundle(current_user.id)
     
     # Get recent tasks
     recent_tasks = Task.query.filter_by(user_id=current_user.id)\
+                            .options(joinedload(Task.category))\
                             .order_by(Task.updated_at.desc())\
                             .limit(5).all()
     
     # Get today's schedule
     today = date.today()
     today_schedule = Schedule.query.filter_by(user_id=current_user.id, schedule_date=today)\
+                                  .options(joinedload(Schedule.task).joinedload(Task.category))\
                                   .order_by(Schedule.start_time).all()
     
     return render_template('dashboard.html', 
-                         stats=stats, 
-                         category_stats=category_stats,
+                         stats=bundle['task_stats'], 
+                         category_stats=bundle['category_stats'],
                          recent_tasks=recent_tasks,
                          today_schedule=today_schedule)
 
-@app.route('/tasks')
+@bp.route('/tasks')
 @login_required
 def tasks():
     # Get filter parameters
@@ -112,21 +128,35 @@ def tasks():
     category_filter = request.args.get('category', 'all')
     
     # Build query
-    query = Task.query.filter_by(user_id=current_user.id)
+    query = filter_tasks(
+        Task.query.filter_by(user_id=current_user.id),
+        status=None if status_filter == 'all' else status_filter,
+        category_id=None if category_filter == 'all' else category_filter
+    )
     
-    if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
+    # Render one page at a time; "Load more" fetches the next page as HTML
+    try:
+        tasks, next_cursor = paginate_tasks(query.options(joinedload(Task.category)),
+                                            current_app.config['TASKS_PAGE_SIZE'], request.args.get('cursor'))
+    except ValueError:
+        # "Load more" fetches can only report the error; a full page starts over
+        if request.args.get('partial'):
+            abort(400)
+        flash('That page of tasks is no longer available. Showing the first page.', 'error')
+        return redirect(url_for('main.tasks', status=status_filter, category=category_filter))
     
-    if category_filter != 'all':
-        query = query.filter_by(category_id=int(category_filter))
+    if request.args.get('partial'):
+        response = current_app.response_class(render_template('_task_cards.html', tasks=tasks))
+        response.headers['X-Next-Cursor'] = next_cursor or ''
+        return response
     
-    tasks = query.order_by(Task.due_date.asc().nullslast(), Task.priority.desc()).all()
     categories = Category.query.filter_by(user_id=current_user.id).all()
     
     return render_template('tasks.html', tasks=tasks, categories=categories, 
-                         status_filter=status_filter, category_filter=category_filter)
+                         status_filter=status_filter, category_filter=category_filter,
+                         next_cursor=next_cursor)
 
-@app.route('/schedule')
+@bp.route('/schedule')
 @login_required
 def schedule():
     # Get date parameter or default to today
@@ -138,6 +168,7 @@ def schedule():
     
     # Get existing schedule for the date
     existing_schedule = Schedule.query.filter_by(user_id=current_user.id, schedule_date=schedule_date)\
+                                     .options(joinedload(Schedule.task).joinedload(Task.category))\
                                      .order_by(Schedule.start_time).all()
     
     return render_template('schedule.html', 
@@ -145,36 +176,27 @@ def schedule():
                          schedule_items=existing_schedule)
 
 # API Routes
-@app.route('/api/tasks', methods=['GET', 'POST'])
+@bp.route('/api/tasks', methods=['GET', 'POST', 'PATCH'])
 @login_required
 def api_tasks():
     if request.method == 'POST':
         data = request.get_json()
         
-        # Validate required fields
-        if not data.get('title'):
-            return jsonify({'error': 'Title is required'}), 400
+        # Only look up categories when one was given
+        category_ids = set()
+        if data.get('category_id'):
+            category_ids, _ = get_category_lookup(current_user.id)
         
-        # Parse due date if provided
-        due_date = None
-        if data.get('due_date'):
-            try:
-                due_date = datetime.fromisoformat(data['due_date'])
-            except ValueError:
-                return jsonify({'error': 'Invalid due date format'}), 400
+        try:
+            fields = parse_task_data(data, category_ids)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Create new task
-        task = Task(
-            title=data['title'],
-            description=data.get('description', ''),
-            due_date=due_date,
-            estimated_duration=int(data.get('estimated_duration', 60)),
-            priority=int(data.get('priority', 3)),
-            category_id=data.get('category_id'),
-            user_id=current_user.id
-        )
+        task = Task(user_id=current_user.id, **fields)
         
         db.session.add(task)
+        notify_user_changed(current_user.id)
         db.session.commit()
         
         return jsonify({
@@ -188,9 +210,297 @@ def api_tasks():
             'category_id': task.category_id
         }), 201
     
-    # GET request - return all tasks
-    tasks = Task.query.filter_by(user_id=current_user.id).all()
-    return jsonify([{
+    if request.method == 'PATCH':
+        return batch_update_tasks(request.get_json() or {})
+    
+    # GET request - return one page of tasks
+    sort = request.args.get('sort', 'due')
+    if sort not in TASK_SORT_ORDERS:
+        return jsonify({'error': 'Invalid sort order'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', current_app.config['TASKS_PAGE_SIZE']))
+        due_after = request.args.get('due_after')
+        due_before = request.args.get('due_before')
+        query = filter_tasks(
+            Task.query.filter_by(user_id=current_user.id),
+            status=request.args.get('status'),
+            category_id=request.args.get('category_id'),
+            due_after=datetime.fromisoformat(due_after) if due_after else None,
+            due_before=datetime.fromisoformat(due_before) if due_before else None
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid filter parameters'}), 400
+    
+    limit = max(1, min(limit, current_app.config['MAX_TASKS_PAGE_SIZE']))
+    
+    try:
+        tasks, next_cursor = paginate_tasks(query.options(joinedload(Task.category)),
+                                            limit, request.args.get('cursor'), sort)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    return jsonify({
+        'items': [task_to_dict(task) for task in tasks],
+        'next_cursor': next_cursor
+    })
+
+def batch_update_tasks(data):
+    """Apply the same field changes to many tasks with one UPDATE statement"""
+    task_ids = data.get('ids')
+    changes = data.get('changes') or {}
+    
+    if not isinstance(task_ids, list) or not task_ids:
+        return jsonify({'error': 'A list of task ids is required'}), 400
+    if len(task_ids) > current_app.config['MAX_BATCH_UPDATE']:
+        return jsonify({'error': f"At most {current_app.config['MAX_BATCH_UPDATE']} tasks can be updated at once"}), 400
+    try:
+        task_ids = sorted({int(task_id) for task_id in task_ids})
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Task ids must be integers'}), 400
+    
+    allowed_fields = {'status', 'priority', 'category_id', 'due_date'}
+    if not changes or set(changes) - allowed_fields:
+        return jsonify({'error': 'Changes may only include status, priority, category_id and due_date'}), 400
+    
+    values = {}
+    if 'status' in changes:
+        if changes['status'] not in ('todo', 'in-progress', 'done'):
+            return jsonify({'error': 'Invalid status'}), 400
+        # Tasks becoming done get completed_at like Task.mark_completed
+        values['status'] = changes['status']
+    
+    if 'priority' in changes:
+        try:
+            values['priority'] = int(changes['priority'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid priority'}), 400
+    
+    if 'category_id' in changes:
+        if changes['category_id'] in (None, ''):
+            values['category_id'] = None
+        else:
+            category_ids, _ = get_category_lookup(current_user.id)
+            try:
+                values['category_id'] = int(changes['category_id'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid category'}), 400
+            if values['category_id'] not in category_ids:
+                return jsonify({'error': 'Invalid category'}), 400
+    
+    if 'due_date' in changes:
+        if changes['due_date']:
+            try:
+                values['due_date'] = datetime.fromisoformat(changes['due_date'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid due date format'}), 400
+        else:
+            values['due_date'] = None
+    
+    # A bulk UPDATE bypasses the ORM rollup hooks, so diff the affected rows
+    # against their new state and adjust the daily rollup in the same transaction
+    rollup_deltas = {}
+    if 'status' in values:
+        completed_at = datetime.utcnow()
+        for row in db.session.query(Task.status, Task.completed_at, Task.created_at,
+                                    Task.estimated_duration)\
+                             .filter(Task.user_id == current_user.id, Task.id.in_(task_ids)):
+            new_completed_at = completed_at if values['status'] == 'done' and row.status != 'done' \
+                else row.completed_at
+            delta = DailyTaskRollup.difference(
+                DailyTaskRollup.contribution(values['status'], new_completed_at,
+                                             row.created_at, row.estimated_duration),
+                DailyTaskRollup.contribution(row.status, row.completed_at,
+                                             row.created_at, row.estimated_duration)
+            )
+            for day, (completed, minutes, created) in delta.items():
+                totals = rollup_deltas.setdefault(day, [0, 0, 0])
+                totals[0] += completed
+                totals[1] += minutes
+                totals[2] += created
+        if values['status'] == 'done':
+            values['completed_at'] = case((Task.status != 'done', completed_at),
+                                          else_=Task.completed_at)
+    
+    db.session.execute(
+        update(Task)
+        .where(Task.user_id == current_user.id, Task.id.in_(task_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if rollup_deltas:
+        DailyTaskRollup.apply_deltas(db.session.connection(), current_user.id, rollup_deltas)
+    notify_user_changed(current_user.id)
+    db.session.commit()
+    
+    tasks = Task.query.filter(Task.user_id == current_user.id, Task.id.in_(task_ids))\
+                      .options(joinedload(Task.category))\
+                      .order_by(Task.id).all()
+    found_ids = {task.id for task in tasks}
+    
+    return jsonify({
+        'items': [task_to_dict(task) for task in tasks],
+        'not_found': [task_id for task_id in task_ids if task_id not in found_ids]
+    })
+
+@bp.route('/api/tasks/export')
+@login_required
+def api_tasks_export():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'json'):
+        return jsonify({'error': 'Format must be ndjson or json'}), 400
+    
+    try:
+        statement = filter_tasks(
+            select(Task.id, Task.title, Task.description, Task.due_date,
+                   Task.estimated_duration, Task.priority, Task.status, Task.category_id,
+                   Category.name.label('category_name'), Category.color.label('category_color'),
+                   Task.created_at, Task.completed_at)
+            .outerjoin(Category, Task.category_id == Category.id)
+            .where(Task.user_id == current_user.id),
+            status=request.args.get('status'),
+            category_id=request.args.get('category_id')
+        ).order_by(Task.id)
+    except ValueError:
+        return jsonify({'error': 'Invalid filter parameters'}), 400
+    
+    # yield_per streams rows from a server-side cursor in fixed-size batches,
+    # so memory stays flat however many tasks the user has
+    statement = statement.execution_options(yield_per=current_app.config['EXPORT_BATCH_SIZE'])
+    
+    def generate_rows():
+        for row in db.session.execute(statement):
+            yield json.dumps({
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'due_date': row.due_date.isoformat() if row.due_date else None,
+                'estimated_duration': row.estimated_duration,
+                'priority': row.priority,
+                'status': row.status,
+                'category_id': row.category_id,
+                'category_name': row.category_name,
+                'category_color': row.category_color if row.category_name is not None else '#6c757d',
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'completed_at': row.completed_at.isoformat() if row.completed_at else None
+            })
+    
+    def generate_batches():
+        # Group rows into larger chunks to keep per-write overhead down
+        lines = []
+        for line in generate_rows():
+            lines.append(line)
+            if len(lines) == 500:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+    
+    def generate_ndjson():
+        for lines in generate_batches():
+            yield '\n'.join(lines) + '\n'
+    
+    def generate_json_array():
+        separator = '['
+        for lines in generate_batches():
+            yield separator + ','.join(lines)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+    
+    if export_format == 'ndjson':
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    else:
+        body, mimetype = generate_json_array(), 'application/json'
+    
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=tasks.{export_format}'
+    return response
+
+@bp.route('/api/tasks/import', methods=['POST'])
+@login_required
+def api_tasks_import():
+    import_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be csv or ndjson'}), 400
+    
+    try:
+        batch_size = int(request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE']))
+    except ValueError:
+        return jsonify({'error': 'Invalid batch size'}), 400
+    batch_size = max(1, min(batch_size, 10000))
+    
+    # Categories are resolved by id or name from a single lookup
+    category_ids, category_names = get_category_lookup(current_user.id)
+    
+    # Read the body incrementally rather than loading it all at once
+    stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8-sig', newline='')
+    
+    def read_ndjson():
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield record if isinstance(record, dict) else None
+    
+    records = csv.DictReader(stream) if import_format == 'csv' else read_ndjson()
+    
+    created_at = datetime.utcnow()
+    imported = 0
+    errors = []
+    error_count = 0
+    batch = []
+    
+    try:
+        for row_number, record in enumerate(records, start=1):
+            try:
+                if record is None:
+                    raise ValueError('Invalid JSON object')
+                fields = parse_task_data(record, category_ids, category_names)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < current_app.config['IMPORT_MAX_ERRORS']:
+                    errors.append({'row': row_number, 'error': str(e)})
+                continue
+            
+            fields['user_id'] = current_user.id
+            fields['created_at'] = created_at
+            batch.append(fields)
+            if len(batch) >= batch_size:
+                db.session.execute(insert(Task), batch)
+                imported += len(batch)
+                batch = []
+    except (UnicodeDecodeError, csv.Error):
+        db.session.rollback()
+        return jsonify({'error': 'Could not parse the uploaded file'}), 400
+    
+    if batch:
+        db.session.execute(insert(Task), batch)
+        imported += len(batch)
+    
+    # Bulk inserts bypass the ORM, so update the daily rollup directly
+    if imported:
+        DailyTaskRollup.apply_deltas(db.session.connection(), current_user.id,
+                                     {created_at.date(): [0, 0, imported]})
+    
+    if imported:
+        notify_user_changed(current_user.id)
+    
+    # All batches are committed together
+    db.session.commit()
+    
+    return jsonify({
+        'format': import_format,
+        'imported': imported,
+        'failed': error_count,
+        'errors': errors
+    })
+
+def task_to_dict(task):
+    return {
         'id': task.id,
         'title': task.title,
         'description': task.description,
@@ -201,16 +511,21 @@ def api_tasks():
         'category_id': task.category_id,
         'category_name': task.category.name if task.category else None,
         'category_color': task.category.color if task.category else '#6c757d'
-    } for task in tasks])
+    }
 
-@app.route('/api/tasks/<int:task_id>', methods=['PUT', 'DELETE'])
+@bp.route('/api/tasks/<int:task_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
 def api_task_detail(task_id):
     task = Task.query.filter_by(id=task_id, user_id=current_user.id).first_or_404()
     
+    if request.method == 'GET':
+        return jsonify(task_to_dict(task))
+    
     if request.method == 'PUT':
         data = request.get_json()
         
+        previous_status = task.status
+        
         # Update task fields
         task.title = data.get('title', task.title)
         task.description = data.get('description', task.description)
@@ -230,9 +545,10 @@ def api_task_detail(task_id):
                 task.due_date = None
         
         # Mark as completed if status changed to done
-        if data.get('status') == 'done' and task.status != 'done':
+        if data.get('status') == 'done' and previous_status != 'done':
             task.mark_completed()
         
+        notify_user_changed(current_user.id)
         db.session.commit()
         
         return jsonify({
@@ -248,10 +564,11 @@ def api_task_detail(task_id):
     
     elif request.method == 'DELETE':
         db.session.delete(task)
+        notify_user_changed(current_user.id)
         db.session.commit()
         return '', 204
 
-@app.route('/api/categories', methods=['GET', 'POST'])
+@bp.route('/api/categories', methods=['GET', 'POST'])
 @login_required
 def api_categories():
     if request.method == 'POST':
@@ -267,6 +584,7 @@ def api_categories():
         )
         
         db.session.add(category)
+        notify_user_changed(current_user.id)
         db.session.commit()
         
         return jsonify({
@@ -283,7 +601,7 @@ def api_categories():
         'color': cat.color
     } for cat in categories])
 
-@app.route('/api/schedule/generate', methods=['POST'])
+@bp.route('/api/schedule/generate', methods=['POST'])
 @login_required
 def api_generate_schedule():
     data = request.get_json()
@@ -298,24 +616,25 @@ def api_generate_schedule():
     work_start = current_user.work_start_hour
     work_end = current_user.work_end_hour
     
+    solver = data.get('solver', current_app.config['SCHEDULE_SOLVER'])
+    if solver not in SCHEDULE_SOLVERS:
+        return jsonify({'error': f"Solver must be one of: {', '.join(SCHEDULE_SOLVERS)}"}), 400
+    
     # Generate schedule
     scheduler = TaskScheduler(current_user.id)
-    schedule_items = scheduler.generate_daily_schedule(schedule_date, work_start, work_end)
-    
-    # Clear existing schedule for the date
-    Schedule.query.filter_by(user_id=current_user.id, schedule_date=schedule_date).delete()
-    
-    # Save new schedule
-    for item in schedule_items:
-        schedule_entry = Schedule(
-            user_id=current_user.id,
-            schedule_date=schedule_date,
-            task_id=item['task_id'],
-            start_time=item['start_time'],
-            end_time=item['end_time']
-        )
-        db.session.add(schedule_entry)
+    if solver == 'optimal':
+        plan = scheduler.generate_optimal_schedule(schedule_date, work_start, work_end)
+        schedule_items = plan['items']
+        solver_info = {'requested': solver, 'used': plan['solver'], 'complete': plan['complete'],
+                       'score': round(plan['score'], 2), 'greedy_score': round(plan['greedy_score'], 2)}
+    else:
+        schedule_items = scheduler.generate_daily_schedule(schedule_date, work_start, work_end)
+        solver_info = {'requested': solver, 'used': solver}
     
+    # Write only the rows that differ from the stored schedule
+    diff = scheduler.save_schedules({schedule_date: schedule_items})
+    if diff['inserted'] or diff['updated'] or diff['deleted']:
+        notify_user_changed(current_user.id)
     db.session.commit()
     
     return jsonify({
@@ -328,10 +647,88 @@ def api_generate_schedule():
             'duration': item['duration'],
             'category_name': item.get('category_name', 'Uncategorized'),
             'category_color': item.get('category_color', '#6c757d')
-        } for item in schedule_items]
+        } for item in schedule_items],
+        'changes': diff,
+        'solver': solver_info
+    })
+
+@bp.route('/api/schedule/generate-range', methods=['POST'])
+@login_required
+def api_generate_schedule_range():
+    data = request.get_json() or {}
+    start_date_str = data.get('start_date', date.today().isoformat())
+    
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        days = int(data.get('days', 7))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid start date or number of days'}), 400
+    
+    if not 1 <= days <= 31:
+        return jsonify({'error': 'Days must be between 1 and 31'}), 400
+    
+    # Plan the whole horizon from a single backlog read
+    scheduler = TaskScheduler(current_user.id)
+    plan = scheduler.generate_schedule_range(start_date, days,
+                                             current_user.work_start_hour,
+                                             current_user.work_end_hour)
+    end_date = start_date + timedelta(days=days - 1)
+    
+    # Write only the rows that differ from the stored schedules
+    diff = scheduler.save_schedules(plan['schedule'])
+    if diff['inserted'] or diff['updated'] or diff['deleted']:
+        notify_user_changed(current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'days': [{
+            'date': schedule_date.isoformat(),
+            'items': [{
+                'task_id': item['task_id'],
+                'task_title': item['task_title'],
+                'start_time': item['start_time'].strftime('%H:%M'),
+                'end_time': item['end_time'].strftime('%H:%M'),
+                'duration': item['duration'],
+                'part': item['part'],
+                'parts': item['parts'],
+                'category_name': item['category_name'],
+                'category_color': item['category_color']
+            } for item in items]
+        } for schedule_date, items in plan['schedule'].items()],
+        'unscheduled_task_ids': plan['unscheduled'],
+        'changes': diff
     })
 
-@app.route('/api/schedule/<date_str>')
+@bp.route('/api/schedule/efficiency')
+@login_required
+def api_schedule_efficiency():
+    # Default to the last seven days
+    try:
+        end_date = datetime.strptime(request.args.get('end', date.today().isoformat()), '%Y-%m-%d').date()
+        start_default = (end_date - timedelta(days=6)).isoformat()
+        start_date = datetime.strptime(request.args.get('start', start_default), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    if start_date > end_date:
+        return jsonify({'error': 'Start date must not be after end date'}), 400
+    
+    if (end_date - start_date).days >= 366:
+        return jsonify({'error': 'Date range cannot exceed 366 days'}), 400
+    
+    scheduler = TaskScheduler(current_user.id)
+    efficiency = scheduler.get_range_efficiency(start_date, end_date)
+    
+    return jsonify({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'days': efficiency['days'],
+        'summary': efficiency['summary']
+    })
+
+@bp.route('/api/schedule/<date_str>')
 @login_required
 def api_get_schedule(date_str):
     try:
@@ -340,6 +737,7 @@ def api_get_schedule(date_str):
         return jsonify({'error': 'Invalid date format'}), 400
     
     schedule_items = Schedule.query.filter_by(user_id=current_user.id, schedule_date=schedule_date)\
+                                  .options(joinedload(Schedule.task).joinedload(Task.category))\
                                   .order_by(Schedule.start_time).all()
     
     return jsonify([{
@@ -351,13 +749,118 @@ def api_get_schedule(date_str):
         'category_color': item.task.category.color if item.task.category else '#6c757d'
     } for item in schedule_items])
 
-@app.route('/api/stats')
+@bp.route('/api/stats')
 @login_required
 def api_stats():
-    stats = get_task_stats(current_user.id)
-    category_stats = get_category_stats(current_user.id)
+    # Answer unchanged polls with 304 before touching the database
+    version = get_stats_version(current_user.id)
+    etag = f'stats-{current_user.id}-{version}'
     
-    return jsonify({
-        'task_stats': stats,
-        'category_stats': category_stats
-    })
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(get_cached_dashboard_bundle(current_user.id, version))
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/api/stats/stream')
+@login_required
+def api_stats_stream():
+    """Push the stats payload as Server-Sent Events whenever it changes
+    
+    Each event carries the stats version as its id, so a reconnecting
+    browser (which sends it back as Last-Event-ID) only receives a payload
+    if something changed while it was away. Under asgi:app most streams are
+    served by async_api.api_stats_stream instead; this view holds a thread
+    per stream, so it serves at most STATS_STREAM_WSGI_LIMIT at a time.
+    """
+    user_id = current_user.id
+    keepalive = current_app.config['STATS_STREAM_KEEPALIVE']
+    max_age = current_app.config['STATS_STREAM_MAX_AGE']
+    last_version = request.headers.get('Last-Event-ID')
+    
+    # Each stream here holds a worker thread, so only a few may run at once
+    slots = current_app.extensions.setdefault(
+        'stats_stream_slots', threading.BoundedSemaphore(current_app.config['STATS_STREAM_WSGI_LIMIT']))
+    if not slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many open stats streams, poll /api/stats instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max_age)
+        return response
+    
+    def generate_events():
+        nonlocal last_version
+        # Subscribe before the first read so no change can slip in between
+        subscription = broker.subscribe(user_id)
+        try:
+            yield 'retry: 5000\n\n'
+            deadline = time.monotonic() + max_age
+            while True:
+                version = get_stats_version(user_id)
+                if version != last_version:
+                    bundle = get_cached_dashboard_bundle(user_id, version)
+                    last_version = version
+                    yield f'event: stats\nid: {version}\ndata: {json.dumps(bundle)}\n\n'
+                
+                # Don't hold a database connection while idle
+                db.session.remove()
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                
+                # Time-dependent counters are re-checked on every keepalive
+                if not subscription.wait(min(keepalive, remaining)):
+                    yield ': keepalive\n\n'
+        finally:
+            subscription.close()
+    
+    response = current_app.response_class(stream_with_context(generate_events()), mimetype='text/event-stream')
+    # The server closes the response when the stream ends or the client goes
+    # away, even if the generator never started
+    response.call_on_close(slots.release)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/stats/trends')
+@login_required
+def api_stats_trends():
+    days = request.args.get('days', '30')
+    if days == 'all':
+        days = None
+    else:
+        try:
+            days = int(days)
+        except ValueError:
+            return jsonify({'error': 'Days must be a number or "all"'}), 400
+        if days < 0:
+            return jsonify({'error': 'Days must be a number or "all"'}), 400
+    
+    return jsonify(get_productivity_trends(current_user.id, days))
+
+@bp.route('/api/stats/forecast')
+@login_required
+def api_stats_forecast():
+    try:
+        history_days = int(request.args.get('days', current_app.config['FORECAST_HISTORY_DAYS']))
+    except ValueError:
+        return jsonify({'error': 'Days must be a number between 1 and 365'}), 400
+    if not 1 <= history_days <= 365:
+        return jsonify({'error': 'Days must be a number between 1 and 365'}), 400
+    
+    return jsonify(forecast_completion(current_user.id, current_user.work_start_hour,
+                                       current_user.work_end_hour, history_days))
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    # Scrapes always need the token; without one the endpoint doesn't exist
+    token = current_app.config['METRICS_TOKEN']
+    if not token or not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,42 +1,153 @@
 from datetime import datetime, date, time, timedelta
-from models import Task, Category
+from time import perf_counter
+from flask import current_app
+from models import Task, Category, Schedule
+from scoring import score_columns, iter_ranked
+from solver import pack_intervals
 from app import db
+from sqlalchemy import insert, update, delete
+
+# Daily schedule solvers selectable on /api/schedule/generate
+SCHEDULE_SOLVERS = ('greedy', 'optimal')
+
+class FreeSlotIndex:
+    """Free working intervals for a run of days
+
+    Each day holds its free intervals in time order, split around the lunch
+    break. Intervals are only ever consumed from the front, so an interval is
+    just a moving start cursor and a fixed end. The longest free interval of
+    every day is tracked so that days which cannot fit a block are skipped.
+    """
+    
+    def __init__(self, start_date, days, work_start_hour=9, work_end_hour=17,
+                 lunch_start_hour=12, lunch_end_hour=13, buffer_minutes=15):
+        self.buffer = timedelta(minutes=buffer_minutes)
+        self.dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        self.slots = {}
+        self.longest = {}
+        
+        for day in self.dates:
+            work_start = datetime.combine(day, time(work_start_hour, 0))
+            work_end = datetime.combine(day, time(work_end_hour, 0))
+            lunch_start = datetime.combine(day, time(lunch_start_hour, 0))
+            lunch_end = datetime.combine(day, time(lunch_end_hour, 0))
+            
+            intervals = [
+                [work_start, min(work_end, lunch_start)],
+                [max(work_start, lunch_end), work_end],
+            ]
+            self.slots[day] = [interval for interval in intervals if interval[0] < interval[1]]
+            self._refresh(day)
+    
+    def _refresh(self, day):
+        self.longest[day] = max(
+            (int((end - start).total_seconds() // 60) for start, end in self.slots[day]),
+            default=0
+        )
+    
+    def longest_free(self):
+        """Get the longest free interval left anywhere, in minutes"""
+        return max(self.longest.values(), default=0)
+    
+    def find(self, duration, not_before=None):
+        """Find the earliest interval that fits a block of the given minutes
+        
+        Returns a (day, index) handle for allocate(), or None.
+        """
+        for day in self.dates:
+            if self.longest[day] < duration:
+                continue
+            if not_before is not None and day < not_before.date():
+                continue
+            for index, (start, end) in enumerate(self.slots[day]):
+                if not_before is not None and start < not_before:
+                    continue
+                if start + timedelta(minutes=duration) <= end:
+                    return day, index
+        return None
+    
+    def allocate(self, handle, duration):
+        """Take a block from the front of an interval, returning (start, end)"""
+        day, index = handle
+        interval = self.slots[day][index]
+        start = interval[0]
+        end = start + timedelta(minutes=duration)
+        
+        # Leave a buffer before whatever is placed next
+        interval[0] = end + self.buffer
+        if interval[0] >= interval[1]:
+            del self.slots[day][index]
+        self._refresh(day)
+        return start, end
+    
+    def copy(self):
+        clone = FreeSlotIndex.__new__(FreeSlotIndex)
+        clone.buffer = self.buffer
+        clone.dates = self.dates
+        clone.slots = {day: [list(interval) for interval in intervals]
+                       for day, intervals in self.slots.items()}
+        clone.longest = dict(self.longest)
+        return clone
+
+def scheduled_minutes(day, start_time, end_time):
+    """Length of a schedule entry in whole minutes"""
+    return int((datetime.combine(day, end_time) - datetime.combine(day, start_time)).total_seconds() // 60)
+
+def apply_schedule_changes(session, inserts, updates, deletes):
+    """Run schedule writes from diff_schedules as bulk statements"""
+    if deletes:
+        session.execute(delete(Schedule).where(Schedule.id.in_(deletes)),
+                        execution_options={'synchronize_session': False})
+    if updates:
+        session.execute(update(Schedule), updates)
+    if inserts:
+        session.execute(insert(Schedule), inserts)
 
 class TaskScheduler:
     def __init__(self, user_id):
         self.user_id = user_id
         
-    def get_pending_tasks(self):
-        """Get all pending tasks for the user"""
-        return Task.query.filter_by(user_id=self.user_id, status='todo')\
-                        .order_by(Task.due_date.asc().nullslast()).all()
+    def get_pending_task_rows(self):
+        """Get only the columns scheduling needs for all pending tasks"""
+        return db.session.query(
+            Task.id,
+            Task.title,
+            Task.due_date,
+            Task.priority,
+            Task.estimated_duration,
+            Category.name.label('category_name'),
+            Category.color.label('category_color')
+        ).outerjoin(Category, Task.category_id == Category.id)\
+         .filter(Task.user_id == self.user_id, Task.status == 'todo')\
+         .order_by(Task.due_date.asc().nullslast(), Task.id).all()
     
-    def score_tasks(self, tasks):
-        """Score tasks based on priority, urgency, and duration"""
-        scored_tasks = []
-        
-        for task in tasks:
-            score = task.calculate_score()
-            scored_tasks.append({
-                'task': task,
-                'score': score
-            })
-        
-        # Sort by score (highest first)
-        scored_tasks.sort(key=lambda x: x['score'], reverse=True)
-        return scored_tasks
+    def rank_task_rows(self, rows, now=None):
+        """Lazily yield pending task rows from highest to lowest score"""
+        scores = score_columns(
+            [row.due_date for row in rows],
+            [row.priority for row in rows],
+            [row.estimated_duration for row in rows],
+            now=now
+        )
+        for index in iter_ranked(scores):
+            yield rows[index]
     
-    def generate_daily_schedule(self, schedule_date, work_start_hour=9, work_end_hour=17):
-        """Generate a daily schedule for the given date"""
+    def generate_daily_schedule(self, schedule_date, work_start_hour=9, work_end_hour=17, rows=None, now=None):
+        """Generate a daily schedule for the given date
+        
+        Pending task rows are queried unless the caller already loaded them
+        (batch generation reads the rows for many users at once).
+        """
         
         # Get pending tasks
-        pending_tasks = self.get_pending_tasks()
+        if rows is None:
+            rows = self.get_pending_task_rows()
         
-        if not pending_tasks:
+        if not rows:
             return []
         
-        # Score and sort tasks
-        scored_tasks = self.score_tasks(pending_tasks)
+        # Nothing can be placed once less time remains than the shortest task
+        shortest_duration = min(row.estimated_duration for row in rows)
         
         # Time blocking
         schedule_items = []
@@ -51,8 +162,9 @@ class TaskScheduler:
         lunch_start = datetime.combine(schedule_date, time(12, 0))
         lunch_end = datetime.combine(schedule_date, time(13, 0))
         
-        for scored_task in scored_tasks:
-            task = scored_task['task']
+        # Candidates are popped from a heap in score order, so only the tasks
+        # that are actually considered for placement pay for ranking
+        for task in self.rank_task_rows(rows, now=now):
             duration_minutes = task.estimated_duration
             
             # Check if task fits in remaining time
@@ -72,8 +184,9 @@ class TaskScheduler:
                     'start_time': current_datetime.time(),
                     'end_time': task_end_time.time(),
                     'duration': duration_minutes,
-                    'category_name': task.category.name if task.category else 'Uncategorized',
-                    'category_color': task.category.color if task.category else '#6c757d'
+                    'priority': task.priority,
+                    'category_name': task.category_name if task.category_name is not None else 'Uncategorized',
+                    'category_color': task.category_color if task.category_name is not None else '#6c757d'
                 })
                 
                 # Update current time (add 15 min buffer between tasks)
@@ -84,11 +197,234 @@ class TaskScheduler:
                     current_datetime = lunch_end
             
             # Stop if we've run out of time
-            if current_datetime >= end_datetime:
+            if (current_datetime >= end_datetime or
+                    current_datetime + timedelta(minutes=shortest_duration) > end_datetime):
                 break
         
         return schedule_items
     
+    def generate_optimal_schedule(self, schedule_date, work_start_hour=9, work_end_hour=17, rows=None,
+                                  time_budget=None):
+        """Generate the daily schedule with the highest total task score
+        
+        Greedy placement can let one long task push out shorter ones worth
+        more together. This packs the morning and afternoon exactly (see
+        solver.pack_intervals) for at most time_budget seconds, then keeps
+        whichever of that packing and the greedy schedule scores higher.
+        Returns a dict with the items, the solver that produced them, both
+        total scores and whether the packing was proven optimal in time.
+        """
+        if time_budget is None:
+            time_budget = current_app.config['SCHEDULE_SOLVER_TIME_BUDGET_MS'] / 1000
+        deadline = perf_counter() + time_budget
+        if rows is None:
+            rows = self.get_pending_task_rows()
+        
+        now = datetime.utcnow()
+        greedy_items = self.generate_daily_schedule(schedule_date, work_start_hour, work_end_hour, rows=rows, now=now)
+        if not rows:
+            return {'items': greedy_items, 'solver': 'greedy', 'score': 0, 'greedy_score': 0, 'complete': True}
+        
+        scores = score_columns(
+            [row.due_date for row in rows],
+            [row.priority for row in rows],
+            [row.estimated_duration for row in rows],
+            now=now
+        )
+        if not isinstance(scores, list):
+            scores = scores.tolist()
+        score_by_id = {row.id: score for row, score in zip(rows, scores)}
+        greedy_score = sum(score_by_id[item['task_id']] for item in greedy_items)
+        
+        # The same morning and afternoon intervals the range planner uses
+        free_slots = FreeSlotIndex(schedule_date, 1, work_start_hour, work_end_hour)
+        intervals = free_slots.slots[schedule_date]
+        buffer_minutes = int(free_slots.buffer.total_seconds() // 60)
+        packed, complete = pack_intervals(
+            [row.estimated_duration for row in rows], scores,
+            [int((end - start).total_seconds() // 60) for start, end in intervals],
+            buffer_minutes, order=list(iter_ranked(scores)), deadline=deadline
+        )
+        score = sum(scores[index] for chosen in packed for index in chosen)
+        
+        # Ties keep the greedy schedule so regenerating doesn't move tasks
+        if score <= greedy_score:
+            return {'items': greedy_items, 'solver': 'greedy', 'score': greedy_score,
+                    'greedy_score': greedy_score, 'complete': complete}
+        
+        schedule_items = []
+        for (start, _), chosen in zip(intervals, packed):
+            for index in chosen:
+                task = rows[index]
+                end = start + timedelta(minutes=task.estimated_duration)
+                schedule_items.append({
+                    'task_id': task.id,
+                    'task_title': task.title,
+                    'start_time': start.time(),
+                    'end_time': end.time(),
+                    'duration': task.estimated_duration,
+                    'priority': task.priority,
+                    'category_name': task.category_name if task.category_name is not None else 'Uncategorized',
+                    'category_color': task.category_color if task.category_name is not None else '#6c757d'
+                })
+                start = end + free_slots.buffer
+        
+        return {'items': schedule_items, 'solver': 'optimal', 'score': score,
+                'greedy_score': greedy_score, 'complete': complete}
+    
+    def generate_schedule_range(self, start_date, days, work_start_hour=9, work_end_hour=17):
+        """Plan the backlog across several consecutive days in one pass
+        
+        The backlog is read and scored once. Tasks are placed in score order
+        into the earliest free interval of the horizon; a task that fits in
+        no single interval is split with suggest_optimal_duration, and its
+        parts are placed in order or not at all. Returns a dict with the
+        items for each date and the ids of tasks that could not be placed.
+        """
+        schedule = {start_date + timedelta(days=offset): [] for offset in range(days)}
+        rows = self.get_pending_task_rows()
+        
+        if not rows:
+            return {'schedule': schedule, 'unscheduled': []}
+        
+        free_slots = FreeSlotIndex(start_date, days, work_start_hour, work_end_hour)
+        
+        # The smallest block any remaining task could be reduced to
+        smallest_block = min(min(self.suggest_optimal_duration(row)) for row in rows)
+        
+        unscheduled = []
+        ranked = self.rank_task_rows(rows)
+        for task in ranked:
+            placements = self._place_task(free_slots, task)
+            if placements is None:
+                unscheduled.append(task.id)
+                if free_slots.longest_free() < smallest_block:
+                    break
+                continue
+            
+            for part, (block_start, block_end) in enumerate(placements, start=1):
+                schedule[block_start.date()].append({
+                    'task_id': task.id,
+                    'task_title': task.title,
+                    'start_time': block_start.time(),
+                    'end_time': block_end.time(),
+                    'duration': int((block_end - block_start).total_seconds() // 60),
+                    'priority': task.priority,
+                    'part': part,
+                    'parts': len(placements),
+                    'category_name': task.category_name if task.category_name is not None else 'Uncategorized',
+                    'category_color': task.category_color if task.category_name is not None else '#6c757d'
+                })
+            
+            if free_slots.longest_free() < smallest_block:
+                break
+        
+        # Everything not reached before the horizon filled up stays unscheduled
+        unscheduled.extend(task.id for task in ranked)
+        
+        for items in schedule.values():
+            items.sort(key=lambda item: item['start_time'])
+        
+        return {'schedule': schedule, 'unscheduled': unscheduled}
+    
+    def _place_task(self, free_slots, task):
+        """Place a task whole, or split into ordered parts, in the free slots"""
+        handle = free_slots.find(task.estimated_duration)
+        if handle is not None:
+            return [free_slots.allocate(handle, task.estimated_duration)]
+        
+        chunks = self.suggest_optimal_duration(task)
+        if len(chunks) == 1:
+            return None
+        
+        # Try the parts on a copy so a partial fit leaves the index untouched
+        trial = free_slots.copy()
+        placements = []
+        not_before = None
+        for chunk in chunks:
+            handle = trial.find(chunk, not_before=not_before)
+            if handle is None:
+                return None
+            placements.append(trial.allocate(handle, chunk))
+            not_before = placements[-1][1]
+        
+        free_slots.slots, free_slots.longest = trial.slots, trial.longest
+        return placements
+    
+    def save_schedules(self, schedules):
+        """Persist generated schedules by applying only what changed
+        
+        Takes a dict of schedule date to generated items and compares it with
+        the stored rows for those dates in one query. Entries with the same
+        task and times are left alone, entries whose task moved are updated
+        in place, and the rest are inserted or deleted with executemany-style
+        bulk statements. The caller commits. Returns the diff as task ids.
+        """
+        if not schedules:
+            return {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 0}
+        
+        stored = {}
+        for row in db.session.query(Schedule.id, Schedule.schedule_date, Schedule.task_id,
+                                    Schedule.start_time, Schedule.end_time)\
+                             .filter(Schedule.user_id == self.user_id,
+                                     Schedule.schedule_date.in_(list(schedules)))\
+                             .order_by(Schedule.start_time, Schedule.id):
+            stored.setdefault(row.schedule_date, []).append(row)
+        
+        inserts, updates, deletes, diff = self.diff_schedules(schedules, stored)
+        apply_schedule_changes(db.session, inserts, updates, deletes)
+        return diff
+    
+    def diff_schedules(self, schedules, stored):
+        """Work out the writes that turn stored schedule rows into new ones
+        
+        stored maps each schedule date to its rows (id, task_id, start_time,
+        end_time) ordered by start time. Returns (inserts, updates, deletes,
+        diff) ready for apply_schedule_changes.
+        """
+        diff = {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 0}
+        inserts, updates, deletes = [], [], []
+        for schedule_date, items in schedules.items():
+            existing = stored.get(schedule_date, [])
+            
+            # Exact matches need no write at all
+            exact = {}
+            for row in existing:
+                exact.setdefault((row.task_id, row.start_time, row.end_time), []).append(row)
+            pending = []
+            for item in items:
+                matches = exact.get((item['task_id'], item['start_time'], item['end_time']))
+                if matches:
+                    matches.pop(0)
+                    diff['unchanged'] += 1
+                else:
+                    pending.append(item)
+            
+            # Rows for the same task are moved rather than replaced
+            leftovers = {}
+            for rows in exact.values():
+                for row in rows:
+                    leftovers.setdefault(row.task_id, []).append(row)
+            for item in pending:
+                rows = leftovers.get(item['task_id'])
+                if rows:
+                    row = rows.pop(0)
+                    updates.append({'id': row.id, 'start_time': item['start_time'],
+                                    'end_time': item['end_time']})
+                    diff['updated'].append(item['task_id'])
+                else:
+                    inserts.append({'user_id': self.user_id, 'schedule_date': schedule_date,
+                                    'task_id': item['task_id'], 'start_time': item['start_time'],
+                                    'end_time': item['end_time']})
+                    diff['inserted'].append(item['task_id'])
+            
+            for rows in leftovers.values():
+                for row in rows:
+                    deletes.append(row.id)
+                    diff['deleted'].append(row.task_id)
+        
+        return inserts, updates, deletes, diff
+    
     def calculate_task_urgency(self, task):
         """Calculate urgency score based on due date"""
         if not task.due_date:
@@ -121,21 +457,12 @@ class TaskScheduler:
         else:
             return [duration]  # Keep as is
     
-    def get_schedule_efficiency(self, schedule_items):
-        """Calculate efficiency metrics for a schedule"""
-        if not schedule_items:
+    def efficiency_metrics(self, total_tasks, total_duration, total_priority):
+        """Build efficiency metrics from schedule totals"""
+        if not total_tasks:
             return {'efficiency': 0, 'total_tasks': 0, 'total_duration': 0}
         
-        total_duration = sum(item['duration'] for item in schedule_items)
-        total_tasks = len(schedule_items)
-        
-        # Calculate priority-weighted efficiency
-        total_priority_score = 0
-        for item in schedule_items:
-            task = Task.query.get(item['task_id'])
-            total_priority_score += task.priority
-        
-        avg_priority = total_priority_score / total_tasks if total_tasks > 0 else 0
+        avg_priority = total_priority / total_tasks
         efficiency = (avg_priority / 5) * 100  # Normalize to percentage
         
         return {
@@ -144,3 +471,68 @@ class TaskScheduler:
             'total_duration': total_duration,
             'avg_priority': round(avg_priority, 2)
         }
+    
+    def get_schedule_efficiency(self, schedule_items):
+        """Calculate efficiency metrics for a schedule"""
+        if not schedule_items:
+            return self.efficiency_metrics(0, 0, 0)
+        
+        # Items from generate_daily_schedule carry their priority; look up
+        # any that don't in a single query
+        missing_ids = [item['task_id'] for item in schedule_items if 'priority' not in item]
+        priorities = {}
+        if missing_ids:
+            priorities = dict(db.session.query(Task.id, Task.priority)
+                                        .filter(Task.id.in_(missing_ids)).all())
+        
+        # The parts of a split task count as one task
+        task_priorities = {item['task_id']: item['priority'] if 'priority' in item else priorities[item['task_id']]
+                           for item in schedule_items}
+        total_duration = sum(item['duration'] for item in schedule_items)
+        
+        return self.efficiency_metrics(len(task_priorities), total_duration, sum(task_priorities.values()))
+    
+    def get_range_efficiency(self, start_date, end_date):
+        """Calculate efficiency metrics for every day in a date range
+        
+        Stored schedule rows are read with their task priorities in a single
+        query. Durations are each row's end minus start time, i.e. the time
+        actually scheduled, so editing a task's estimate later doesn't
+        rewrite past days.
+        """
+        rows = db.session.query(
+            Schedule.schedule_date,
+            Schedule.task_id,
+            Schedule.start_time,
+            Schedule.end_time,
+            Task.priority
+        ).join(Task, Schedule.task_id == Task.id)\
+         .filter(Schedule.user_id == self.user_id,
+                 Schedule.schedule_date >= start_date,
+                 Schedule.schedule_date <= end_date).all()
+        
+        # The parts of a split task count as one task, on each day and
+        # across the range
+        minutes_by_date = {}
+        priorities_by_date = {}
+        range_priorities = {}
+        for day, task_id, start_time, end_time, priority in rows:
+            minutes_by_date[str(day)] = minutes_by_date.get(str(day), 0) + scheduled_minutes(day, start_time, end_time)
+            priorities_by_date.setdefault(str(day), {})[task_id] = priority
+            range_priorities[task_id] = priority
+        
+        # Fill in days without a schedule
+        days = []
+        current_date = start_date
+        while current_date <= end_date:
+            day_priorities = priorities_by_date.get(str(current_date), {})
+            metrics = self.efficiency_metrics(len(day_priorities), minutes_by_date.get(str(current_date), 0),
+                                              sum(day_priorities.values()))
+            metrics['date'] = current_date.isoformat()
+            days.append(metrics)
+            current_date += timedelta(days=1)
+        
+        summary = self.efficiency_metrics(len(range_priorities), sum(minutes_by_date.values()),
+                                          sum(range_priorities.values()))
+        
+        return {'days': days, 'summary': summary}
@@ -0,0 +1,135 @@
+"""
+Exact packing of a day's free intervals for the scheduler
+Chooses the tasks that maximise the total score placed in a set of free
+intervals (the morning and afternoon around lunch), with a buffer between
+consecutive tasks, by dynamic programming over the remaining minutes of every
+interval. Uses NumPy when available and a pure-Python fallback, and stops at
+a wall-clock deadline with the best packing of the tasks considered so far
+"""
+
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+def reduce_candidates(weights, capacities, order):
+    """Drop tasks that can never be part of a best packing
+
+    Walks tasks in order (highest score first) and keeps, for each weight,
+    only as many as could fit side by side in all intervals together; any
+    further task of that weight is dominated by a kept one.
+    """
+    kept = []
+    room = {}
+    for index in order:
+        weight = weights[index]
+        if not 0 < weight <= max(capacities):
+            continue
+        if weight not in room:
+            room[weight] = sum(capacity // weight for capacity in capacities)
+        if room[weight]:
+            room[weight] -= 1
+            kept.append(index)
+    return kept
+
+def _pack_numpy(weights, values, capacities, deadline):
+    best = np.zeros(tuple(capacity + 1 for capacity in capacities))
+    choices = []
+    for weight, value in zip(weights, values):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        updated = best.copy()
+        choice = np.zeros(best.shape, dtype=np.int8)
+        for axis in range(len(capacities)):
+            target = [slice(None)] * best.ndim
+            source = [slice(None)] * best.ndim
+            target[axis] = slice(weight, None)
+            source[axis] = slice(None, -weight)
+            target, source = tuple(target), tuple(source)
+            candidate = best[source] + value
+            better = candidate > updated[target]
+            updated[target] = np.where(better, candidate, updated[target])
+            choice[target] = np.where(better, axis + 1, choice[target])
+        best = updated
+        choices.append(choice.ravel())
+    return choices
+
+def _pack_python(weights, values, capacities, deadline):
+    strides = _strides(capacities)
+    shape = [capacity + 1 for capacity in capacities]
+    cells = math.prod(shape)
+    coords = [[(cell // stride) % size for cell in range(cells)] for stride, size in zip(strides, shape)]
+
+    best = [0.0] * cells
+    choices = []
+    for weight, value in zip(weights, values):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        updated = list(best)
+        choice = [0] * cells
+        for axis, (stride, coord) in enumerate(zip(strides, coords)):
+            offset = weight * stride
+            for cell in range(cells):
+                if coord[cell] >= weight:
+                    candidate = best[cell - offset] + value
+                    if candidate > updated[cell]:
+                        updated[cell] = candidate
+                        choice[cell] = axis + 1
+        best = updated
+        choices.append(choice)
+    return choices
+
+def _strides(capacities):
+    """Strides of the flattened (row-major) table of remaining capacities"""
+    shape = [capacity + 1 for capacity in capacities]
+    return [math.prod(shape[axis + 1:]) for axis in range(len(shape))]
+
+def pack_intervals(durations, scores, lengths, buffer_minutes, order=None, deadline=None, use_numpy=None):
+    """Choose tasks for each free interval to maximise their total score
+
+    durations and scores are per task; lengths are the free intervals in
+    minutes. Tasks in an interval run back to back with buffer_minutes
+    between them, so an interval fits a set of tasks when their durations
+    plus a buffer each fit in its length plus one buffer. order lists task
+    indexes from highest to lowest score and decides which tasks are tried
+    first when the deadline (a time.perf_counter() value) cuts the search
+    short. Returns (intervals, complete): the task indexes packed into each
+    interval in the given order, and whether every task was considered so
+    the packing is optimal.
+    """
+    if order is None:
+        order = sorted(range(len(durations)), key=scores.__getitem__, reverse=True)
+    weights = [duration + buffer_minutes for duration in durations]
+    capacities = [length + buffer_minutes for length in lengths]
+    intervals = [[] for _ in lengths]
+
+    candidates = reduce_candidates(weights, capacities, order) if capacities else []
+    if not candidates:
+        return intervals, True
+
+    # Work in units of the largest step every weight is a multiple of
+    unit = math.gcd(*(weights[index] for index in candidates))
+    unit_weights = [weights[index] // unit for index in candidates]
+    unit_capacities = [capacity // unit for capacity in capacities]
+    values = [scores[index] for index in candidates]
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    pack = _pack_numpy if use_numpy else _pack_python
+    choices = pack(unit_weights, values, unit_capacities, deadline)
+
+    # Walk back through the decisions from the full capacities
+    strides = _strides(unit_capacities)
+    remaining = list(unit_capacities)
+    for position in reversed(range(len(choices))):
+        axis = int(choices[position][sum(left * stride for left, stride in zip(remaining, strides))])
+        if axis:
+            intervals[axis - 1].append(candidates[position])
+            remaining[axis - 1] -= unit_weights[position]
+
+    for chosen in intervals:
+        chosen.reverse()
+    return intervals, len(choices) == len(candidates)
@@ -199,33 +199,79 @@ async function loadRealtimeStats() {
         const response = await fetch('/api/stats');
         if (!response.ok) throw new Error('Failed to load stats');
         
-        const data = await response.json();
-        
-        // Update stats cards
-        updateStatsCards(data.task_stats);
-        
-        // Update charts if they exist
-        if (taskProgressChart) {
-            taskProgressChart.data.datasets[0].data = [
-                data.task_stats.completed_tasks,
-                data.task_stats.in_progress_tasks,
-                data.task_stats.pending_tasks
-            ];
-            taskProgressChart.update();
-        }
-        
-        if (categoryChart && data.category_stats.length > 0) {
-            categoryChart.data.labels = data.category_stats.map(cat => cat.name);
-            categoryChart.data.datasets[0].data = data.category_stats.map(cat => cat.task_count);
-            categoryChart.data.datasets[0].backgroundColor = data.category_stats.map(cat => cat.color);
-            categoryChart.update();
-        }
+        applyRealtimeStats(await response.json());
         
     } catch (error) {
         console.error('Error loading realtime stats:', error);
     }
 }
 
+/**
+ * Apply a stats payload to the cards and charts
+ */
+function applyRealtimeStats(data) {
+    // Update stats cards
+    updateStatsCards(data.task_stats);
+    
+    // Update charts if they exist
+    if (taskProgressChart) {
+        taskProgressChart.data.datasets[0].data = [
+            data.task_stats.completed_tasks,
+            data.task_stats.in_progress_tasks,
+            data.task_stats.pending_tasks
+        ];
+        taskProgressChart.update();
+    }
+    
+    if (categoryChart && data.category_stats.length > 0) {
+        categoryChart.data.labels = data.category_stats.map(cat => cat.name);
+        categoryChart.data.datasets[0].data = data.category_stats.map(cat => cat.task_count);
+        categoryChart.data.datasets[0].backgroundColor = data.category_stats.map(cat => cat.color);
+        categoryChart.update();
+    }
+}
+
+/**
+ * Receive stats pushed by the server, falling back to polling every 30
+ * seconds when Server-Sent Events are unavailable or keep failing
+ */
+let statsPollTimer = null;
+
+function startStatsPolling() {
+    if (!statsPollTimer) {
+        statsPollTimer = setInterval(loadRealtimeStats, 30000);
+    }
+}
+
+function subscribeToStats() {
+    if (typeof EventSource === 'undefined') {
+        startStatsPolling();
+        return;
+    }
+    
+    const source = new EventSource('/api/stats/stream');
+    let failures = 0;
+    
+    source.addEventListener('stats', function(event) {
+        failures = 0;
+        applyRealtimeStats(JSON.parse(event.data));
+    });
+    
+    source.onopen = function() {
+        failures = 0;
+    };
+    
+    source.onerror = function() {
+        // The browser reconnects on its own after the server closes a
+        // stream; only give up after repeated failures
+        failures += 1;
+        if (source.readyState === EventSource.CLOSED || failures >= 3) {
+            source.close();
+            startStatsPolling();
+        }
+    };
+}
+
 /**
  * Update stats cards
  */
@@ -276,8 +322,8 @@ function calculateCompletionPercentage(completed, total) {
 
 // Initialize dashboard when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
-    // Load realtime stats every 30 seconds
-    setInterval(loadRealtimeStats, 30000);
+    // Keep stats up to date as tasks change
+    subscribeToStats();
     
     // Initialize tooltips if Bootstrap is available
     if (typeof bootstrap !== 'undefined') {
@@ -74,7 +74,7 @@ function updateScheduleDisplay(scheduleItems) {
     }
     
     const timelineHTML = scheduleItems.map(item => `
-        <div class="timeline-item">
+        <div class="timeline-item" data-task-id="${item.task_id}">
             <div class="timeline-time">
                 ${item.start_time}
             </div>
@@ -181,16 +181,66 @@ async function markTaskComplete(taskId) {
     }
 }
 
+/**
+ * Mark every task in the displayed schedule as complete in one request
+ */
+async function completeAllScheduled() {
+    const timelineItems = document.querySelectorAll('#scheduleTimeline .timeline-item[data-task-id]');
+    const taskIds = Array.from(timelineItems, item => parseInt(item.dataset.taskId));
+    
+    if (taskIds.length === 0) {
+        showAlert('No scheduled tasks to complete', 'info');
+        return;
+    }
+    
+    try {
+        const response = await fetch('/api/tasks', {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ids: taskIds, changes: { status: 'done' } })
+        });
+        
+        if (!response.ok) {
+            throw new Error('Failed to complete tasks');
+        }
+        
+        showAlert('All scheduled tasks completed!', 'success');
+        
+        timelineItems.forEach(timelineItem => {
+            const button = timelineItem.querySelector('button');
+            timelineItem.style.opacity = '0.6';
+            button.innerHTML = `
+                <i data-feather="check-circle" class="me-1"></i>
+                Completed
+            `;
+            button.disabled = true;
+            button.className = 'btn btn-sm btn-success';
+        });
+        
+        // Refresh pending tasks
+        loadPendingTasks();
+        
+        feather.replace();
+        
+    } catch (error) {
+        console.error('Error completing tasks:', error);
+        showAlert('Failed to complete scheduled tasks', 'danger');
+    }
+}
+
 /**
  * Load pending tasks for sidebar
  */
 async function loadPendingTasks() {
     try {
-        const response = await fetch('/api/tasks');
+        // Only the top pending tasks are shown, so fetch just that page
+        const response = await fetch('/api/tasks?status=todo&sort=priority&limit=10');
         if (!response.ok) throw new Error('Failed to load tasks');
         
-        const tasks = await response.json();
-        const pendingTasks = tasks.filter(task => task.status === 'todo');
+        const data = await response.json();
+        const pendingTasks = data.items;
         
         updatePendingTasksDisplay(pendingTasks);
         
@@ -533,6 +583,7 @@ document.addEventListener('DOMContentLoaded', function() {
 // Export functions for global use
 window.generateSchedule = generateSchedule;
 window.markTaskComplete = markTaskComplete;
+window.completeAllScheduled = completeAllScheduled;
 window.loadPendingTasks = loadPendingTasks;
 window.showScheduleEfficiency = showScheduleEfficiency;
 window.exportSchedule = exportSchedule;
@@ -14,6 +14,42 @@ function applyFilters() {
     window.location.href = `${window.location.pathname}?${params.toString()}`;
 }
 
+/**
+ * Load the next page of tasks and append it to the list
+ */
+async function loadMoreTasks(button) {
+    const cursor = button.dataset.nextCursor;
+    if (!cursor) return;
+    
+    const params = new URLSearchParams(window.location.search);
+    params.set('cursor', cursor);
+    params.set('partial', '1');
+    
+    button.disabled = true;
+    
+    try {
+        const response = await fetch(`${window.location.pathname}?${params.toString()}`);
+        if (!response.ok) throw new Error('Failed to load tasks');
+        
+        const html = await response.text();
+        document.getElementById('tasksList').insertAdjacentHTML('beforeend', html);
+        feather.replace();
+        
+        // Hide the button once the last page has been loaded
+        const nextCursor = response.headers.get('X-Next-Cursor');
+        button.dataset.nextCursor = nextCursor || '';
+        if (!nextCursor) {
+            document.getElementById('loadMoreTasks').classList.add('d-none');
+        }
+        
+    } catch (error) {
+        console.error('Error loading tasks:', error);
+        showAlert('Failed to load more tasks', 'danger');
+    } finally {
+        button.disabled = false;
+    }
+}
+
 /**
  * Save new task
  */
@@ -75,16 +111,14 @@ async function saveTask() {
 async function editTask(taskId) {
     try {
         // Get task data
-        const response = await fetch('/api/tasks');
-        if (!response.ok) throw new Error('Failed to load tasks');
-        
-        const tasks = await response.json();
-        const task = tasks.find(t => t.id === taskId);
-        
-        if (!task) {
+        const response = await fetch(`/api/tasks/${taskId}`);
+        if (response.status === 404) {
             showAlert('Task not found', 'danger');
             return;
         }
+        if (!response.ok) throw new Error('Failed to load task');
+        
+        const task = await response.json();
         
         // Populate form
         document.getElementById('editTaskId').value = task.id;
@@ -372,4 +406,5 @@ window.editTask = editTask;
 window.updateTask = updateTask;
 window.deleteTask = deleteTask;
 window.updateTaskStatus = updateTaskStatus;
+window.loadMoreTasks = loadMoreTasks;
 window.applyFilters = applyFilters;
@@ -0,0 +1,132 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['FLASK_ENV'] = 'testing'
+
+import config
+from app import create_app, db, cache
+from config import Config, TestingConfig
+from models import User
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app('testing')
+
+
+@pytest.fixture
+def database(app):
+    """Fresh tables in the in-memory database (and an empty cache) for each test
+
+    No app context stays pushed, so test client requests get their own (and
+    their own g) as in production; use app_context for direct database work.
+    """
+    cache.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield db
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def app_context(app, database):
+    with app.app_context():
+        yield
+        db.session.remove()
+
+
+@pytest.fixture
+def user(app, database):
+    with app.app_context():
+        user = User(username='alice', email='alice@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        # Detached with its columns loaded, so later commits can't expire it
+        db.session.refresh(user)
+        db.session.expunge(user)
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    """Test client logged in as the user fixture"""
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'alice', 'password': 'secret'})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def file_app_factory(tmp_path, monkeypatch):
+    """Build apps on a SQLite file (tasks.db in tmp_path) with the production pool settings
+
+        app = file_app_factory(SQLITE_READ_POOL=True)
+
+    Keyword arguments override config values. Tables are created in the
+    primary database only.
+    """
+    apps = []
+    bind_keys = set(db.metadatas)
+
+    def build(**settings):
+        name = f'sqlite-file-{len(apps)}'
+        settings = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'tasks.db'}",
+                    'SQLALCHEMY_ENGINE_OPTIONS': dict(Config.SQLITE_ENGINE_OPTIONS), **settings}
+        monkeypatch.setitem(config.config, name, type('SQLiteFileConfig', (TestingConfig,), settings))
+        app = create_app(name)
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+    # Binds register their metadata on the shared db, where create_all would
+    # look for their engines in every other app
+    for bind_key in set(db.metadatas) - bind_keys:
+        del db.metadatas[bind_key]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries(app, database):
+    """Count the SQL statements run inside a with block
+
+        with count_queries() as statements:
+            client.get('/api/tasks')
+        assert len(statements) <= 3
+    """
+    @contextmanager
+    def counting():
+        with app.app_context():
+            engine = database.engine
+        counter = StatementCounter()
+        event.listen(engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', counter)
+
+    return counting
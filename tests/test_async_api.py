@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from importlib.util import find_spec
+
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app import cache
+from cache import FileCache, MemoryCache
+from async_api import async_engine_options, call_cache, QUEUE_POOL_OPTIONS
+
+SQLITE_OPTIONS = {'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 300}
+
+
+@pytest.mark.parametrize('url, options', [
+    ('sqlite+aiosqlite:///:memory:', SQLITE_OPTIONS),
+    ('sqlite+aiosqlite:////tmp/tasks.db', SQLITE_OPTIONS),
+    ('sqlite+aiosqlite:////tmp/tasks.db', dict(SQLITE_OPTIONS, poolclass=NullPool)),
+    pytest.param('postgresql+asyncpg://app@db/tasks', SQLITE_OPTIONS,
+                 marks=pytest.mark.skipif(find_spec('asyncpg') is None, reason='asyncpg is not installed')),
+])
+def test_async_engines_accept_the_filtered_options(url, options):
+    url = make_url(url)
+    filtered = async_engine_options(url, options)
+    assert filtered['pool_recycle'] == 300
+
+    pool_class = filtered.get('poolclass') or url.get_dialect().get_pool_class(url)
+    if issubclass(pool_class, QueuePool):
+        assert filtered == options
+    else:
+        assert not set(QUEUE_POOL_OPTIONS) & set(filtered)
+
+    # Raises on options the pool doesn't take; nothing connects yet
+    engine = create_async_engine(url, **filtered)
+    assert isinstance(engine.pool, pool_class)
+
+
+@pytest.mark.parametrize('backend, off_loop', [
+    (lambda tmp_path: MemoryCache(), False),
+    (lambda tmp_path: FileCache(str(tmp_path)), True),
+])
+def test_blocking_cache_calls_run_off_the_event_loop(tmp_path, monkeypatch, backend, off_loop):
+    monkeypatch.setattr(cache, 'backend', backend(tmp_path))
+    calls = []
+
+    def get(key):
+        calls.append(threading.current_thread())
+        return cache.get(key)
+
+    async def main():
+        await call_cache(cache.set, 'key', 'value')
+        return await call_cache(get, 'key')
+
+    assert asyncio.run(main()) == 'value'
+    assert (calls[0] is not threading.main_thread()) == off_loop
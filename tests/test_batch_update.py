@@ -0,0 +1,105 @@
+from datetime import date, datetime
+
+from app import db
+from models import User, Task, DailyTaskRollup
+
+
+def add_tasks(app, user, *tasks):
+    with app.app_context():
+        tasks = [Task(user_id=user.id, created_at=datetime(2024, 3, 4, 9), **fields) for fields in tasks]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return [task.id for task in tasks]
+
+
+def completion_of(app, task_ids):
+    with app.app_context():
+        return {task.id: (task.status, task.completed_at)
+                for task in Task.query.filter(Task.id.in_(task_ids))}
+
+
+def completed_totals(app, user):
+    with app.app_context():
+        rows = DailyTaskRollup.query.filter_by(user_id=user.id)
+        return (sum(row.completed_count for row in rows), sum(row.completed_minutes for row in rows))
+
+
+def test_marking_tasks_done_sets_completed_at_only_for_newly_done_tasks(app, client, user):
+    earlier = datetime(2024, 3, 5, 16)
+    todo_id, done_id = add_tasks(app, user,
+                                 {'title': 'Draft', 'estimated_duration': 30},
+                                 {'title': 'Review', 'estimated_duration': 45,
+                                  'status': 'done', 'completed_at': earlier})
+    assert completed_totals(app, user) == (1, 45)
+
+    before = datetime.utcnow()
+    response = client.patch('/api/tasks', json={'ids': [todo_id, done_id], 'changes': {'status': 'done'}})
+    assert response.status_code == 200
+    assert [item['status'] for item in response.get_json()['items']] == ['done', 'done']
+
+    completion = completion_of(app, [todo_id, done_id])
+    assert completion[todo_id][1] >= before
+    assert completion[done_id][1] == earlier
+    assert completed_totals(app, user) == (2, 75)
+
+
+def test_reopening_done_tasks_takes_them_out_of_the_rollup(app, client, user):
+    completed_at = datetime(2024, 3, 5, 16)
+    task_ids = add_tasks(app, user,
+                         {'title': 'Draft', 'estimated_duration': 30, 'status': 'done',
+                          'completed_at': completed_at},
+                         {'title': 'Review', 'estimated_duration': 45, 'status': 'done',
+                          'completed_at': completed_at},
+                         {'title': 'Ship', 'estimated_duration': 60})
+    assert completed_totals(app, user) == (2, 75)
+
+    response = client.patch('/api/tasks', json={'ids': task_ids[:2], 'changes': {'status': 'todo'}})
+    assert response.status_code == 200
+
+    # Like a single-task update, reopening keeps the old completion time
+    assert set(completion_of(app, task_ids[:2]).values()) == {('todo', completed_at)}
+    assert completed_totals(app, user) == (0, 0)
+    with app.app_context():
+        assert {row.day: row.created_count for row in DailyTaskRollup.query.filter_by(user_id=user.id)} \
+            == {date(2024, 3, 4): 3, date(2024, 3, 5): 0}
+
+
+def test_ids_of_missing_or_other_users_tasks_are_not_found(app, client, user):
+    with app.app_context():
+        bob = User(username='bob', email='bob@example.com')
+        bob.set_password('secret')
+        db.session.add(bob)
+        db.session.commit()
+        db.session.refresh(bob)
+        db.session.expunge(bob)
+    own_id, = add_tasks(app, user, {'title': 'Draft', 'priority': 3})
+    other_id, = add_tasks(app, bob, {'title': 'Private', 'priority': 3})
+
+    response = client.patch('/api/tasks', json={'ids': [other_id, own_id, 9999, own_id],
+                                                'changes': {'priority': 5, 'status': 'done'}})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [item['id'] for item in body['items']] == [own_id]
+    assert body['items'][0]['priority'] == 5
+    assert body['not_found'] == sorted([other_id, 9999])
+
+    completion = completion_of(app, [other_id])
+    assert completion[other_id] == ('todo', None)
+    assert completed_totals(app, bob) == (0, 0)
+    assert completed_totals(app, user) == (1, 60)
+
+
+def test_changes_without_status_leave_the_rollup_alone(app, client, user):
+    task_ids = add_tasks(app, user, {'title': 'Draft'}, {'title': 'Review'})
+
+    response = client.patch('/api/tasks', json={'ids': task_ids, 'changes': {'priority': 1}})
+    assert response.status_code == 200
+    assert [item['priority'] for item in response.get_json()['items']] == [1, 1]
+    assert completed_totals(app, user) == (0, 0)
+
+
+def test_invalid_batches_are_rejected(client):
+    assert client.patch('/api/tasks', json={'ids': [], 'changes': {'status': 'done'}}).status_code == 400
+    assert client.patch('/api/tasks', json={'ids': ['x'], 'changes': {'status': 'done'}}).status_code == 400
+    assert client.patch('/api/tasks', json={'ids': [1], 'changes': {'status': 'later'}}).status_code == 400
+    assert client.patch('/api/tasks', json={'ids': [1], 'changes': {'title': 'New'}}).status_code == 400
@@ -0,0 +1,46 @@
+import os
+import time
+
+from cache import FileCache
+
+
+def test_file_cache_versions_are_shared_between_processes(tmp_path):
+    # Two instances on one directory stand in for two worker processes
+    worker_a = FileCache(str(tmp_path))
+    worker_b = FileCache(str(tmp_path))
+
+    version = worker_a.get_user_version(1)
+    assert worker_b.get_user_version(1) == version
+
+    worker_b.bump_user_version(1)
+    assert worker_a.get_user_version(1) != version
+
+
+def test_sweep_removes_only_expired_entries(tmp_path):
+    cache = FileCache(str(tmp_path), sweep_interval=0)
+    cache.set('dashboard-bundle:1:old', {'total': 6}, timeout=0.01)
+    cache.set('dashboard-bundle:1:new', {'total': 7}, timeout=300)
+    cache.set('user-version:1', 'abc', timeout=0)
+    (tmp_path / 'nightly-schedules-2024-01-01.json').write_text('{}')
+
+    entry = cache._path('dashboard-bundle:1:old')
+    time.sleep(0.02)
+
+    assert cache.sweep() == 1
+    assert not os.path.exists(entry)
+    assert cache.get('dashboard-bundle:1:new') == {'total': 7}
+    assert cache.get('user-version:1') == 'abc'
+    assert (tmp_path / 'nightly-schedules-2024-01-01.json').exists()
+
+
+def test_writes_trigger_a_sweep_once_the_interval_has_passed(tmp_path):
+    cache = FileCache(str(tmp_path), sweep_interval=60)
+    cache.set('stale', 1, timeout=0.01)
+    time.sleep(0.02)
+
+    cache.set('fresh', 2)
+    assert os.path.exists(cache._path('stale'))
+
+    cache._next_sweep = time.time()
+    cache.set('fresh', 3)
+    assert not os.path.exists(cache._path('stale'))
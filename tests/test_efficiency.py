@@ -0,0 +1,66 @@
+from datetime import date, time
+
+from app import db
+from models import Task, Schedule
+from scheduler import TaskScheduler
+
+
+def add_scheduled_task(user, schedule_date, blocks, estimated_duration, priority=4):
+    task = Task(title='Report', user_id=user.id, estimated_duration=estimated_duration, priority=priority)
+    db.session.add(task)
+    db.session.flush()
+    for start_time, end_time in blocks:
+        db.session.add(Schedule(user_id=user.id, schedule_date=schedule_date, task_id=task.id,
+                                start_time=start_time, end_time=end_time))
+    db.session.commit()
+    return task
+
+
+def test_range_efficiency_uses_the_scheduled_minutes(user, app_context):
+    day = date(2024, 3, 4)
+    task = add_scheduled_task(user, day, [(time(9, 0), time(10, 30))], estimated_duration=90)
+
+    # Re-estimating the task later doesn't rewrite the past day
+    task.estimated_duration = 600
+    db.session.commit()
+
+    efficiency = TaskScheduler(user.id).get_range_efficiency(day, day)
+    assert efficiency['days'][0]['total_duration'] == 90
+    assert efficiency['summary']['total_duration'] == 90
+
+
+def test_split_parts_add_up_to_the_task_duration(user, app_context):
+    durations = [300, 150, 60, 45]
+    for index, duration in enumerate(durations):
+        db.session.add(Task(title=f'Task {index}', user_id=user.id, estimated_duration=duration, priority=3))
+    db.session.commit()
+
+    scheduler = TaskScheduler(user.id)
+    plan = scheduler.generate_schedule_range(date(2024, 3, 4), days=2)
+    assert plan['unscheduled'] == []
+
+    parts = {}
+    for items in plan['schedule'].values():
+        for item in items:
+            parts.setdefault(item['task_id'], []).append(item)
+    assert {task.id: task.estimated_duration for task in Task.query} == \
+        {task_id: sum(item['duration'] for item in items) for task_id, items in parts.items()}
+    assert any(len(items) > 1 for items in parts.values())
+
+    all_items = [item for items in plan['schedule'].values() for item in items]
+    metrics = scheduler.get_schedule_efficiency(all_items)
+    assert metrics['total_tasks'] == len(durations)
+    assert metrics['total_duration'] == sum(durations)
+
+
+def test_range_efficiency_counts_a_split_task_once(user, app_context):
+    day = date(2024, 3, 4)
+    add_scheduled_task(user, day, [(time(9, 0), time(11, 0)), (time(11, 15), time(12, 0)),
+                                   (time(13, 0), time(15, 0))], estimated_duration=285, priority=5)
+    add_scheduled_task(user, date(2024, 3, 5), [(time(9, 0), time(10, 0))], estimated_duration=60, priority=1)
+
+    efficiency = TaskScheduler(user.id).get_range_efficiency(day, date(2024, 3, 5))
+    first_day = efficiency['days'][0]
+    assert (first_day['total_tasks'], first_day['total_duration'], first_day['efficiency']) == (1, 285, 100)
+    summary = efficiency['summary']
+    assert (summary['total_tasks'], summary['total_duration'], summary['efficiency']) == (2, 345, 60)
@@ -0,0 +1,62 @@
+import json
+import tracemalloc
+
+import pytest
+from sqlalchemy import insert
+
+from models import Task
+
+
+def add_plain_tasks(database, user, count):
+    database.session.execute(insert(Task), [
+        {'title': f'Task {index}', 'description': 'x' * 200, 'user_id': user.id,
+         'estimated_duration': 60, 'priority': 3, 'status': 'todo'}
+        for index in range(count)
+    ])
+    database.session.commit()
+
+
+def export_peak(client, path):
+    """Stream an export and return (rows, bytes, peak traced memory while streaming)"""
+    response = client.get(path, buffered=False)
+    assert response.status_code == 200
+
+    rows = size = 0
+    tracemalloc.start()
+    try:
+        for chunk in response.response:
+            rows += chunk.count('\n') if isinstance(chunk, str) else chunk.count(b'\n')
+            size += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        response.close()
+    return rows, size, peak
+
+
+# Scaled down from the hand check against 500k tasks (197 MB of output) to
+# keep the suite fast: a response held in memory would grow with the row
+# count, a streamed one stays at roughly one batch
+@pytest.mark.parametrize('path', ['/api/tasks/export', '/api/tasks/export?format=json'])
+def test_export_memory_stays_flat_as_rows_grow(app, database, user, client, path):
+    with app.app_context():
+        add_plain_tasks(database, user, 2000)
+    _, small_size, small_peak = export_peak(client, path)
+
+    with app.app_context():
+        add_plain_tasks(database, user, 10000)
+    _, large_size, large_peak = export_peak(client, path)
+
+    assert large_size > 5 * small_size
+    assert large_peak < 2 * small_peak
+    assert large_peak < large_size / 2
+
+
+def test_export_ndjson_has_one_line_per_task(app, database, user, client):
+    with app.app_context():
+        add_plain_tasks(database, user, 1203)
+
+    response = client.get('/api/tasks/export')
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 1203
+    assert [json.loads(line)['title'] for line in lines[:2]] == ['Task 0', 'Task 1']
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from models import User, Task, Category
+from utils import estimate_completion_time, forecast_completion
+
+
+def add_tasks(user, *tasks):
+    """Add (minutes, priority, category, done) tasks; done ones finished yesterday"""
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    for minutes, priority, category, done in tasks:
+        db.session.add(Task(title='Task', user_id=user.id, estimated_duration=minutes, priority=priority,
+                            category=category, status='done' if done else 'todo',
+                            completed_at=yesterday if done else None))
+    db.session.commit()
+
+
+def add_category(user, name):
+    category = Category(name=name, user_id=user.id)
+    db.session.add(category)
+    return category
+
+
+def in_days(days):
+    return (datetime.utcnow().date() + timedelta(days=days)).isoformat()
+
+
+def test_without_history_the_pace_is_the_working_day(user, app_context):
+    add_tasks(user, (420, 5, None, False), (210, 3, None, False))
+
+    forecast = forecast_completion(user.id, 9, 17, history_days=28)
+    assert (forecast['basis'], forecast['work_minutes_per_day'], forecast['minutes_per_day']) == \
+        ('work_hours', 420, 420)
+    assert [(band['band'], band['tasks'], band['minutes'], band['days'], band['date'])
+            for band in forecast['by_priority']] == [('high', 1, 420, 1.0, in_days(1)),
+                                                     ('medium', 1, 210, 1.5, in_days(2))]
+    assert (forecast['total']['days'], forecast['total']['completed_minutes']) == (1.5, 0)
+    # Without any completions all categories finish together
+    assert [(category['category_name'], category['days']) for category in forecast['by_category']] == \
+        [('Uncategorized', 1.5)]
+
+
+def test_a_user_without_tasks_has_nothing_to_forecast(user, app_context):
+    forecast = forecast_completion(user.id, history_days=28)
+    assert forecast['total'] == {'tasks': 0, 'minutes': 0, 'completed_minutes': 0,
+                                 'days': 0.0, 'date': in_days(0)}
+    assert (forecast['by_priority'], forecast['by_category']) == ([], [])
+
+
+def test_priority_bands_are_worked_from_high_to_low(user, app_context):
+    add_tasks(user, (1400, 4, None, True), (1400, 1, None, True),
+              (120, 5, None, False), (80, 4, None, False),
+              (100, 3, None, False),
+              (250, 2, None, False), (50, 1, None, False))
+
+    # 2800 minutes done in 28 days is 100 minutes a day
+    forecast = forecast_completion(user.id, 9, 17, history_days=28)
+    assert (forecast['basis'], forecast['minutes_per_day']) == ('throughput', 100)
+    assert [(band['band'], band['priorities'], band['tasks'], band['minutes'], band['completed_minutes'],
+             band['days'], band['date']) for band in forecast['by_priority']] == [
+        ('high', [4, 5], 2, 200, 1400, 2.0, in_days(2)),
+        ('medium', [3], 1, 100, 0, 3.0, in_days(3)),
+        ('low', [1, 2], 2, 300, 1400, 6.0, in_days(6)),
+    ]
+    assert (forecast['total']['tasks'], forecast['total']['minutes'], forecast['total']['days']) == (5, 600, 6.0)
+
+
+def test_categories_share_the_pace_by_recent_throughput(user, app_context):
+    work, home = add_category(user, 'Work'), add_category(user, 'Home')
+    add_tasks(user, (2100, 3, work, True), (700, 3, home, True),
+              (150, 3, work, False), (100, 3, home, False), (100, 3, None, False))
+
+    # Work gets 75 and Home 25 minutes a day; once Work is done Home gets all
+    # 100, and uncategorized work without recent completions comes last
+    forecast = forecast_completion(user.id, 9, 17, history_days=28)
+    assert [(category['category_name'], category['minutes'], category['completed_minutes'],
+             category['days'], category['date']) for category in forecast['by_category']] == [
+        ('Work', 150, 2100, 2.0, in_days(2)),
+        ('Home', 100, 700, 2.5, in_days(3)),
+        ('Uncategorized', 100, 0, 3.5, in_days(4)),
+    ]
+    assert forecast['total']['days'] == 3.5
+
+
+def test_the_pace_is_capped_at_the_working_minutes(user, app_context):
+    add_tasks(user, *[(600, 3, None, True)] * 56, (360, 3, None, False))
+
+    # 1200 minutes a day of history, but 9-12 leaves 180 working minutes
+    forecast = forecast_completion(user.id, 9, 12, history_days=28)
+    assert (forecast['basis'], forecast['work_minutes_per_day'], forecast['minutes_per_day']) == \
+        ('throughput', 180, 180)
+    assert forecast['total']['days'] == 2.0
+
+    # Work hours that are all lunch leave no capacity and no finish dates
+    forecast = forecast_completion(user.id, 12, 13, history_days=28)
+    assert forecast['minutes_per_day'] == 0
+    assert (forecast['total']['days'], forecast['total']['date']) == (None, None)
+    assert [category['days'] for category in forecast['by_category']] == [None]
+
+
+def test_forecast_endpoint_uses_the_users_work_hours(app, client, user):
+    with app.app_context():
+        db.session.get(User, user.id).work_end_hour = 12
+        add_tasks(user, (360, 3, None, False))
+
+    forecast = client.get('/api/stats/forecast?days=7').get_json()
+    assert (forecast['history_days'], forecast['work_minutes_per_day']) == (7, 180)
+    assert forecast['total']['days'] == 2.0
+
+
+@pytest.mark.parametrize('work_hours, expected_days', [((9, 17), 1.5), ((8, 18), 1.2), ((12, 13), None)])
+def test_estimate_completion_time_uses_the_working_day(user, app_context, work_hours, expected_days):
+    db.session.get(User, user.id).work_start_hour, db.session.get(User, user.id).work_end_hour = work_hours
+    add_tasks(user, (420, 3, None, False), (210, 3, None, False), (90, 3, None, True))
+
+    assert estimate_completion_time(user.id) == {
+        'total_tasks': 2,
+        'total_duration_minutes': 630,
+        'total_duration_hours': 10.5,
+        'estimated_days': expected_days,
+    }
+
+
+def test_estimate_completion_time_for_some_or_no_tasks(user, app_context):
+    add_tasks(user, (420, 3, None, False), (210, 3, None, False))
+    task_ids = [task.id for task in Task.query.order_by(Task.id)]
+
+    assert estimate_completion_time(user.id, task_ids[1:])['total_duration_minutes'] == 210
+    assert estimate_completion_time(user.id, [999]) == {
+        'total_tasks': 0, 'total_duration_minutes': 0, 'total_duration_hours': 0.0, 'estimated_days': 0.0
+    }
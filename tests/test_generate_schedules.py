@@ -0,0 +1,133 @@
+import json
+import os
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import generate_schedules
+from app import db
+from models import User, Task, Schedule
+from generate_schedules import Checkpoint, generate_all, generate_chunk
+
+
+@pytest.fixture
+def nightly(tmp_path, monkeypatch):
+    """Point the script at a fresh SQLite file and checkpoint directory"""
+    config = generate_schedules.app.config
+    monkeypatch.setitem(config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'nightly.db'}")
+    monkeypatch.setitem(config, 'SCHEDULE_BATCH_STATE_DIR', str(tmp_path / 'state'))
+    engine = generate_schedules.create_worker_engine()
+    db.metadata.create_all(engine)
+    monkeypatch.setattr(generate_schedules, '_engine', engine)
+    yield engine
+    engine.dispose()
+
+
+def add_users(engine, *users):
+    """Add users with two pending tasks each, returning their ids"""
+    with Session(engine) as session:
+        added = []
+        for index, fields in enumerate(users):
+            user = User(username=f'user{index}', email=f'user{index}@example.com',
+                        password_hash='x', **fields)
+            user.tasks = [Task(title='Write report', estimated_duration=60, priority=4),
+                          Task(title='Answer email', estimated_duration=30, priority=2)]
+            added.append(user)
+        session.add_all(added)
+        session.commit()
+        return [user.id for user in added]
+
+
+def stored_schedules(engine):
+    """{user_id: [(schedule_date, start_time), ...]} for every stored entry"""
+    with Session(engine) as session:
+        stored = {}
+        for row in session.execute(select(Schedule.user_id, Schedule.schedule_date, Schedule.start_time)
+                                   .order_by(Schedule.user_id, Schedule.start_time)):
+            stored.setdefault(row.user_id, []).append((row.schedule_date, row.start_time))
+        return stored
+
+
+def test_generate_chunk_stores_each_users_schedule_once(nightly):
+    user_ids = add_users(nightly, {}, {'work_start_hour': 14, 'work_end_hour': 18},
+                         {'work_start_hour': 18, 'work_end_hour': 9})
+    day = date(2024, 3, 5)
+
+    summary = generate_chunk(user_ids, day)
+    assert (summary['users'], summary['items'], summary['inserted']) == (3, 6, 6)
+    assert summary['changed_users'] == user_ids
+    assert summary['failed'] == []
+
+    stored = stored_schedules(nightly)
+    assert stored[user_ids[0]] == [(day, time(9, 0)), (day, time(10, 15))]
+    assert stored[user_ids[1]] == [(day, time(14, 0)), (day, time(15, 15))]
+    # Inconsistent work hours fall back to 9-17
+    assert stored[user_ids[2]] == stored[user_ids[0]]
+
+    summary = generate_chunk(user_ids, day)
+    assert (summary['inserted'], summary['updated'], summary['deleted']) == (0, 0, 0)
+    assert summary['changed_users'] == []
+
+
+def test_users_get_schedules_for_their_own_tomorrow(nightly):
+    user_ids = add_users(nightly, {'timezone': 'UTC'}, {'timezone': 'Asia/Tokyo'},
+                         {'timezone': 'America/Los_Angeles'}, {'timezone': 'Mars/Olympus_Mons'})
+
+    # 23:30 UTC is already 08:30 the next morning in Tokyo
+    summary = generate_chunk(user_ids, now=datetime(2024, 3, 4, 23, 30, tzinfo=ZoneInfo('UTC')))
+    assert summary['users'] == 4
+
+    dates = {user_id: {entry[0] for entry in entries}
+             for user_id, entries in stored_schedules(nightly).items()}
+    assert dates == {user_ids[0]: {date(2024, 3, 5)}, user_ids[1]: {date(2024, 3, 6)},
+                     user_ids[2]: {date(2024, 3, 5)}, user_ids[3]: {date(2024, 3, 5)}}
+
+
+def test_checkpoint_only_resumes_its_own_run(tmp_path):
+    path = str(tmp_path / 'state' / 'run.json')
+    checkpoint = Checkpoint(path, '2024-03-05')
+    checkpoint.mark_done([3, 1, 2])
+    checkpoint.mark_done([7, 8])
+
+    resumed = Checkpoint(path, '2024-03-05')
+    assert [user_id for user_id in range(1, 10) if resumed.is_done(user_id)] == [1, 2, 3, 7, 8]
+    assert Checkpoint(path, '2024-03-06').done == []
+
+    resumed.clear()
+    assert not os.path.exists(path)
+
+
+def test_an_interrupted_run_resumes_with_the_unfinished_chunks(nightly, monkeypatch):
+    user_ids = add_users(nightly, *[{} for _ in range(6)])
+    day = date(2024, 3, 5)
+    checkpoint_path = os.path.join(generate_schedules.app.config['SCHEDULE_BATCH_STATE_DIR'],
+                                   'nightly-schedules-2024-03-05.json')
+    monkeypatch.setattr(generate_schedules, 'init_worker', lambda: None)
+
+    generated = []
+    interrupted = True
+
+    def generate_until_interrupted(chunk, schedule_date=None, now=None):
+        generated.append(chunk)
+        if interrupted and user_ids[2] in chunk:
+            raise RuntimeError('worker killed')
+        return generate_chunk(chunk, schedule_date, now)
+
+    monkeypatch.setattr(generate_schedules, 'generate_chunk', generate_until_interrupted)
+    totals, failures = generate_all(workers=1, chunk_size=2, schedule_date=day)
+    assert generated == [user_ids[0:2], user_ids[2:4], user_ids[4:6]]
+    assert totals['users'] == 4
+    assert [user_id for user_id, _ in failures] == user_ids[2:4]
+    with open(checkpoint_path, encoding='utf-8') as f:
+        assert json.load(f) == {'run': '2024-03-05', 'done': [user_ids[0:2], user_ids[4:6]]}
+
+    generated.clear()
+    interrupted = False
+    totals, failures = generate_all(workers=1, chunk_size=2, schedule_date=day)
+    assert generated == [user_ids[2:4]]
+    assert (totals['users'], failures) == (2, [])
+    assert not os.path.exists(checkpoint_path)
+    assert sorted(stored_schedules(nightly)) == user_ids
@@ -0,0 +1,110 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app import db
+from models import Task, Category, DailyTaskRollup
+from utils import parse_task_data, MAX_ESTIMATED_DURATION
+
+
+def tasks_of(app, user):
+    with app.app_context():
+        return [(task.title, task.estimated_duration, task.priority, task.category_id)
+                for task in Task.query.filter_by(user_id=user.id).order_by(Task.id)]
+
+
+def created_counts(app, user):
+    with app.app_context():
+        return {row.day: row.created_count for row in DailyTaskRollup.query.filter_by(user_id=user.id)}
+
+
+@pytest.mark.parametrize('values, expected', [
+    ({}, (60, 3)),
+    ({'estimated_duration': '', 'priority': None}, (60, 3)),
+    ({'estimated_duration': 0, 'priority': 1}, (0, 1)),
+    ({'estimated_duration': '0', 'priority': '5'}, (0, 5)),
+])
+def test_missing_values_get_defaults_and_explicit_zero_is_kept(values, expected):
+    fields = parse_task_data(dict(values, title='Plan'), set())
+    assert (fields['estimated_duration'], fields['priority']) == expected
+
+
+@pytest.mark.parametrize('values, message', [
+    ({'title': 'x' * 201}, 'Title must be at most 200 characters'),
+    ({'priority': 0}, 'Priority must be between 1 and 5'),
+    ({'priority': '6'}, 'Priority must be between 1 and 5'),
+    ({'estimated_duration': -5}, 'Estimated duration must be between'),
+    ({'estimated_duration': MAX_ESTIMATED_DURATION + 1}, 'Estimated duration must be between'),
+    ({'estimated_duration': 'an hour'}, 'Invalid estimated duration'),
+])
+def test_out_of_range_fields_are_rejected(values, message):
+    with pytest.raises(ValueError, match=message):
+        parse_task_data(dict({'title': 'Plan'}, **values), set())
+
+
+def test_create_task_keeps_an_explicit_zero_duration(app, user, client):
+    response = client.post('/api/tasks', json={'title': 'Quick call', 'estimated_duration': 0})
+    assert response.status_code == 201
+    assert tasks_of(app, user) == [('Quick call', 0, 3, None)]
+
+
+def test_csv_import_resolves_categories_and_reports_bad_rows(app, user, client):
+    with app.app_context():
+        category = Category(name='Work', user_id=user.id)
+        db.session.add(category)
+        db.session.commit()
+        category_id = category.id
+
+    body = '\n'.join([
+        'title,estimated_duration,priority,category,due_date',
+        'Write report,90,5,work,2024-03-05T17:00:00',
+        ',30,3,,',
+        f"{'x' * 201},30,3,,",
+        'Zero minutes,0,2,,',
+        'Bad priority,30,9,,',
+        'Unknown category,30,3,Garden,',
+        'Bad date,30,3,,tomorrow',
+    ]) + '\n'
+    response = client.post('/api/tasks/import?format=csv', data=body, content_type='text/csv')
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['format'], result['imported'], result['failed']) == ('csv', 2, 5)
+    assert [(error['row'], error['error']) for error in result['errors']] == [
+        (2, 'Title is required'),
+        (3, 'Title must be at most 200 characters'),
+        (5, 'Priority must be between 1 and 5'),
+        (6, "Unknown category 'Garden'"),
+        (7, 'Invalid due date format'),
+    ]
+    assert tasks_of(app, user) == [('Write report', 90, 5, category_id), ('Zero minutes', 0, 2, None)]
+
+
+def test_ndjson_import_spans_batches_and_updates_the_rollup(app, user, client, count_queries):
+    lines = [json.dumps({'title': f'Task {index}', 'priority': index % 5 + 1}) for index in range(7)]
+    lines[3] = 'not json'
+    lines[5] = json.dumps(['a', 'list'])
+    body = '\n'.join(lines[:4] + [''] + lines[4:]) + '\n'
+
+    with count_queries() as statements:
+        response = client.post('/api/tasks/import?batch_size=2', data=body,
+                               content_type='application/x-ndjson')
+
+    result = response.get_json()
+    assert (result['format'], result['imported'], result['failed']) == ('ndjson', 5, 2)
+    assert [error['row'] for error in result['errors']] == [4, 6]
+    assert [title for title, _, _, _ in tasks_of(app, user)] == ['Task 0', 'Task 1', 'Task 2', 'Task 4', 'Task 6']
+
+    # Two full batches of two and the remainder of one
+    inserts = [statement for statement in statements.statements if statement.startswith('INSERT INTO tasks')]
+    assert len(inserts) == 3
+    assert created_counts(app, user) == {datetime.utcnow().date(): 5}
+
+    # A second import adds to the same rollup row
+    client.post('/api/tasks/import', data=lines[0] + '\n', content_type='application/x-ndjson')
+    assert created_counts(app, user) == {datetime.utcnow().date(): 6}
+
+
+def test_import_rejects_unknown_formats(client):
+    assert client.post('/api/tasks/import?format=xml', data='<tasks/>').status_code == 400
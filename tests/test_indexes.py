@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event, inspect
+
+from models import Task, Schedule, Category
+from migrations import MIGRATIONS, run_migrations, schema_migrations
+from scheduler import TaskScheduler
+from utils import paginate_tasks, get_category_stats, forecast_completion
+
+
+def query_plans(database, func):
+    """Run func and return the SQLite EXPLAIN QUERY PLAN details of each statement it ran"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(database.engine, 'before_cursor_execute', capture)
+    try:
+        func()
+    finally:
+        event.remove(database.engine, 'before_cursor_execute', capture)
+
+    plans = []
+    with database.engine.connect() as connection:
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+            plans.append(' | '.join(row[-1] for row in rows))
+    return plans
+
+
+@pytest.mark.parametrize('index, query', [
+    ('ix_tasks_user_status_due_date', lambda user_id: TaskScheduler(user_id).get_pending_task_rows()),
+    ('ix_tasks_user_due_date', lambda user_id: paginate_tasks(Task.query.filter_by(user_id=user_id), 50)),
+    ('ix_tasks_user_category', lambda user_id: get_category_stats(user_id)),
+    ('ix_tasks_category_id', lambda user_id: get_category_stats(user_id)),
+    ('ix_categories_user_id', lambda user_id: Category.query.filter_by(user_id=user_id).all()),
+    ('ix_tasks_user_completed_at', lambda user_id: forecast_completion(user_id)),
+    ('ix_schedules_user_date_start',
+     lambda user_id: Schedule.query.filter_by(user_id=user_id, schedule_date=date.today())
+                                   .order_by(Schedule.start_time).all()),
+    ('ix_schedules_user_date_start',
+     lambda user_id: TaskScheduler(user_id).get_range_efficiency(date.today(), date.today())),
+])
+def test_hot_queries_use_their_index(database, user, app_context, index, query):
+    plans = query_plans(database, lambda: query(user.id))
+    assert any(f'USING INDEX {index} ' in plan for plan in plans), plans
+
+
+def test_migrations_add_indexes_to_existing_tables(database, app_context):
+    expected = {index.name for table in ('tasks', 'schedules', 'categories')
+                for index in database.metadata.tables[table].indexes}
+    with database.engine.begin() as connection:
+        for name in expected:
+            connection.exec_driver_sql(f'DROP INDEX {name}')
+
+    try:
+        applied = run_migrations(database.engine)
+        assert [version for version, _ in applied] == sorted(version for version, _, _ in MIGRATIONS)
+
+        inspector = inspect(database.engine)
+        found = {index['name'] for table in ('tasks', 'schedules', 'categories')
+                 for index in inspector.get_indexes(table)}
+        assert expected <= found
+        assert run_migrations(database.engine) == []
+    finally:
+        with database.engine.begin() as connection:
+            schema_migrations.drop(connection, checkfirst=True)
@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine, text
+
+from app import db
+
+
+def test_metrics_are_hidden_without_a_configured_token(app, database, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', None)
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_metrics_require_the_token(app, database, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-secret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+
+
+def test_every_engine_reports_its_pool(file_app_factory, tmp_path):
+    replica_uri = f"sqlite:///{tmp_path / 'replica.db'}"
+    replica = create_engine(replica_uri)
+    db.metadata.create_all(replica)
+    replica.dispose()
+    app = file_app_factory(SQLITE_READ_POOL=True, SQLALCHEMY_REPLICA_URIS=[replica_uri],
+                           METRICS_TOKEN='scrape-secret')
+    with app.app_context():
+        engines = dict(db.engines)
+        for engine in engines.values():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+    assert set(engines) == {None, 'read', 'replica0'}
+    # Pools are hooked through their events rather than patched
+    assert all('_do_get' not in vars(engine.pool) for engine in engines.values())
+
+    body = app.test_client().get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).get_data(as_text=True)
+    for pool in ('primary', 'read', 'replica0'):
+        assert f'app_db_pool_checkouts_total{{pool="{pool}"}}' in body
+        assert f'app_db_pool_connection_hold_seconds_count{{pool="{pool}"}}' in body
+        assert f'app_db_pool_size{{pool="{pool}"}} ' in body
+    # The scrape's own connection, if any, is back in the pool by now
+    assert 'app_db_pool_checked_out{pool="read"} 0' in body
+    assert 'app_db_pool_checked_out{pool="replica0"} 0' in body
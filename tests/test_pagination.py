@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from models import Task
+from utils import paginate_tasks, TASK_SORT_ORDERS
+
+
+def add_tasks_with_ties_and_nulls(user):
+    base = datetime(2024, 3, 4, 9)
+    due_dates = [None, base, base, base + timedelta(days=1), base - timedelta(days=2)]
+    priorities = [None, 1, 3, 3, 5]
+    db.session.add_all([
+        Task(title=f'Task {index}', user_id=user.id,
+             due_date=due_dates[index % len(due_dates)], priority=priorities[index * 3 % len(priorities)])
+        for index in range(37)
+    ])
+    db.session.commit()
+    # The model default fills priority on insert, so NULLs are set afterwards
+    Task.query.filter(Task.title.in_([f'Task {index}' for index in range(0, 37, 4)]))\
+              .update({Task.priority: None}, synchronize_session=False)
+    db.session.commit()
+
+
+def sort_key(sort, task):
+    """TASK_SORT_ORDERS in Python, with NULLs last in either direction"""
+    key = []
+    for name, descending in TASK_SORT_ORDERS[sort]:
+        value = getattr(task, name)
+        if isinstance(value, datetime):
+            value = value.timestamp()
+        key.append((value is None, 0 if value is None else -value if descending else value))
+    return key
+
+
+@pytest.mark.parametrize('sort', sorted(TASK_SORT_ORDERS))
+@pytest.mark.parametrize('limit', [1, 4, 10, 50])
+def test_walking_every_page_returns_each_task_once_in_order(user, app_context, sort, limit):
+    add_tasks_with_ties_and_nulls(user)
+    query = Task.query.filter_by(user_id=user.id)
+    expected = [task.id for task in sorted(query.all(), key=lambda task: sort_key(sort, task))]
+    assert len(expected) == 37
+    assert Task.query.filter(Task.priority.is_(None)).count() and Task.query.filter(Task.due_date.is_(None)).count()
+
+    seen, cursor = [], None
+    for _ in range(40):
+        page, cursor = paginate_tasks(query, limit, cursor, sort)
+        assert len(page) <= limit
+        seen.extend(task.id for task in page)
+        if cursor is None:
+            break
+    assert seen == expected
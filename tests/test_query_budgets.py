@@ -0,0 +1,48 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from models import Task, Category, Schedule
+
+
+def add_tasks(database, user, count):
+    """Give the user categorised tasks, each scheduled today"""
+    categories = [Category(name=f'Category {index}', user_id=user.id) for index in range(3)]
+    database.session.add_all(categories)
+    database.session.flush()
+
+    today = date.today()
+    for index in range(count):
+        task = Task(title=f'Task {index}', user_id=user.id, priority=index % 5 + 1,
+                    category_id=categories[index % 3].id,
+                    due_date=datetime.utcnow() + timedelta(days=index % 7))
+        database.session.add(task)
+        database.session.flush()
+        start = datetime.combine(today, time(9)) + timedelta(minutes=index)
+        database.session.add(Schedule(user_id=user.id, schedule_date=today, task_id=task.id,
+                                      start_time=start.time(), end_time=(start + timedelta(minutes=1)).time()))
+    database.session.commit()
+
+
+# Statements per request, whatever the number of tasks listed. Each budget
+# includes loading the logged-in user, as the first request after login does;
+# the dashboard adds its two stats aggregates, the recent tasks and today's
+# schedule.
+QUERY_BUDGETS = [
+    ('/api/tasks?limit=200', 2),
+    (f'/api/schedule/{date.today().isoformat()}', 2),
+    ('/dashboard', 5),
+]
+
+
+@pytest.mark.parametrize('path, budget', QUERY_BUDGETS)
+@pytest.mark.parametrize('task_count', [5, 60])
+def test_list_endpoints_stay_within_query_budget(app, database, user, client, count_queries, path, budget, task_count):
+    with app.app_context():
+        add_tasks(database, user, task_count)
+
+    with count_queries() as statements:
+        response = client.get(path)
+
+    assert response.status_code == 200
+    assert len(statements) <= budget, statements.statements
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+
+from sqlalchemy import inspect, select
+
+from app import db
+from models import User, Task, DailyTaskRollup
+from migrations import run_migrations, schema_migrations
+
+
+def rollup_rows(user_id):
+    table = DailyTaskRollup.__table__
+    return [tuple(row) for row in db.session.execute(
+        select(table.c.day, table.c.completed_count, table.c.completed_minutes, table.c.created_count)
+        .where(table.c.user_id == user_id).order_by(table.c.day))]
+
+
+def test_apply_deltas_creates_missing_days_and_adds_to_existing_ones(user, app_context):
+    connection = db.session.connection()
+    DailyTaskRollup.apply_deltas(connection, user.id, {date(2024, 3, 4): [1, 30, 2]})
+    DailyTaskRollup.apply_deltas(connection, user.id, {date(2024, 3, 4): [1, 45, 0],
+                                                       date(2024, 3, 5): [0, 0, 1]})
+    DailyTaskRollup.apply_deltas(connection, user.id, {})
+
+    assert rollup_rows(user.id) == [(date(2024, 3, 4), 2, 75, 2), (date(2024, 3, 5), 0, 0, 1)]
+
+
+def test_task_changes_keep_the_rollup_in_step(user, app_context):
+    task = Task(title='Write report', user_id=user.id, estimated_duration=90,
+                created_at=datetime(2024, 3, 4, 9))
+    db.session.add(task)
+    db.session.commit()
+    task_id = task.id
+    db.session.remove()
+
+    task = db.session.get(Task, task_id)
+    task.status, task.completed_at = 'done', datetime(2024, 3, 5, 16)
+    db.session.commit()
+
+    assert rollup_rows(user.id) == [(date(2024, 3, 4), 0, 0, 1), (date(2024, 3, 5), 1, 90, 0)]
+
+
+def test_deleting_a_user_deletes_their_rollup(user, app_context):
+    db.session.add(Task(title='Write report', user_id=user.id, status='done',
+                        created_at=datetime(2024, 3, 4, 9), completed_at=datetime(2024, 3, 5, 16)))
+    db.session.commit()
+    assert rollup_rows(user.id)
+
+    db.session.delete(db.session.get(User, user.id))
+    db.session.commit()
+    assert rollup_rows(user.id) == []
+
+
+def test_rollup_foreign_key_cascades_after_migrating(database, user, app_context):
+    db.session.add(Task(title='Write report', user_id=user.id, created_at=datetime(2024, 3, 4, 9)))
+    db.session.commit()
+    db.session.remove()
+
+    try:
+        run_migrations(database.engine)
+        foreign_keys = inspect(database.engine).get_foreign_keys('daily_task_rollup')
+        assert [key['options'].get('ondelete') for key in foreign_keys] == ['CASCADE']
+        assert rollup_rows(user.id) == [(date(2024, 3, 4), 0, 0, 1)]
+    finally:
+        with database.engine.begin() as connection:
+            schema_migrations.drop(connection, checkfirst=True)
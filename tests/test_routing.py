@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import select
+
+from app import db, cache
+from database import recent_write_key
+from models import User, Task
+
+
+@pytest.fixture
+def replicated_app(file_app_factory, tmp_path):
+    """App on tasks.db with replica.db as its one read replica, replicated once after seeding"""
+    app = file_app_factory(SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'replica.db'}"])
+    with app.app_context():
+        user = User(username='alice', email='alice@example.com')
+        user.set_password('secret')
+        user.tasks = [Task(title='Replicated')]
+        db.session.add(user)
+        db.session.commit()
+        db.session.remove()
+        db.engines[None].dispose()
+
+    with sqlite3.connect(tmp_path / 'tasks.db') as primary, sqlite3.connect(tmp_path / 'replica.db') as replica:
+        primary.backup(replica)
+    primary.close()
+    replica.close()
+    return app
+
+
+def add_primary_only_task(app, title):
+    """Add a task the replica hasn't caught up with yet"""
+    with app.app_context():
+        user_id = db.session.execute(select(User.id).filter_by(username='alice')).scalar_one()
+        db.session.add(Task(title=title, user_id=user_id))
+        db.session.commit()
+
+
+def logged_in(app):
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'alice', 'password': 'secret'}).status_code == 302
+    return client
+
+
+def task_titles(client):
+    return sorted(task['title'] for task in client.get('/api/tasks').get_json()['items'])
+
+
+def test_reads_go_to_the_replica(replicated_app):
+    add_primary_only_task(replicated_app, 'Lagging')
+    assert task_titles(logged_in(replicated_app)) == ['Replicated']
+
+
+def test_reads_after_a_write_go_to_the_primary(replicated_app):
+    client = logged_in(replicated_app)
+    response = client.post('/api/tasks', json={'title': 'Just added'})
+    assert response.status_code == 201
+
+    assert task_titles(client) == ['Just added', 'Replicated']
+
+    # Once the read-your-writes window has passed, reads use the replica again
+    with replicated_app.app_context():
+        user_id = db.session.execute(select(User.id).filter_by(username='alice')).scalar_one()
+        cache.delete(recent_write_key(str(user_id)))
+    assert task_titles(client) == ['Replicated']
+
+
+def test_a_transaction_reads_its_own_writes(replicated_app):
+    with replicated_app.test_request_context('/api/tasks', method='GET'):
+        primary, replica = db.engines[None], db.engines['replica0']
+        query = select(Task.title).order_by(Task.title)
+        assert db.session.get_bind(clause=query) is replica
+
+        user_id = db.session.execute(select(User.id)).scalar_one()
+        db.session.add(Task(title='Uncommitted', user_id=user_id))
+        db.session.flush()
+        assert db.session.get_bind(clause=query) is primary
+        assert db.session.scalars(query).all() == ['Replicated', 'Uncommitted']
+
+        db.session.rollback()
+        assert db.session.get_bind(clause=query) is replica
+        db.session.remove()
@@ -0,0 +1,71 @@
+from datetime import date, time
+
+from app import db
+from models import Task, Schedule
+from scheduler import TaskScheduler
+
+DAY = date(2024, 3, 4)
+
+
+def add_tasks(user, count):
+    tasks = [Task(title=f'Task {index}', user_id=user.id, estimated_duration=60, priority=3)
+             for index in range(count)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def item(task_id, start_hour, end_hour):
+    return {'task_id': task_id, 'start_time': time(start_hour), 'end_time': time(end_hour)}
+
+
+def stored_rows(user):
+    return {(row.task_id, row.start_time, row.end_time): row.id
+            for row in Schedule.query.filter_by(user_id=user.id, schedule_date=DAY)}
+
+
+def test_save_schedules_keeps_moves_adds_and_removes_entries(user, app_context):
+    kept, moved, removed, added = add_tasks(user, 4)
+    scheduler = TaskScheduler(user.id)
+    scheduler.save_schedules({DAY: [item(kept, 9, 10), item(moved, 10, 11), item(removed, 11, 12)]})
+    db.session.commit()
+    before = stored_rows(user)
+
+    diff = scheduler.save_schedules({DAY: [item(kept, 9, 10), item(moved, 13, 14), item(added, 14, 15)]})
+    db.session.commit()
+
+    assert diff == {'inserted': [added], 'updated': [moved], 'deleted': [removed], 'unchanged': 1}
+    after = stored_rows(user)
+    assert set(after) == {(kept, time(9), time(10)), (moved, time(13), time(14)), (added, time(14), time(15))}
+    # The unchanged row is left alone and the moved one updated in place
+    assert after[(kept, time(9), time(10))] == before[(kept, time(9), time(10))]
+    assert after[(moved, time(13), time(14))] == before[(moved, time(10), time(11))]
+
+
+def test_regenerating_an_unchanged_schedule_writes_nothing(user, app_context, count_queries):
+    add_tasks(user, 5)
+    scheduler = TaskScheduler(user.id)
+    scheduler.save_schedules({DAY: scheduler.generate_daily_schedule(DAY)})
+    db.session.commit()
+    before = stored_rows(user)
+
+    with count_queries() as statements:
+        diff = scheduler.save_schedules({DAY: scheduler.generate_daily_schedule(DAY)})
+        db.session.commit()
+
+    assert diff == {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 5}
+    assert not [statement for statement in statements.statements
+                if statement.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+    assert stored_rows(user) == before
+
+
+def test_saving_an_empty_day_removes_its_entries(user, app_context):
+    task_ids = add_tasks(user, 2)
+    scheduler = TaskScheduler(user.id)
+    scheduler.save_schedules({DAY: [item(task_ids[0], 9, 10), item(task_ids[1], 10, 11)]})
+    db.session.commit()
+
+    diff = scheduler.save_schedules({DAY: []})
+    db.session.commit()
+    assert sorted(diff['deleted']) == sorted(task_ids)
+    assert stored_rows(user) == {}
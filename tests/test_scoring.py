@@ -0,0 +1,27 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Task
+from scoring import score_columns, iter_ranked, np
+
+
+def make_tasks(count, seed=7):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [Task(id=index, title=f'Task {index}', priority=rng.randint(1, 5),
+                 estimated_duration=rng.choice([15, 30, 60, 150, 300]),
+                 due_date=now + timedelta(minutes=rng.randint(-5 * 1440, 20 * 1440)) if rng.random() < 0.8 else None)
+            for index in range(count)]
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=pytest.mark.skipif(np is None, reason='numpy not installed'))])
+def test_batch_ranking_matches_per_task_scores(use_numpy):
+    tasks = make_tasks(500)
+    expected = sorted(tasks, key=lambda task: task.calculate_score(), reverse=True)
+
+    scores = score_columns([task.due_date for task in tasks], [task.priority for task in tasks],
+                           [task.estimated_duration for task in tasks], use_numpy=use_numpy)
+
+    assert [tasks[index].id for index in iter_ranked(scores)] == [task.id for task in expected]
@@ -0,0 +1,120 @@
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.pool import QueuePool
+
+from app import db
+from models import User, Task
+from config import Config, is_sqlite_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLIENTS = 8
+REQUESTS_PER_CLIENT = 30
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('sqlite:///tasks.db', True),
+    ('sqlite:////var/lib/tasks/tasks.db', True),
+    ('sqlite://', False),
+    ('sqlite:///:memory:', False),
+    ('sqlite:///file:tasks?mode=memory&uri=true', False),
+    ('postgresql://localhost/tasks', False),
+])
+def test_is_sqlite_file(url, expected):
+    assert is_sqlite_file(url) == expected
+
+
+@pytest.mark.parametrize('database, pool_class', [(':memory:', 'StaticPool'), ('tasks.db', 'QueuePool')])
+def test_sqlite_pool_options_only_apply_to_database_files(tmp_path, database, pool_class):
+    """Config reads DATABASE_URL on import, so check it in a fresh interpreter"""
+    url = 'sqlite:///:memory:' if database == ':memory:' else f"sqlite:///{tmp_path / database}"
+    script = ('from sqlalchemy import text\n'
+              'from app import create_app, db\n'
+              'app = create_app()\n'
+              'with app.app_context():\n'
+              '    db.session.execute(text("SELECT 1"))\n'
+              '    print(type(db.engine.pool).__name__)\n')
+    env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=url, METRICS_ENABLED='0',
+               CACHE_DIR=str(tmp_path / 'cache'))
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == pool_class
+
+
+@pytest.fixture
+def file_app(file_app_factory):
+    app = file_app_factory()
+    with app.app_context():
+        for index in range(CLIENTS):
+            user = User(username=f'user{index}', email=f'user{index}@example.com')
+            user.set_password('secret')
+            user.tasks = [Task(title=f'Task {number}', priority=number % 5 + 1,
+                               estimated_duration=30) for number in range(20)]
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def run_client(app, index, statuses):
+    rng = random.Random(index)
+    client = app.test_client()
+    assert client.post('/login', data={'username': f'user{index}', 'password': 'secret'}).status_code == 302
+    task_ids = [task['id'] for task in client.get('/api/tasks?limit=100').get_json()['items']]
+
+    for _ in range(REQUESTS_PER_CLIENT):
+        operation = rng.choice(['list', 'stats', 'create', 'update', 'batch', 'schedule'])
+        if operation == 'list':
+            response = client.get(f"/api/tasks?limit=50&sort={rng.choice(['due', 'priority'])}")
+        elif operation == 'stats':
+            response = client.get('/api/stats')
+        elif operation == 'create':
+            response = client.post('/api/tasks', json={'title': 'Concurrent task', 'estimated_duration': 30})
+        elif operation == 'update':
+            response = client.put(f'/api/tasks/{rng.choice(task_ids)}',
+                                  json={'status': rng.choice(['todo', 'in-progress', 'done'])})
+        elif operation == 'batch':
+            response = client.patch('/api/tasks', json={'ids': rng.sample(task_ids, 5),
+                                                        'changes': {'status': rng.choice(['todo', 'done'])}})
+        else:
+            day = date.today() + timedelta(days=rng.randint(1, 7))
+            response = client.post('/api/schedule/generate', json={'date': day.isoformat()})
+        statuses.append((operation, response.status_code))
+
+
+def test_concurrent_reads_and_writes_on_a_sqlite_file(file_app, caplog):
+    """Mixed load from concurrent clients completes without lock errors
+
+    benchmarks/stress_sqlite.py runs the same kind of load across gunicorn
+    worker processes and compares SQLite profiles.
+    """
+    with file_app.app_context():
+        assert isinstance(db.engine.pool, QueuePool)
+        assert db.engine.pool.size() == Config.SQLITE_ENGINE_OPTIONS['pool_size']
+
+    statuses, errors = [], []
+
+    def client_thread(index):
+        try:
+            run_client(file_app, index, statuses)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client_thread, args=(index,)) for index in range(CLIENTS)]
+    with caplog.at_level(logging.ERROR):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert len(statuses) == CLIENTS * REQUESTS_PER_CLIENT
+    assert [(operation, status) for operation, status in statuses if status >= 400] == []
+    assert 'database is locked' not in caplog.text
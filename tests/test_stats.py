@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import User, Task, Category
+from utils import get_task_stats, get_category_stats
+
+
+def per_status_counts(user_id):
+    """The per-statistic queries get_task_stats replaced"""
+    today = datetime.utcnow()
+    today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=today.weekday())
+    tasks = Task.query.filter_by(user_id=user_id)
+    open_tasks = tasks.filter(Task.status != 'done')
+    return {
+        'total_tasks': tasks.count(),
+        'completed_tasks': tasks.filter_by(status='done').count(),
+        'pending_tasks': tasks.filter_by(status='todo').count(),
+        'in_progress_tasks': tasks.filter_by(status='in-progress').count(),
+        'overdue_tasks': open_tasks.filter(Task.due_date < today).count(),
+        'due_today': open_tasks.filter(Task.due_date >= today_start,
+                                       Task.due_date < today_start + timedelta(days=1)).count(),
+        'completed_this_week': tasks.filter(Task.status == 'done', Task.completed_at >= week_start).count(),
+    }
+
+
+def add_mixed_tasks(user_id):
+    now = datetime.utcnow()
+    work = Category(name='Work', color='#007bff', user_id=user_id)
+    home = Category(name='Home', color='#28a745', user_id=user_id)
+    db.session.add_all([work, home])
+    db.session.flush()
+    due_dates = [None, now - timedelta(days=3), now - timedelta(minutes=1), now + timedelta(minutes=1),
+                 now.replace(hour=23, minute=59), now + timedelta(days=5)]
+    completions = [None, now, now - timedelta(days=2), now - timedelta(days=20)]
+    for index in range(48):
+        status = ('todo', 'in-progress', 'done')[index % 3]
+        db.session.add(Task(
+            title=f'Task {index}', user_id=user_id, status=status,
+            due_date=due_dates[index % len(due_dates)],
+            completed_at=completions[index % len(completions)] if status == 'done' else None,
+            estimated_duration=(15, 45, 90, None)[index % 4],
+            category_id=(work.id, home.id, None)[index % 5 % 3],
+        ))
+    db.session.commit()
+
+
+def test_single_query_stats_match_the_per_status_counts(user, app_context):
+    other = User(username='bob', email='bob@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    add_mixed_tasks(user.id)
+    add_mixed_tasks(other.id)
+
+    stats = get_task_stats(user.id)
+    expected = per_status_counts(user.id)
+    assert {name: stats[name] for name in expected} == expected
+    assert stats['total_tasks'] == 48
+    assert min(expected.values()) > 0
+
+    durations = [task.estimated_duration for task in Task.query.filter_by(user_id=user.id)
+                 if task.estimated_duration is not None]
+    assert stats['avg_duration'] == round(sum(durations) / len(durations), 0)
+    assert stats['completion_rate'] == round(expected['completed_tasks'] / 48 * 100, 1)
+
+
+def test_category_stats_include_uncategorized_tasks(user, app_context):
+    add_mixed_tasks(user.id)
+
+    expected = []
+    for category in Category.query.filter_by(user_id=user.id).order_by(Category.id):
+        tasks = Task.query.filter_by(category_id=category.id).all()
+        expected.append({'name': category.name, 'color': category.color, 'task_count': len(tasks),
+                         'total_duration': sum(task.estimated_duration or 0 for task in tasks)})
+    uncategorized = Task.query.filter_by(user_id=user.id, category_id=None).all()
+    expected.append({'name': 'Uncategorized', 'color': '#6c757d', 'task_count': len(uncategorized),
+                     'total_duration': sum(task.estimated_duration or 0 for task in uncategorized)})
+
+    assert get_category_stats(user.id) == expected
+
+
+def test_stats_of_a_user_without_tasks(user, app_context):
+    stats = get_task_stats(user.id)
+    assert stats['total_tasks'] == 0 and stats['completion_rate'] == 0 and stats['avg_duration'] == 0
+    assert get_category_stats(user.id) == []
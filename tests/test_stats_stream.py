@@ -0,0 +1,40 @@
+from app import db, cache, broker
+from models import Task
+from utils import notify_user_changed
+
+
+def test_stats_changes_are_published_only_when_the_session_commits(user, app_context):
+    version = cache.get_user_version(user.id)
+    with broker.subscribe(user.id) as subscription:
+        db.session.add(Task(title='Draft', user_id=user.id))
+        notify_user_changed(user.id)
+        assert not subscription.wait(0)
+        db.session.rollback()
+        assert not subscription.wait(0)
+        assert cache.get_user_version(user.id) == version
+
+        db.session.add(Task(title='Draft', user_id=user.id))
+        notify_user_changed(user.id)
+        db.session.commit()
+        assert subscription.wait(0)
+        assert cache.get_user_version(user.id) != version
+
+
+def test_flask_streams_are_capped_and_the_rest_told_to_poll(app, client):
+    limit = app.config['STATS_STREAM_WSGI_LIMIT']
+    streams = [client.get('/api/stats/stream', buffered=False) for _ in range(limit)]
+    assert [stream.status_code for stream in streams] == [200] * limit
+
+    refused = client.get('/api/stats/stream', buffered=False)
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After']
+
+    # Closing a stream, started or not, frees its slot (in reverse, as each
+    # open stream here has pushed its request context on this thread)
+    for stream in reversed(streams):
+        stream.close()
+    for _ in range(limit + 1):
+        stream = client.get('/api/stats/stream', buffered=False)
+        assert stream.status_code == 200
+        assert next(stream.response) == b'retry: 5000\n\n'
+        stream.close()
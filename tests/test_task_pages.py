@@ -0,0 +1,14 @@
+def test_invalid_cursor_on_the_tasks_page_starts_over(client):
+    response = client.get('/tasks?status=todo&category=all&cursor=not-a-cursor')
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/tasks?status=todo&category=all'
+
+    page = client.get(response.headers['Location'])
+    assert page.status_code == 200
+    assert b'no longer available' in page.data
+
+
+def test_invalid_cursor_on_load_more_is_a_bad_request(client):
+    response = client.get('/tasks?partial=1&cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert not response.is_json
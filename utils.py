@@ -1,85 +1,112 @@
-from models import Task, Category
-from app import db
-from sqlalchemy import func
+from models import User, Task, Category, DailyTaskRollup
+from flask import current_app
+from app import db, cache, broker
+from sqlalchemy import event, func, case, and_, or_, false, select, literal, union_all
+from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import math
+import time
+import json
+import base64
 
 def get_task_stats(user_id):
-    """Get comprehensive task statistics for a user"""
+    """Get comprehensive task statistics for a user
+
+    All counters are computed in a single pass over the user's tasks using
+    conditional aggregates, so this costs one round trip regardless of how
+    many statistics are reported.
+    """
     
-    # Basic counts
-    total_tasks = Task.query.filter_by(user_id=user_id).count()
-    completed_tasks = Task.query.filter_by(user_id=user_id, status='done').count()
-    pending_tasks = Task.query.filter_by(user_id=user_id, status='todo').count()
-    in_progress_tasks = Task.query.filter_by(user_id=user_id, status='in-progress').count()
+    return task_stats_from_row(db.session.execute(task_stats_statement(user_id)).one())
+
+def task_stats_statement(user_id):
+    """Build the single-pass aggregate query behind get_task_stats"""
     
-    # Overdue tasks
     today = datetime.utcnow()
-    overdue_tasks = Task.query.filter(
-        Task.user_id == user_id,
-        Task.status != 'done',
-        Task.due_date < today
-    ).count()
-    
-    # Due today
     today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
     today_end = today_start + timedelta(days=1)
-    due_today = Task.query.filter(
-        Task.user_id == user_id,
-        Task.status != 'done',
-        Task.due_date >= today_start,
-        Task.due_date < today_end
-    ).count()
+    week_start = today_start - timedelta(days=today.weekday())
+    
+    def count_where(*conditions):
+        return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+    
+    not_done = Task.status != 'done'
+    return select(
+        func.count(Task.id),
+        count_where(Task.status == 'done'),
+        count_where(Task.status == 'todo'),
+        count_where(Task.status == 'in-progress'),
+        count_where(not_done, Task.due_date < today),
+        count_where(not_done, Task.due_date >= today_start, Task.due_date < today_end),
+        count_where(Task.status == 'done', Task.completed_at >= week_start),
+        func.avg(Task.estimated_duration)
+    ).where(Task.user_id == user_id)
+
+def task_stats_from_row(row):
+    """Convert the row returned by task_stats_statement into the stats dict"""
+    
+    (total_tasks, completed_tasks, pending_tasks, in_progress_tasks,
+     overdue_tasks, due_today, completed_this_week, avg_duration) = row
     
     # Completion rate
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
-    # Average task duration
-    avg_duration = db.session.query(func.avg(Task.estimated_duration))\
-                            .filter_by(user_id=user_id).scalar() or 0
-    
-    # Tasks completed this week
-    week_start = today - timedelta(days=today.weekday())
-    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-    completed_this_week = Task.query.filter(
-        Task.user_id == user_id,
-        Task.status == 'done',
-        Task.completed_at >= week_start
-    ).count()
-    
     return {
         'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'overdue_tasks': overdue_tasks,
-        'due_today': due_today,
+        'completed_tasks': int(completed_tasks),
+        'pending_tasks': int(pending_tasks),
+        'in_progress_tasks': int(in_progress_tasks),
+        'overdue_tasks': int(overdue_tasks),
+        'due_today': int(due_today),
         'completion_rate': round(completion_rate, 1),
-        'avg_duration': round(avg_duration, 0),
-        'completed_this_week': completed_this_week
+        'avg_duration': round(float(avg_duration), 0) if avg_duration else 0,
+        'completed_this_week': int(completed_this_week)
     }
 
 def get_category_stats(user_id):
-    """Get task distribution by category"""
+    """Get task distribution by category
+
+    Categorized and uncategorized totals are fetched together with a
+    UNION ALL so the whole breakdown is a single query.
+    """
+    
+    return category_stats_from_rows(db.session.execute(category_stats_statement(user_id)).all())
+
+def category_stats_statement(user_id):
+    """Build the UNION ALL query behind get_category_stats"""
     
-    # Query to get task counts by category
-    category_stats = db.session.query(
-        Category.name,
-        Category.color,
+    categorized = select(
+        Category.name.label('name'),
+        Category.color.label('color'),
         func.count(Task.id).label('task_count'),
-        func.sum(Task.estimated_duration).label('total_duration')
+        func.sum(Task.estimated_duration).label('total_duration'),
+        literal(0).label('bucket'),
+        Category.id.label('sort_id')
     ).outerjoin(Task, Category.id == Task.category_id)\
-     .filter(Category.user_id == user_id)\
-     .group_by(Category.id, Category.name, Category.color)\
-     .all()
+     .where(Category.user_id == user_id)\
+     .group_by(Category.id, Category.name, Category.color)
     
     # Tasks without category
-    uncategorized_count = Task.query.filter_by(user_id=user_id, category_id=None).count()
-    uncategorized_duration = db.session.query(func.sum(Task.estimated_duration))\
-                                      .filter_by(user_id=user_id, category_id=None)\
-                                      .scalar() or 0
+    uncategorized = select(
+        literal('Uncategorized').label('name'),
+        literal('#6c757d').label('color'),
+        func.count(Task.id).label('task_count'),
+        func.sum(Task.estimated_duration).label('total_duration'),
+        literal(1).label('bucket'),
+        literal(0).label('sort_id')
+    ).where(Task.user_id == user_id, Task.category_id.is_(None))
+    
+    combined = union_all(categorized, uncategorized).subquery()
+    return select(combined).order_by(combined.c.bucket, combined.c.sort_id)
+
+def category_stats_from_rows(rows):
+    """Convert the rows returned by category_stats_statement into the breakdown"""
     
     result = []
-    for name, color, count, duration in category_stats:
+    for name, color, count, duration, bucket, _ in rows:
+        # Add uncategorized only if there are any
+        if bucket == 1 and not count:
+            continue
         result.append({
             'name': name,
             'color': color,
@@ -87,46 +114,295 @@ def get_category_stats(user_id):
             'total_duration': duration or 0
         })
     
-    # Add uncategorized if there are any
-    if uncategorized_count > 0:
-        result.append({
-            'name': 'Uncategorized',
-            'color': '#6c757d',
-            'task_count': uncategorized_count,
-            'total_duration': uncategorized_duration
-        })
-    
     return result
 
+def get_dashboard_bundle(user_id):
+    """Get task and category statistics together in two queries"""
+    
+    return {
+        'task_stats': get_task_stats(user_id),
+        'category_stats': get_category_stats(user_id)
+    }
+
+def get_stats_version(user_id):
+    """Get the cache version of a user's dashboard statistics
+
+    Combines the user's data version, which every mutating route bumps, with
+    a time bucket so that time-dependent counters are refreshed periodically.
+    """
+    
+    bucket = int(time.time() // current_app.config['STATS_CACHE_TIMEOUT'])
+    return f'{cache.get_user_version(user_id)}-{bucket}'
+
+def dashboard_bundle_key(user_id, version):
+    return f'dashboard-bundle:{user_id}:{version}'
+
+def get_cached_dashboard_bundle(user_id, version=None):
+    """Get the dashboard bundle from cache, computing it on a miss"""
+    
+    version = version or get_stats_version(user_id)
+    key = dashboard_bundle_key(user_id, version)
+    
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = get_dashboard_bundle(user_id)
+        cache.set(key, bundle, timeout=current_app.config['STATS_CACHE_TIMEOUT'])
+    return bundle
+
+def notify_user_changed(user_id, session=None):
+    """Invalidate a user's cached stats and push them to open stats streams
+
+    Call before committing any change to the user's tasks, categories or
+    schedules. The stats version is bumped once the session commits and
+    nothing happens if it rolls back. A PostgreSQL broker sends its
+    notification inside the transaction; others publish after the commit.
+    """
+    
+    session = db.session if session is None else session
+    published = broker.publish_in_transaction(session.connection(), user_id)
+    session.info.setdefault('changed_stats_users', {})[user_id] = published
+
+@event.listens_for(Session, 'after_commit')
+def _publish_changed_stats(session):
+    for user_id, published in session.info.pop('changed_stats_users', {}).items():
+        cache.bump_user_version(user_id)
+        if not published:
+            broker.publish(user_id)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_stats(session, previous_transaction):
+    session.info.pop('changed_stats_users', None)
+
+# Keyset orderings for task lists: (column, descending) pairs. Nullable
+# columns sort with NULLs last in either direction; id is always the final
+# tie-breaker so keys are unique.
+TASK_SORT_ORDERS = {
+    'due': [('due_date', False), ('priority', True), ('id', False)],
+    'priority': [('priority', True), ('due_date', False), ('id', False)],
+}
+NULLABLE_SORT_COLUMNS = {'due_date', 'priority'}
+
+def get_category_lookup(user_id):
+    """Get a user's category ids and a case-insensitive name to id map in one query"""
+    
+    rows = db.session.query(Category.id, Category.name).filter(Category.user_id == user_id).all()
+    category_ids = {category_id for category_id, _ in rows}
+    category_names = {name.strip().lower(): category_id for category_id, name in rows}
+    return category_ids, category_names
+
+# Longest estimate a task may have: a week of minutes
+MAX_ESTIMATED_DURATION = 7 * 24 * 60
+
+def parse_task_data(data, category_ids, category_names=None):
+    """Validate incoming task fields and convert them to column values
+    
+    category_ids is the set of category ids the user owns; when
+    category_names is given, a 'category' field may name a category instead.
+    Raises ValueError with a user-facing message for invalid data.
+    """
+    
+    def optional(name):
+        value = data.get(name)
+        return None if value is None or value == '' else value
+    
+    # Validate required fields
+    if not data.get('title'):
+        raise ValueError('Title is required')
+    if len(str(data['title'])) > Task.title.type.length:
+        raise ValueError(f'Title must be at most {Task.title.type.length} characters')
+    
+    # Parse due date if provided
+    due_date = None
+    if optional('due_date'):
+        try:
+            due_date = datetime.fromisoformat(data['due_date'])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid due date format')
+    
+    # Missing values get the defaults; an explicit 0 is kept (and checked)
+    estimated_duration = optional('estimated_duration')
+    try:
+        estimated_duration = 60 if estimated_duration is None else int(estimated_duration)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid estimated duration')
+    if not 0 <= estimated_duration <= MAX_ESTIMATED_DURATION:
+        raise ValueError(f'Estimated duration must be between 0 and {MAX_ESTIMATED_DURATION} minutes')
+    
+    priority = optional('priority')
+    try:
+        priority = 3 if priority is None else int(priority)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid priority')
+    if not 1 <= priority <= 5:
+        raise ValueError('Priority must be between 1 and 5')
+    
+    # Categories must belong to the user
+    category_id = None
+    if optional('category_id') is not None:
+        try:
+            category_id = int(data['category_id'])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid category')
+        if category_id not in category_ids:
+            raise ValueError('Invalid category')
+    elif category_names is not None and optional('category'):
+        category_id = category_names.get(str(data['category']).strip().lower())
+        if category_id is None:
+            raise ValueError(f"Unknown category '{data['category']}'")
+    
+    return {
+        'title': data['title'],
+        'description': data.get('description') or '',
+        'due_date': due_date,
+        'estimated_duration': estimated_duration,
+        'priority': priority,
+        'category_id': category_id
+    }
+
+def filter_tasks(query, status=None, category_id=None, due_after=None, due_before=None):
+    """Apply the task list filters shared by the tasks page and the API"""
+    
+    if status:
+        query = query.filter(Task.status == status)
+    if category_id == 'none':
+        query = query.filter(Task.category_id.is_(None))
+    elif category_id is not None:
+        query = query.filter(Task.category_id == int(category_id))
+    if due_after:
+        query = query.filter(Task.due_date >= due_after)
+    if due_before:
+        query = query.filter(Task.due_date < due_before)
+    return query
+
+def encode_cursor(sort, task):
+    """Encode the sort key of the last task on a page as an opaque cursor"""
+    
+    values = []
+    for name, _ in TASK_SORT_ORDERS[sort]:
+        value = getattr(task, name)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    payload = json.dumps([sort] + values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(sort, cursor):
+    """Decode a cursor into sort key values, raising ValueError if invalid"""
+    
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    
+    if not isinstance(payload, list) or len(payload) != len(TASK_SORT_ORDERS[sort]) + 1 \
+            or payload[0] != sort:
+        raise ValueError('Invalid cursor')
+    
+    values = payload[1:]
+    for index, (name, _) in enumerate(TASK_SORT_ORDERS[sort]):
+        if name == 'due_date' and values[index] is not None:
+            values[index] = datetime.fromisoformat(values[index])
+    return values
+
+def _after_key(columns, values):
+    """Build the keyset condition for rows strictly after the given key"""
+    
+    (name, descending), rest = columns[0], columns[1:]
+    column = getattr(Task, name)
+    value = values[0]
+    
+    if value is None:
+        # NULLs sort last, so nothing comes after NULL
+        after = false()
+        equal = column.is_(None)
+    else:
+        after = column < value if descending else column > value
+        equal = column == value
+        if name in NULLABLE_SORT_COLUMNS:
+            # and NULL follows any value
+            after = or_(after, column.is_(None))
+    
+    if not rest:
+        return after
+    return or_(after, and_(equal, _after_key(rest, values[1:])))
+
+def paginate_tasks(query, limit, cursor=None, sort='due'):
+    """Get one keyset page of tasks and the cursor for the next page
+    
+    The page is located with a WHERE condition on the sort key rather than
+    an OFFSET, so every page costs the same regardless of its position.
+    """
+    
+    return split_task_page(task_page_query(query, limit, cursor, sort).all(), limit, sort)
+
+def task_page_query(query, limit, cursor=None, sort='due'):
+    """Restrict a task query or select() to the page after the cursor
+    
+    One extra row is fetched to tell whether another page follows; pass the
+    results to split_task_page.
+    """
+    
+    columns = TASK_SORT_ORDERS[sort]
+    if cursor:
+        query = query.filter(_after_key(columns, decode_cursor(sort, cursor)))
+    
+    order_by = []
+    for name, descending in columns:
+        column = getattr(Task, name)
+        clause = column.desc() if descending else column.asc()
+        order_by.append(clause.nullslast() if name in NULLABLE_SORT_COLUMNS else clause)
+    
+    return query.order_by(*order_by).limit(limit + 1)
+
+def split_task_page(tasks, limit, sort='due'):
+    """Trim the rows of task_page_query to one page and build the next cursor"""
+    
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(sort, tasks[-1])
+    return tasks, next_cursor
+
 def get_productivity_trends(user_id, days=30):
-    """Get productivity trends over the specified number of days"""
-    
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    # Daily completion counts
-    daily_completions = db.session.query(
-        func.date(Task.completed_at).label('date'),
-        func.count(Task.id).label('completed_count')
-    ).filter(
-        Task.user_id == user_id,
-        Task.status == 'done',
-        Task.completed_at >= start_date,
-        Task.completed_at <= end_date
-    ).group_by(func.date(Task.completed_at)).all()
+    """Get productivity trends over the specified number of days
+    
+    Reads the incrementally maintained daily rollup, so the cost depends on
+    the number of days rather than the number of tasks. Pass days=None for
+    the user's whole history.
+    """
+    
+    end_date = datetime.utcnow().date()
+    
+    query = db.session.query(
+        DailyTaskRollup.day,
+        DailyTaskRollup.completed_count,
+        DailyTaskRollup.completed_minutes,
+        DailyTaskRollup.created_count
+    ).filter(DailyTaskRollup.user_id == user_id, DailyTaskRollup.day <= end_date)
+    
+    if days is not None:
+        start_date = end_date - timedelta(days=days)
+        query = query.filter(DailyTaskRollup.day >= start_date)
     
     # Convert to dictionary for easier processing
-    completion_data = {str(date): count for date, count in daily_completions}
+    rollup_data = {str(day): (completed, minutes, created)
+                   for day, completed, minutes, created in query.all()}
+    
+    if days is None:
+        start_date = min((datetime.strptime(day, '%Y-%m-%d').date() for day in rollup_data),
+                         default=end_date)
     
     # Fill in missing days with 0
-    current_date = start_date.date()
+    current_date = start_date
     trend_data = []
     
-    while current_date <= end_date.date():
+    while current_date <= end_date:
         date_str = str(current_date)
+        completed, minutes, created = rollup_data.get(date_str, (0, 0, 0))
         trend_data.append({
             'date': date_str,
-            'completed': completion_data.get(date_str, 0)
+            'completed': completed,
+            'completed_minutes': minutes,
+            'created': created
         })
         current_date += timedelta(days=1)
     
@@ -174,25 +450,169 @@ def get_priority_distribution(user_id):
     
     return result
 
+def work_minutes_per_day(work_start_hour, work_end_hour, lunch_start_hour=12, lunch_end_hour=13):
+    """Working minutes in a day, less the lunch break the scheduler leaves free"""
+    
+    lunch = max(0, min(work_end_hour, lunch_end_hour) - max(work_start_hour, lunch_start_hour))
+    return max(0, work_end_hour - work_start_hour - lunch) * 60
+
 def estimate_completion_time(user_id, task_ids=None):
-    """Estimate completion time for pending tasks"""
+    """Estimate completion time for pending tasks
     
-    query = Task.query.filter_by(user_id=user_id, status='todo')
+    Counts and sums the pending tasks in one aggregate query, joined to the
+    user for the working hours each day of work is made of.
+    """
     
+    conditions = [Task.user_id == User.id, Task.status == 'todo']
     if task_ids:
-        query = query.filter(Task.id.in_(task_ids))
-    
-    tasks = query.all()
-    
-    total_duration = sum(task.estimated_duration for task in tasks)
-    
-    # Assuming 6 productive hours per day
-    productive_hours_per_day = 6 * 60  # in minutes
-    estimated_days = total_duration / productive_hours_per_day
+        conditions.append(Task.id.in_(task_ids))
+    
+    row = db.session.execute(
+        select(func.count(Task.id), func.coalesce(func.sum(Task.estimated_duration), 0),
+               User.work_start_hour, User.work_end_hour)
+        .select_from(User)
+        .outerjoin(Task, and_(*conditions))
+        .where(User.id == user_id)
+        .group_by(User.id, User.work_start_hour, User.work_end_hour)
+    ).one_or_none()
+    total_tasks, total_duration, work_start_hour, work_end_hour = row or (0, 0, None, None)
+    total_duration = int(total_duration)
+    
+    minutes_per_day = work_minutes_per_day(work_start_hour if work_start_hour is not None else 9,
+                                           work_end_hour if work_end_hour is not None else 17)
+    estimated_days = total_duration / minutes_per_day if minutes_per_day else None
     
     return {
-        'total_tasks': len(tasks),
+        'total_tasks': total_tasks,
         'total_duration_minutes': total_duration,
         'total_duration_hours': round(total_duration / 60, 1),
-        'estimated_days': round(estimated_days, 1)
+        'estimated_days': round(estimated_days, 1) if estimated_days is not None else None
     }
+
+# Priority bands for forecasts, in the order the scheduler favours them
+PRIORITY_BANDS = [
+    ('high', (4, 5)),
+    ('medium', (3,)),
+    ('low', (1, 2)),
+]
+
+def priority_band_expression():
+    """SQL expression naming the priority band of a task"""
+    
+    return case(*[(Task.priority.in_(priorities), band) for band, priorities in PRIORITY_BANDS[:-1]],
+                else_=PRIORITY_BANDS[-1][0])
+
+def forecast_completion(user_id, work_start_hour=9, work_end_hour=17, history_days=None):
+    """Project when a user's open tasks will be done, per category and priority band
+    
+    Open work and the work completed in the last history_days are each read
+    with one grouped query. The daily pace is the estimated minutes the user
+    actually completed per day, capped at their working minutes; without any
+    history it is their working minutes. Priority bands are worked through
+    from high to low. Categories share the pace in proportion to their
+    recent throughput, and a category's share passes to the rest once its
+    tasks are done; categories without recent completions come last.
+    """
+    
+    if history_days is None:
+        history_days = current_app.config['FORECAST_HISTORY_DAYS']
+    today = datetime.utcnow()
+    since = today.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=history_days)
+    
+    band = priority_band_expression()
+    
+    def grouped(*conditions):
+        return db.session.query(
+            Task.category_id,
+            Category.name,
+            band,
+            func.count(Task.id),
+            func.coalesce(func.sum(Task.estimated_duration), 0)
+        ).outerjoin(Category, Task.category_id == Category.id)\
+         .filter(Task.user_id == user_id, *conditions)\
+         .group_by(Task.category_id, Category.name, band).all()
+    
+    categories, bands = {}, {}
+    for rows, open_work in ((grouped(Task.status != 'done'), True),
+                            (grouped(Task.status == 'done', Task.completed_at >= since), False)):
+        for category_id, category_name, band_name, count, minutes in rows:
+            for totals in (categories.setdefault(category_id, {'category_id': category_id,
+                                                               'category_name': category_name or 'Uncategorized'}),
+                           bands.setdefault(band_name, {'band': band_name})):
+                if open_work:
+                    totals['tasks'] = totals.get('tasks', 0) + count
+                    totals['minutes'] = totals.get('minutes', 0) + int(minutes)
+                else:
+                    totals['completed_minutes'] = totals.get('completed_minutes', 0) + int(minutes)
+    
+    capacity = work_minutes_per_day(work_start_hour, work_end_hour)
+    completed_minutes = sum(totals.get('completed_minutes', 0) for totals in bands.values())
+    pace = min(capacity, completed_minutes / history_days) if completed_minutes else capacity
+    
+    def finish(totals, days):
+        totals.setdefault('completed_minutes', 0)
+        totals['days'] = round(days, 1) if days is not None else None
+        totals['date'] = (today.date() + timedelta(days=math.ceil(days))).isoformat() if days is not None else None
+        return totals
+    
+    # Bands in priority order, each finishing after the ones before it
+    by_priority = []
+    done_minutes = 0
+    for band_name, priorities in PRIORITY_BANDS:
+        totals = bands.get(band_name)
+        if totals and totals.get('tasks'):
+            done_minutes += totals['minutes']
+            totals['priorities'] = list(priorities)
+            by_priority.append(finish(totals, done_minutes / pace if pace else None))
+    
+    open_categories = {key: totals for key, totals in categories.items() if totals.get('tasks')}
+    finish_days = _shared_finish_days(
+        {key: totals['minutes'] for key, totals in open_categories.items()},
+        {key: totals.get('completed_minutes', 0) for key, totals in open_categories.items()},
+        pace
+    )
+    by_category = sorted((finish(totals, finish_days.get(key)) for key, totals in open_categories.items()),
+                         key=lambda totals: (totals['days'] is None, totals['days'] or 0, totals['category_name']))
+    
+    total_minutes = sum(totals['minutes'] for totals in open_categories.values())
+    total_days = total_minutes / pace if pace else None
+    return {
+        'basis': 'throughput' if completed_minutes else 'work_hours',
+        'history_days': history_days,
+        'work_minutes_per_day': capacity,
+        'minutes_per_day': round(pace, 1),
+        'total': finish({'tasks': sum(totals['tasks'] for totals in open_categories.values()),
+                         'minutes': total_minutes, 'completed_minutes': completed_minutes}, total_days),
+        'by_priority': by_priority,
+        'by_category': by_category
+    }
+
+def _shared_finish_days(work, weights, pace):
+    """Days until each piece of work is done when it shares a daily pace
+    
+    Each key gets a share of the pace in proportion to its weight, and the
+    shares of finished keys are passed on to the rest. Keys with no weight
+    share whatever pace is left once all weighted keys are done.
+    """
+    
+    if not pace:
+        return {}
+    remaining = {key: minutes for key, minutes in work.items() if minutes > 0}
+    finished = {key: 0.0 for key in work if key not in remaining}
+    elapsed = 0.0
+    while remaining:
+        shares = {key: weights.get(key, 0) for key in remaining}
+        if not any(shares.values()):
+            # Split by size so all the remaining work finishes together
+            shares = dict(remaining)
+        total_share = sum(shares.values())
+        rates = {key: pace * share / total_share for key, share in shares.items() if share}
+        step = min(remaining[key] / rate for key, rate in rates.items())
+        elapsed += step
+        for key, rate in rates.items():
+            if remaining[key] / rate <= step * (1 + 1e-9):
+                finished[key] = elapsed
+                del remaining[key]
+            else:
+                remaining[key] -= rate * step
+    return finished